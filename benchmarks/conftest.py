@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import sys
+import textwrap
+
+import pytest
+
+from tests.conftest import restore_sys_path_and_module_after_test_execution
+
+
+@pytest.fixture(autouse=True)
+def _restore_sys_path_and_module_after_benchmark():
+    """Restore sys.path and sys.modules since task modules share the same name."""
+    with restore_sys_path_and_module_after_test_execution():
+        yield
+
+
+@pytest.fixture
+def stub_rscript(tmp_path):
+    """Create an executable which answers the probes of ``Rscript`` and does nothing.
+
+    The stub is a shell script so that the measurements contain the overhead of pytask-r
+    and not the startup of an interpreter. Batches report every script as successful.
+
+    """
+    if sys.platform == "win32":
+        pytest.skip("Requires a POSIX shell.")
+    folder = tmp_path / "bin"
+    folder.mkdir()
+    path = folder / "Rscript"
+    path.write_text(
+        textwrap.dedent(
+            """\
+            #!/bin/sh
+            [ "$1" = "--vanilla" ] && shift
+            if [ "$1" = "-e" ]; then
+                printf -- '--- pytask-r ---\\n4.3.1\\n/usr/lib/R/library\\n'
+            elif [ "$3" = "batch" ]; then
+                {
+                    echo ready
+                    while read -r line; do printf 'ok\\t0\\t0\\t0\\n'; done < "$2"
+                } > "$2.results"
+            fi
+            """
+        )
+    )
+    path.chmod(0o755)
+    return path
@@ -0,0 +1,46 @@
+"""Benchmark the collection of R tasks.
+
+The hook which collects tasks is called directly with many functions decorated with
+``@pytask.mark.r`` so that the measurements do not include the collection of pytask.
+
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from pytask import build
+from pytask import mark
+
+from pytask_r.collect import pytask_collect_task
+
+
+def _create_functions(n_tasks):
+    functions = []
+    for i in range(n_tasks):
+
+        def task_example(value=i): ...
+
+        functions.append(mark.r(script=Path("script.r"))(task_example))
+    return functions
+
+
+@pytest.mark.parametrize("n_tasks", [1_000, 10_000, 50_000])
+def test_collect_tasks(benchmark, tmp_path, n_tasks):
+    tmp_path.joinpath("script.r").write_text('x <- read.csv("data.csv")')
+    session = build(paths=tmp_path, dry_run=True)
+    path = tmp_path / "task_example.py"
+
+    def collect(functions):
+        for i, function in enumerate(functions):
+            pytask_collect_task(
+                session=session, path=path, name=f"task_example[{i}]", obj=function
+            )
+
+    benchmark.pedantic(
+        collect, setup=lambda: ((_create_functions(n_tasks),), {}), rounds=3
+    )
+    # The time per task stays constant if the collection scales linearly.
+    benchmark.extra_info["tasks"] = n_tasks
+    benchmark.extra_info["seconds_per_task"] = benchmark.stats.stats.mean / n_tasks
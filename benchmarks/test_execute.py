@@ -0,0 +1,50 @@
+"""Benchmark the overhead of executing R tasks.
+
+The tasks run a stub of ``Rscript`` which returns immediately, so the time per task is
+the overhead of pytask and pytask-r with each backend.
+
+"""
+
+from __future__ import annotations
+
+import textwrap
+
+import pytest
+from pytask import ExitCode
+from pytask import build
+
+from tests.conftest import restore_sys_path_and_module_after_test_execution
+
+_N_TASKS = 100
+
+
+@pytest.mark.parametrize("backend", ["subprocess", "batch", "async"])
+def test_execute_tasks(benchmark, tmp_path, stub_rscript, backend):
+    task_source = f"""
+    from pathlib import Path
+    from pytask import mark
+    from pytask import task
+
+    for i in range({_N_TASKS}):
+
+        @task(id=str(i))
+        @mark.r(script=Path("script.r"))
+        def task_example(value=i): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").touch()
+
+    def execute():
+        # The task module is only imported again if it is removed from sys.modules.
+        with restore_sys_path_and_module_after_test_execution():
+            session = build(
+                paths=tmp_path,
+                force=True,
+                r_executable=stub_rscript.as_posix(),
+                r_backend=backend,
+            )
+        assert session.exit_code == ExitCode.OK
+        assert len(session.execution_reports) == _N_TASKS
+
+    benchmark.extra_info["tasks"] = _N_TASKS
+    benchmark.pedantic(execute, rounds=5, warmup_rounds=1)
@@ -0,0 +1,40 @@
+"""Benchmark how long it takes to start pytask with pytask-r.
+
+Every round imports pytask in a fresh interpreter which loads pytask-r as a plugin. As a
+baseline, pytask is also imported while the distribution of pytask-r is hidden from the
+entry points so that the difference is the cost of the plugin.
+
+"""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+_HIDE_PYTASK_R = """
+import importlib.metadata
+
+distributions = importlib.metadata.distributions
+importlib.metadata.distributions = lambda **kwargs: (
+    dist for dist in distributions(**kwargs) if dist.metadata["Name"] != "pytask-r"
+)
+"""
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        pytest.param("import pytask", id="with-pytask-r"),
+        pytest.param(_HIDE_PYTASK_R + "import pytask", id="without-pytask-r"),
+    ],
+)
+def test_import_pytask(benchmark, code):
+    benchmark.pedantic(
+        subprocess.run,
+        args=([sys.executable, "-c", code],),
+        kwargs={"check": True},
+        rounds=20,
+        warmup_rounds=1,
+    )
@@ -0,0 +1,94 @@
+"""Benchmark serializing the keyword arguments of R tasks."""
+
+from __future__ import annotations
+
+import contextlib
+import shutil
+from pathlib import Path
+
+import pytest
+from pytask import PathNode
+from pytask import PythonNode
+from pytask import Task
+
+from pytask_r.execute import collect_keyword_arguments
+from pytask_r.serialization import SERIALIZERS
+from pytask_r.serialization import digest_keyword_arguments
+from pytask_r.serialization import serialize_keyword_arguments
+
+# Optional packages are imported once since sys.modules is restored after every
+# benchmark and some packages cannot be imported twice.
+with contextlib.suppress(ImportError):
+    import numpy as np  # noqa: F401
+
+with contextlib.suppress(ImportError):
+    import pyarrow.ipc  # noqa: F401
+
+try:
+    import rdata.conversion
+    import rdata.unparser  # noqa: F401
+except ImportError:
+    pass
+
+_SIZES = [10, 1_000, 100_000]
+
+
+def _create_kwargs(size):
+    return {
+        "_script": "script.r",
+        "produces": "out.rds",
+        "values": [i / 3 for i in range(size)],
+        "labels": {f"label_{i}": i for i in range(min(size, 1_000))},
+    }
+
+
+@pytest.mark.parametrize("size", _SIZES)
+@pytest.mark.parametrize("serializer", ["json", "yaml", "msgpack", "arrow", "rds"])
+def test_serialize_keyword_arguments(benchmark, tmp_path, serializer, size):
+    if serializer not in SERIALIZERS:
+        pytest.skip(f"Serializer {serializer!r} is not installed.")
+    task = Task(
+        base_name="task_example", path=tmp_path / "task_example.py", function=None
+    )
+    folder = tmp_path / ".pytask" / "pytask-r"
+    suffix = SERIALIZERS[serializer]["suffix"]
+    kwargs = _create_kwargs(size)
+
+    def setup():
+        # Remove the file of the previous round so that it is written again.
+        shutil.rmtree(folder, ignore_errors=True)
+        folder.mkdir(parents=True)
+
+    benchmark.pedantic(
+        serialize_keyword_arguments,
+        args=(serializer, task, suffix, kwargs),
+        setup=setup,
+        rounds=10,
+    )
+
+
+@pytest.mark.parametrize("size", _SIZES)
+def test_digest_keyword_arguments(benchmark, size):
+    nodes = {
+        name: PythonNode(value=value) for name, value in _create_kwargs(size).items()
+    }
+    benchmark(digest_keyword_arguments, "json", ".json", nodes)
+
+
+@pytest.mark.parametrize("size", _SIZES)
+def test_collect_keyword_arguments(benchmark, size):
+    shards = [PathNode(path=Path(f"data/shard_{i}.csv")) for i in range(size)]
+    task = Task(
+        base_name="task_example",
+        path=Path("task_example.py"),
+        function=None,
+        depends_on={
+            "shards": shards,
+            "config": PythonNode(value={"seed": 1}),
+            "_script": PathNode(path=Path("script.r")),
+            "_options": PythonNode(value=[]),
+            "_serialized": PythonNode(value=Path("serialized.json")),
+        },
+        produces={"produces": PathNode(path=Path("out.rds"))},
+    )
+    benchmark(collect_keyword_arguments, task)
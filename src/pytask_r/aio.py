@@ -0,0 +1,203 @@
+"""Contains the async backend which supervises many Rscript processes from one thread.
+
+Instead of blocking a thread or a Python process per task, the processes of all ready
+tasks are started and awaited by a single event loop. A semaphore bounds the number of
+processes running at the same time. If a process times out or the execution is
+cancelled, for example, with Ctrl-C, the process is killed together with its children.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from typing import cast
+
+from pytask_r.profiling import TERMINATE_TIMEOUT
+from pytask_r.profiling import ProcessStats
+
+if TYPE_CHECKING:
+    from pytask_r.logs import TaskLog
+
+__all__ = ["Command", "ProcessResult", "run_concurrently"]
+
+_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class Command:
+    """A command which is run by the event loop.
+
+    Attributes
+    ----------
+    args
+        The program and its arguments.
+    log
+        The log which receives stdout and stderr. If ``None``, the output is returned.
+    timeout
+        The seconds after which the process is killed.
+    retries
+        How often the command is run again if it fails or times out.
+    backoff
+        The seconds to wait before the first retry. The delay doubles with every retry.
+    env
+        The environment of the process. If ``None``, it inherits the environment.
+
+    """
+
+    args: list[str]
+    log: TaskLog | None = None
+    timeout: float | None = None
+    retries: int = 0
+    backoff: float = 1.0
+    env: dict[str, str] | None = None
+
+
+@dataclass(frozen=True)
+class ProcessResult:
+    """The result of a process which was started by the event loop.
+
+    Attributes
+    ----------
+    returncode
+        The exit code of the process.
+    stdout
+        The output of the process if it is not written to a log.
+    stderr
+        The messages, warnings and errors of the process if they are not written to a
+        log.
+    stats
+        The resources used by the process. Only the wall time is measured.
+    timed_out
+        Whether the process was killed because it exceeded its timeout.
+
+    """
+
+    returncode: int
+    stdout: str
+    stderr: str
+    stats: ProcessStats
+    timed_out: bool = False
+
+
+def run_concurrently(
+    commands: list[Command], max_processes: int
+) -> list[ProcessResult]:
+    """Run commands concurrently with at most ``max_processes`` at the same time.
+
+    If an event loop is already running in this thread, for example, when pytask is
+    called from Jupyter, the commands are run by a new loop in a worker thread.
+
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_run_all(commands, max_processes))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(run_concurrently, commands, max_processes)
+        return future.result()
+
+
+async def _run_all(commands: list[Command], max_processes: int) -> list[ProcessResult]:
+    semaphore = asyncio.Semaphore(max_processes)
+    return list(
+        await asyncio.gather(*(_run_with_retries(c, semaphore) for c in commands))
+    )
+
+
+async def _run_with_retries(
+    command: Command, semaphore: asyncio.Semaphore
+) -> ProcessResult:
+    for attempt in range(command.retries + 1):
+        async with semaphore:
+            result = await _run(command)
+        if result.returncode == 0 and not result.timed_out:
+            break
+        if attempt < command.retries:
+            delay = command.backoff * 2**attempt
+            if command.log is not None:
+                command.log.write(f"Retrying in {delay:g} s.\n".encode())
+            await asyncio.sleep(delay)
+    return result
+
+
+async def _run(command: Command) -> ProcessResult:
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *command.args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE if command.log is None else subprocess.STDOUT,
+        env=command.env,
+        # A new session allows killing R together with processes it started.
+        start_new_session=sys.platform != "win32",
+    )
+    timed_out = False
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            _communicate(process, command.log), command.timeout
+        )
+    except asyncio.TimeoutError:
+        timed_out = True
+        stdout = stderr = b""
+    finally:
+        if process.returncode is None:
+            await _kill_tree(process)
+
+    stats = ProcessStats(
+        wall=time.perf_counter() - start,
+        script=None,
+        cpu_user=None,
+        cpu_system=None,
+        peak_rss=None,
+    )
+    return ProcessResult(
+        returncode=process.returncode,  # ty: ignore[invalid-argument-type]
+        stdout=stdout.decode("utf-8", errors="replace"),
+        stderr=stderr.decode("utf-8", errors="replace"),
+        stats=stats,
+        timed_out=timed_out,
+    )
+
+
+async def _communicate(
+    process: asyncio.subprocess.Process, log: TaskLog | None
+) -> tuple[bytes, bytes]:
+    """Wait for the process and return its output or stream it to the log."""
+    if log is None:
+        return await process.communicate()
+    stdout = cast("asyncio.StreamReader", process.stdout)
+    while chunk := await stdout.read(_CHUNK_SIZE):
+        log.write(chunk)
+    await process.wait()
+    return b"", b""
+
+
+async def _kill_tree(process: asyncio.subprocess.Process) -> None:
+    """Terminate a process and its children and kill them if they do not exit."""
+    if sys.platform == "win32":  # pragma: no cover
+        with contextlib.suppress(OSError):
+            subprocess.run(  # noqa: S603, ASYNC221
+                ["taskkill", "/F", "/T", "/PID", str(process.pid)],  # noqa: S607
+                capture_output=True,
+                check=False,
+            )
+        await process.wait()
+        return
+
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(process.pid, signal.SIGTERM)
+    with contextlib.suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(process.wait(), TERMINATE_TIMEOUT)
+    # Children which ignored the signal or outlived R are killed as well.
+    with contextlib.suppress(ProcessLookupError, PermissionError):
+        os.killpg(process.pid, signal.SIGKILL)
+    await process.wait()
@@ -0,0 +1,438 @@
+"""Contains the backends which execute many ready tasks at once.
+
+When a task which uses the ``batch`` backend is executed, all other tasks which are
+ready and use the same script, options, environment and R installation are executed
+with it in a single R process. With the ``async`` backend, all ready tasks are executed
+in their own Rscript processes which are supervised by one event loop. Every task is
+still set up, torn down and reported on its own.
+
+"""
+
+from __future__ import annotations
+
+import contextlib
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+from dataclasses import replace
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import cast
+
+from pytask import ExecutionReport
+from pytask import PathNode
+from pytask import PTask
+from pytask import PythonNode
+from pytask import Session
+from pytask import get_marks
+from pytask import hookimpl
+
+from pytask_r.aio import Command
+from pytask_r.aio import run_concurrently
+from pytask_r.environment import merge_environment
+from pytask_r.execute import restore_products
+from pytask_r.logs import TaskLog
+from pytask_r.pool import _WORKER_SCRIPT
+from pytask_r.profiling import ProcessStats
+from pytask_r.profiling import measures_resources
+from pytask_r.profiling import path_to_metrics
+from pytask_r.profiling import run_process
+from pytask_r.profiling import write_metrics
+from pytask_r.shared import create_rscript_command
+
+if TYPE_CHECKING:
+    from pytask_r.shared import RuntimeOptions
+
+__all__ = ["BatchResult", "run_batch"]
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """The result of executing a script as part of a batch.
+
+    Attributes
+    ----------
+    stdout
+        The output of the script.
+    stderr
+        The messages, warnings and errors of the script.
+    error
+        The error message if the script failed, otherwise ``None``.
+    stats
+        The resources used by the script if it succeeded.
+    log
+        The path to the log which received the output, if the output is logged.
+
+    """
+
+    stdout: str = ""
+    stderr: str = ""
+    error: str | None = None
+    stats: ProcessStats | None = None
+    log: Path | None = None
+
+
+def run_batch(  # noqa: PLR0913
+    executable: str,
+    preload: list[str],
+    items: list[tuple[Path, list[str]]],
+    *,
+    logs: list[TaskLog | None] | None = None,
+    timeout: float | None = None,
+    env: dict[str, str] | None = None,
+    vanilla: bool = False,
+) -> tuple[list[BatchResult], ProcessStats]:
+    """Execute scripts with their arguments in a single R process.
+
+    If a log is passed for a script, its output is copied to the log instead of being
+    returned and only the end of the output is returned if the script failed. If the
+    process runs longer than ``timeout`` seconds, it is killed and the scripts which
+    were not finished fail. ``env`` holds variables which are set for the process and
+    ``vanilla`` starts R with ``--vanilla``.
+
+    Returns the result of every script and the resources used by the whole process.
+
+    """
+    logs = logs or [None] * len(items)
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        manifest = folder / "manifest.txt"
+        lines = []
+        for i, (script, args) in enumerate(items):
+            fields = [
+                script.as_posix(),
+                folder.joinpath(f"{i}.stdout").as_posix(),
+                folder.joinpath(f"{i}.stderr").as_posix(),
+                *args,
+            ]
+            lines.append("\t".join(fields) + "\n")
+        manifest.write_text("".join(lines), encoding="utf-8")
+
+        cmd = [
+            *create_rscript_command(executable, vanilla=vanilla),
+            _WORKER_SCRIPT.as_posix(),
+            manifest.as_posix(),
+            "batch",
+        ]
+        try:
+            returncode, stats = run_process(
+                [*cmd, *preload],
+                check=False,
+                timeout=timeout,
+                env=merge_environment(env or {}),
+            )
+            reason = f"exited with code {returncode}"
+        except subprocess.TimeoutExpired:
+            returncode = None
+            stats = ProcessStats(
+                wall=timeout,  # ty: ignore[invalid-argument-type]
+                script=None,
+                cpu_user=None,
+                cpu_system=None,
+                peak_rss=None,
+            )
+            reason = f"timed out after {timeout:g} s"
+
+        results_path = manifest.with_name("manifest.txt.results")
+        answers = (
+            results_path.read_text(encoding="utf-8").splitlines()
+            if results_path.exists()
+            else []
+        )
+        greeting = answers[0] if answers else ""
+        if greeting != "ready":
+            message = greeting.partition("\t")[2] or f"The process {reason}."
+            error = f"The R process of the batch could not be started: {message}"
+            return [BatchResult(error=error) for _ in items], stats
+
+        results = []
+        for i, answer in enumerate(answers[1 : len(items) + 1]):
+            status, *fields = answer.split("\t")
+            paths = (folder / f"{i}.stdout", folder / f"{i}.stderr")
+            log = logs[i]
+            if log is None:
+                outputs = [
+                    path.read_text(encoding="utf-8", errors="replace")
+                    if path.exists()
+                    else ""
+                    for path in paths
+                ]
+            else:
+                for path in paths:
+                    log.write_file(path)
+                outputs = ["", log.tail if status != "ok" else ""]
+            log_path = None if log is None else log.path
+            if status == "ok":
+                elapsed, user, system = map(float, fields[:3])
+                script_stats = ProcessStats(
+                    wall=elapsed,
+                    script=elapsed,
+                    cpu_user=user,
+                    cpu_system=system,
+                    peak_rss=stats["peak_rss"],
+                )
+                results.append(BatchResult(*outputs, stats=script_stats, log=log_path))
+            else:
+                error = "\t".join(fields).strip()
+                results.append(BatchResult(*outputs, error=error, log=log_path))
+
+    error = f"The R process of the batch {reason} before the task was executed."
+    results.extend(BatchResult(error=error) for _ in items[len(results) :])
+    return results, stats
+
+
+def _batch_key(task: PTask) -> tuple[Any, ...] | None:
+    """Create the key of tasks which can be executed together."""
+    script = task.depends_on.get("_script")
+    options = task.depends_on.get("_options")
+    runtime = task.depends_on.get("_runtime")
+    if not (
+        get_marks(task, "r")
+        and isinstance(script, PathNode)
+        and isinstance(options, PythonNode)
+        and isinstance(runtime, PythonNode)
+    ):
+        return None
+    value = cast("RuntimeOptions", runtime.value)
+    if value["backend"] == "async":
+        return ("async",)
+    # A batch cannot be retried, so tasks with retries are executed on their own.
+    if value["backend"] != "batch" or value["retries"]:
+        return None
+    return (
+        "batch",
+        script.path,
+        tuple(cast("list[str]", options.value)),
+        value["executable"],
+        tuple(value["preload"]),
+        tuple(sorted(value["env"].items())),
+        value["vanilla"],
+    )
+
+
+def _find_batch(session: Session, task: PTask, key: tuple[Any, ...]) -> list[PTask]:
+    """Find other tasks which are ready and can be executed with the task.
+
+    Tasks marked with ``try_first`` join the batch first and tasks marked with
+    ``try_last`` last. With ``r_max_memory``, tasks only join while their memory fits.
+    Tasks which were already executed in another batch are waiting to be handed out by
+    the scheduler and do not join.
+
+    """
+    batch = [task]
+    scheduler = session.scheduler
+    dag = getattr(scheduler, "dag", None)
+    if dag is None:  # pragma: no cover
+        return batch
+    priorities = getattr(scheduler, "priorities", {})
+    admit = getattr(scheduler, "admit", None)
+    pending = session.config.get("_r_batch_pending", {})
+    # The number of processes of the async backend is limited while executing.
+    size = session.config["r_batch_size"] if key[0] == "batch" else None
+    ready = [
+        name
+        for name, degree in dag.in_degree()
+        if degree == 0 and name != task.signature and name not in pending
+    ]
+    ready.sort(key=lambda name: priorities.get(name, 0), reverse=True)
+    for name in ready:
+        if size is not None and len(batch) >= size:
+            break
+        other = session.dag.nodes[name]
+        if (
+            isinstance(other, PTask)
+            and _batch_key(other) == key
+            and (admit is None or admit(name))
+        ):
+            batch.append(other)
+    return batch
+
+
+@hookimpl(tryfirst=True)
+def pytask_execute_task_protocol(
+    session: Session, task: PTask
+) -> ExecutionReport | None:
+    """Execute the task together with other ready tasks.
+
+    All tasks of the batch are set up before the batch is executed. The other tasks are
+    only executed in the batch and are torn down and reported when the scheduler hands
+    them out, so that they pass through the regular hooks of the execution loop.
+
+    """
+    pending: dict[str, ExecutionReport | None] = session.config.setdefault(
+        "_r_batch_pending", {}
+    )
+    if task.signature in pending:
+        return _finish_task(session, task, pending.pop(task.signature))
+
+    key = _batch_key(task)
+    if key is None or session.config["dry_run"] or session.config["explain"]:
+        return None
+
+    batch = _find_batch(session, task, key)
+    reports: dict[str, ExecutionReport] = {}
+    to_run: list[PTask] = []
+    for member in batch:
+        session.hook.pytask_execute_task_log_start(session=session, task=member)
+        try:
+            session.hook.pytask_execute_task_setup(session=session, task=member)
+            restored = restore_products(session, member)
+        except Exception:  # noqa: BLE001
+            reports[member.signature] = ExecutionReport.from_task_and_exception(
+                member, sys.exc_info()
+            )
+        else:
+            if not restored:
+                to_run.append(member)
+
+    if to_run:
+        _execute_batch(session, to_run, key)
+
+    # The scheduler hands out the other tasks next, which releases their memory.
+    priorities = getattr(session.scheduler, "priorities", None)
+    for member in batch[1:]:
+        pending[member.signature] = reports.get(member.signature)
+        if priorities is not None:
+            priorities[member.signature] = sys.maxsize
+    return _finish_task(session, task, reports.get(task.signature))
+
+
+def _finish_task(
+    session: Session, task: PTask, report: ExecutionReport | None
+) -> ExecutionReport:
+    """Report on a task which was set up and, unless its setup failed, executed."""
+    if report is None:
+        report = _report_task(session, task)
+    session.hook.pytask_execute_task_process_report(session=session, report=report)
+    session.hook.pytask_execute_task_log_end(session=session, task=task, report=report)
+    return report
+
+
+def _execute_batch(session: Session, tasks: list[PTask], key: tuple[Any, ...]) -> None:
+    """Execute the tasks and store the result of each one in the task."""
+    with contextlib.ExitStack() as stack:
+        logs = [
+            stack.enter_context(TaskLog(task.depends_on["_log"].value, log_options))  # ty: ignore[unresolved-attribute]
+            if (log_options := task.depends_on["_runtime"].value["log"])  # ty: ignore[unresolved-attribute]
+            and "_log" in task.depends_on
+            else None
+            for task in tasks
+        ]
+        try:
+            if key[0] == "batch":
+                results = _run_batch(tasks, key, logs)
+            else:
+                results = _run_async(session, tasks, logs)
+        except KeyboardInterrupt:
+            session.should_stop = True
+            results = [BatchResult(error="The execution was interrupted.")] * len(tasks)
+
+    for task, result in zip(tasks, results, strict=True):
+        if result.stats is not None and measures_resources(session.config):
+            write_metrics(
+                path_to_metrics(task.depends_on["_serialized"].value),  # ty: ignore[unresolved-attribute]
+                key[0],
+                result.stats,
+            )
+        task.attributes["r_batch_result"] = result
+
+
+def _report_task(session: Session, task: PTask) -> ExecutionReport:
+    """Report on a task which was executed or restored and tear it down."""
+    try:
+        session.hook.pytask_execute_task(session=session, task=task)
+        session.hook.pytask_execute_task_teardown(session=session, task=task)
+    except Exception:  # noqa: BLE001
+        return ExecutionReport.from_task_and_exception(task, sys.exc_info())
+    return ExecutionReport.from_task(task)
+
+
+def _run_batch(
+    tasks: list[PTask], key: tuple[Any, ...], logs: list[TaskLog | None]
+) -> list[BatchResult]:
+    """Execute the tasks in one R process."""
+    items = [
+        (
+            task.depends_on["_script"].path,  # ty: ignore[unresolved-attribute]
+            [
+                *task.depends_on["_options"].value,  # ty: ignore[unresolved-attribute]
+                str(task.depends_on["_serialized"].value),  # ty: ignore[unresolved-attribute]
+            ],
+        )
+        for task in tasks
+    ]
+    # The batch may take as long as all of its tasks together.
+    timeouts = [task.depends_on["_runtime"].value["timeout"] for task in tasks]  # ty: ignore[unresolved-attribute]
+    timeout = None if None in timeouts else sum(timeouts)
+    results, stats = run_batch(
+        key[3],
+        list(key[4]),
+        items,
+        logs=logs,
+        timeout=timeout,
+        env=dict(key[5]),
+        vanilla=key[6],
+    )
+
+    # Attribute the time which was not spent in scripts to starting R.
+    script_time = sum(r.stats["wall"] for r in results if r.stats is not None)
+    startup = max(stats["wall"] - script_time, 0) / len(tasks)
+    return [
+        result
+        if result.stats is None
+        else replace(
+            result, stats={**result.stats, "wall": result.stats["wall"] + startup}
+        )
+        for result in results
+    ]
+
+
+def _run_async(
+    session: Session, tasks: list[PTask], logs: list[TaskLog | None]
+) -> list[BatchResult]:
+    """Execute every task in its own R process started by one event loop."""
+    commands = []
+    for task, log in zip(tasks, logs, strict=True):
+        runtime = task.depends_on["_runtime"].value  # ty: ignore[unresolved-attribute]
+        args = [
+            *create_rscript_command(runtime["executable"], vanilla=runtime["vanilla"]),
+            task.depends_on["_script"].path.as_posix(),  # ty: ignore[unresolved-attribute]
+            *task.depends_on["_options"].value,  # ty: ignore[unresolved-attribute]
+            str(task.depends_on["_serialized"].value),  # ty: ignore[unresolved-attribute]
+        ]
+        commands.append(
+            Command(
+                args=args,
+                log=log,
+                timeout=runtime["timeout"],
+                retries=runtime["retries"],
+                backoff=runtime["retry_backoff"],
+                env=merge_environment(runtime["env"]),
+            )
+        )
+
+    results = []
+    for result, command in zip(
+        run_concurrently(commands, session.config["r_async_workers"]),
+        commands,
+        strict=True,
+    ):
+        if result.timed_out:
+            error = f"Rscript timed out after {command.timeout:g} s."
+        elif result.returncode != 0:
+            error = f"Rscript exited with code {result.returncode}."
+        else:
+            error = None
+        log = command.log
+        results.append(
+            BatchResult(
+                stdout=result.stdout,
+                stderr=result.stderr if error is None or log is None else log.tail,
+                error=error,
+                stats=None if error else result.stats,
+                log=None if log is None else log.path,
+            )
+        )
+    return results
@@ -2,14 +2,21 @@
 
 from __future__ import annotations
 
+import contextlib
+import functools
+import importlib
 import subprocess
+import sys
+import time
 import warnings
 from pathlib import Path
+from typing import TYPE_CHECKING
 from typing import Any
 
 from pytask import Mark
 from pytask import NodeInfo
 from pytask import PathNode
+from pytask import PPathNode
 from pytask import PTask
 from pytask import PythonNode
 from pytask import Session
@@ -21,22 +28,118 @@ from pytask import is_task_function
 from pytask import parse_dependencies_from_task_function
 from pytask import parse_products_from_task_function
 from pytask import remove_marks
+from pytask.tree_util import tree_leaves
 
 from pytask_r.serialization import SERIALIZERS
 from pytask_r.serialization import create_path_to_serialized
+from pytask_r.shared import RuntimeOptions
+from pytask_r.shared import _to_list
+from pytask_r.shared import create_rscript_command
+from pytask_r.shared import parse_duration
+from pytask_r.shared import parse_environment
+from pytask_r.shared import parse_retries
+from pytask_r.shared import parse_size
+from pytask_r.shared import parse_threads
 from pytask_r.shared import r
 
+# Modules which are only needed to execute tasks or by some options are imported on
+# first use so that starting pytask stays fast.
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Mapping
+
+    from pytask_r.logs import TaskLog
+    from pytask_r.profiling import ProcessStats
+
 
 def run_r_script(
     _script: Path,
     _options: list[str],
     _serialized: Path,
+    _runtime: RuntimeOptions | None = None,
+    _log: Path | None = None,
     **kwargs: Any,  # noqa: ARG001
 ) -> None:
     """Run an R script."""
-    cmd = ["Rscript", _script.as_posix(), *_options, str(_serialized)]
-    print("Executing " + " ".join(cmd) + ".")  # noqa: T201
-    subprocess.run(cmd, check=True)  # noqa: S603
+    if _runtime is not None and _runtime["backend"] in ("pool", "fork"):
+        backend = _runtime["backend"]
+        print(f"Executing {_script.as_posix()} with the {backend} backend.")  # noqa: T201
+    else:
+        rscript = (
+            ["Rscript"]
+            if _runtime is None
+            else create_rscript_command(
+                _runtime["executable"], vanilla=_runtime["vanilla"]
+            )
+        )
+        cmd = [*rscript, _script.as_posix(), *_options, str(_serialized)]
+        print("Executing " + " ".join(cmd) + ".")  # noqa: T201
+
+    from pytask_r.logs import TaskLog  # noqa: PLC0415
+    from pytask_r.logs import report_log  # noqa: PLC0415
+
+    with contextlib.ExitStack() as stack:
+        log = (
+            None
+            if _runtime is None or _runtime["log"] is None or _log is None
+            else stack.enter_context(TaskLog(_log, _runtime["log"]))
+        )
+        try:
+            stats = _run_with_retries(
+                _script, [*_options, str(_serialized)], _runtime, log
+            )
+        except Exception:
+            if log is not None:
+                report_log(log, failed=True)
+            raise
+        if log is not None:
+            report_log(log, failed=False)
+
+    if _runtime is not None and _runtime["profile"]:
+        from pytask_r.profiling import path_to_metrics  # noqa: PLC0415
+        from pytask_r.profiling import write_metrics  # noqa: PLC0415
+
+        write_metrics(path_to_metrics(_serialized), _runtime["backend"], stats)
+
+
+def _run_with_retries(
+    script: Path, args: list[str], runtime: RuntimeOptions | None, log: TaskLog | None
+) -> ProcessStats:
+    """Run the R process of a task and retry it with a growing delay if it fails."""
+    from pytask_r.environment import merge_environment  # noqa: PLC0415
+    from pytask_r.profiling import run_process  # noqa: PLC0415
+
+    if runtime is None:
+        return run_process(["Rscript", script.as_posix(), *args], log=log)[1]
+
+    attempt = 0
+    while True:
+        try:
+            if runtime["backend"] in ("pool", "fork"):
+                from pytask_r.pool import get_pool  # noqa: PLC0415
+
+                return get_pool(runtime).run(script, args, log, runtime["timeout"])
+            rscript = create_rscript_command(
+                runtime["executable"], vanilla=runtime["vanilla"]
+            )
+            cmd = [*rscript, script.as_posix(), *args]
+            return run_process(
+                cmd,
+                log=log,
+                timeout=runtime["timeout"],
+                env=merge_environment(runtime["env"]),
+            )[1]
+        except (subprocess.SubprocessError, RuntimeError) as e:  # noqa: PERF203
+            if attempt >= runtime["retries"]:
+                raise
+            delay = runtime["retry_backoff"] * 2**attempt
+            message = f"{e} Retrying in {delay:g} s.\n"
+            if log is None:
+                sys.stderr.write(message)
+            else:
+                log.write(message.encode())
+            time.sleep(delay)
+            attempt += 1
 
 
 @hookimpl
@@ -60,13 +163,9 @@ def pytask_collect_task(
             )
             raise ValueError(msg)
 
-        mark = _parse_r_mark(
-            mark=marks[0],
-            default_options=session.config["r_options"],
-            default_serializer=session.config["r_serializer"],
-            default_suffix=session.config["r_suffix"],
-        )
-        script, options, _, suffix = r(**mark.kwargs)
+        mark = _parse_r_mark_once(session.config, marks[0])
+        script, options = mark.kwargs["script"], mark.kwargs["options"] or []
+        _register_execution_hooks(session.config)
 
         pytask_meta = getattr(obj, "pytask_meta", None)
         if pytask_meta is not None:
@@ -83,10 +182,10 @@ def pytask_collect_task(
             )
             script = Path(script)
 
-        script_node = session.hook.pytask_collect_node(
-            session=session,
-            path=path_nodes,
-            node_info=NodeInfo(
+        script_node = _collect_path_node(
+            session,
+            path_nodes,
+            NodeInfo(
                 arg_name="_script",
                 path=(),
                 value=script,
@@ -105,16 +204,14 @@ def pytask_collect_task(
             )
             raise ValueError(msg)
 
-        options_node = session.hook.pytask_collect_node(
-            session=session,
-            path=path_nodes,
-            node_info=NodeInfo(
+        options_node = _create_python_node(
+            NodeInfo(
                 arg_name="_options",
                 path=(),
                 value=options,
                 task_path=path,
                 task_name=name,
-            ),
+            )
         )
 
         dependencies = parse_dependencies_from_task_function(
@@ -128,6 +225,17 @@ def pytask_collect_task(
         dependencies["_script"] = script_node
         dependencies["_options"] = options_node
 
+        packages, scanned = _scan_script(session, script_node.path)
+        if session.config["r_scan"]:
+            dependencies["_scanned"] = _collect_scanned_nodes(
+                session,
+                path=path,
+                name=name,
+                path_nodes=path_nodes,
+                scanned=scanned,
+                products=products,
+            )
+
         markers = pytask_meta.markers if pytask_meta is not None else []
 
         task: PTask
@@ -149,26 +257,258 @@ def pytask_collect_task(
                 markers=markers,
             )
 
-        # Add serialized node that depends on the task id.
-        if suffix is None:  # pragma: no cover
-            msg = "Missing suffix for serialized R task."
-            raise ValueError(msg)
-        serialized = create_path_to_serialized(task, suffix)
-        serialized_node = session.hook.pytask_collect_node(
-            session=session,
-            path=path_nodes,
-            node_info=NodeInfo(
-                arg_name="_serialized",
+        _collect_execution_nodes(
+            session, task, path=path, name=name, path_nodes=path_nodes, mark=mark
+        )
+
+        packages = packages | set(mark.kwargs.get("packages", []))
+        runtime: RuntimeOptions = task.depends_on["_runtime"].value  # ty: ignore[unresolved-attribute]
+        if session.config["r_fingerprint"]:
+            task.depends_on["_fingerprint"] = _collect_fingerprint_node(
+                session, path, name, packages, runtime
+            )
+        elif runtime["cache"]:
+            from pytask_r.toolchain import register_packages  # noqa: PLC0415
+
+            # The versions of the packages are part of the key of the output cache.
+            register_packages(
+                session.config,
+                sorted(packages),
+                env=runtime["env"],
+                vanilla=runtime["vanilla"],
+            )
+            task.attributes["r_packages"] = sorted(packages)
+
+        return task
+    return None
+
+
+def _register_execution_hooks(config: dict[str, Any]) -> None:
+    """Register the hook implementations which execute R tasks once per session.
+
+    The modules are only imported when the first R task is collected so that projects
+    without R tasks do not pay for importing them.
+
+    """
+    if config.get("_r_execution_hooks") or "pm" not in config:
+        return
+
+    pm = config["pm"]
+    for name in ("pytask_r.batch", "pytask_r.execute", "pytask_r.scheduling"):
+        if not pm.has_plugin(name):
+            pm.register(importlib.import_module(name))
+    config["_r_execution_hooks"] = True
+
+
+def _collect_execution_nodes(  # noqa: PLR0913
+    session: Session,
+    task: PTask,
+    *,
+    path: Path | None,
+    name: str,
+    path_nodes: Path,
+    mark: Mark,
+) -> None:
+    """Collect the nodes which are needed to execute the task but are not hashed."""
+    suffix = mark.kwargs["suffix"]
+    # Add serialized node that depends on the task id.
+    if suffix is None:  # pragma: no cover
+        msg = "Missing suffix for serialized R task."
+        raise ValueError(msg)
+    serialized = create_path_to_serialized(task, suffix)
+    task.depends_on["_serialized"] = _create_python_node(
+        NodeInfo(
+            arg_name="_serialized",
+            path=(),
+            value=serialized,
+            task_path=path,
+            task_name=name,
+        )
+    )
+    task.depends_on["_runtime"] = _create_python_node(
+        NodeInfo(
+            arg_name="_runtime",
+            path=(),
+            value=_get_runtime_options(session.config, mark, path_nodes),
+            task_path=path,
+            task_name=name,
+        )
+    )
+    if session.config["r_log_output"]:
+        from pytask_r.logs import create_path_to_log  # noqa: PLC0415
+
+        task.depends_on["_log"] = _create_python_node(
+            NodeInfo(
+                arg_name="_log",
                 path=(),
-                value=PythonNode(value=serialized),
+                value=create_path_to_log(session.config["root"], task.name),
+                task_path=path,
+                task_name=name,
+            )
+        )
+
+
+def _collect_path_node(session: Session, path_nodes: Path, node_info: NodeInfo) -> Any:
+    """Collect the node of a path once and share it between all tasks."""
+    nodes = session.config.setdefault("_r_path_nodes", {})
+    key = (path_nodes, node_info.value)
+    if key not in nodes:
+        nodes[key] = session.hook.pytask_collect_node(
+            session=session, path=path_nodes, node_info=node_info
+        )
+    return nodes[key]
+
+
+def _create_python_node(node_info: NodeInfo, **kwargs: Any) -> PythonNode:
+    """Create the node of a value which pytask-r passes to the task.
+
+    The values need no parsing, and creating the node directly is much faster than
+    dispatching ``pytask_collect_node`` for thousands of tasks.
+
+    """
+    return PythonNode(
+        value=node_info.value,
+        name=f"{node_info.task_name}::{node_info.arg_name}",
+        node_info=node_info,
+        **kwargs,
+    )
+
+
+def _collect_scanned_nodes(  # noqa: PLR0913
+    session: Session,
+    *,
+    path: Path | None,
+    name: str,
+    path_nodes: Path,
+    scanned: list[Path],
+    products: Any,
+) -> list[Any]:
+    """Collect the files found by scanning the script which are not products."""
+    products_paths = {
+        node.path.resolve()
+        for node in tree_leaves(products)
+        if isinstance(node, PPathNode)
+    }
+    return [
+        _collect_path_node(
+            session,
+            path_nodes,
+            NodeInfo(
+                arg_name="_scanned",
+                path=(i,),
+                value=scanned_path,
                 task_path=path,
                 task_name=name,
             ),
         )
-        task.depends_on["_serialized"] = serialized_node
+        for i, scanned_path in enumerate(p for p in scanned if p not in products_paths)
+    ]
+
+
+def _collect_fingerprint_node(
+    session: Session,
+    path: Path | None,
+    name: str,
+    packages: set[str],
+    runtime: RuntimeOptions,
+) -> PythonNode:
+    """Collect the node which fingerprints R and the packages used by the task."""
+    from pytask_r.toolchain import register_packages  # noqa: PLC0415
+
+    register_packages(
+        session.config, sorted(packages), env=runtime["env"], vanilla=runtime["vanilla"]
+    )
+    # The fingerprint is computed once per session before the task is executed.
+    return _create_python_node(
+        NodeInfo(
+            arg_name="_fingerprint",
+            path=(),
+            value="",
+            task_path=path,
+            task_name=name,
+        ),
+        hash=True,
+        attributes={"packages": sorted(packages)},
+    )
+
+
+def _parse_strings(value: Any) -> list[str]:
+    return list(map(str, _to_list(value)))
+
+
+def _parse_boolean(value: Any, name: str) -> bool:
+    if not isinstance(value, bool):
+        msg = f"{name!r} is {value!r} and not a boolean."
+        raise TypeError(msg)
+    return value
+
+
+# Optional arguments of the mark which are only kept if they are set.
+_OPTIONAL_MARK_ARGUMENTS: dict[str, Callable[[Any], Any]] = {
+    "packages": _parse_strings,
+    "memory": parse_size,
+    "timeout": parse_duration,
+    "retries": parse_retries,
+    "threads": parse_threads,
+    "env": parse_environment,
+    "r_libs": _parse_strings,
+    "vanilla": functools.partial(_parse_boolean, name="vanilla"),
+    "cache": functools.partial(_parse_boolean, name="cache"),
+}
 
-        return task
-    return None
+
+def _parse_r_mark_once(config: dict[str, Any], mark: Mark) -> Mark:
+    """Parse an R mark and reuse the result for marks with the same arguments.
+
+    Tasks created in a loop usually share the arguments of the mark. Marks whose
+    arguments cannot be hashed are parsed every time.
+
+    """
+    key = _freeze(mark.kwargs)
+    cache = config.setdefault("_r_marks", {})
+    if key is not None and key in cache:
+        return cache[key]
+    parsed = _parse_r_mark(
+        mark=mark,
+        default_options=config["r_options"],
+        default_serializer=config["r_serializer"],
+        default_suffix=config["r_suffix"],
+    )
+    if key is not None:
+        cache[key] = parsed
+    return parsed
+
+
+def _freeze(value: Any) -> Any:
+    """Convert a value to a hashable key or return ``None`` if it is not possible.
+
+    The types are part of the key so that, for example, ``True`` and ``1`` differ.
+
+    Examples
+    --------
+    >>> _freeze({"options": ["--a"]}) == _freeze({"options": ["--a"]})
+    True
+    >>> _freeze({"vanilla": True}) == _freeze({"vanilla": 1})
+    False
+    >>> _freeze({"env": {"A": bytearray()}}) is None
+    True
+
+    """
+    if isinstance(value, dict):
+        items = [(k, _freeze(v)) for k, v in value.items()]
+        if any(v is None for _, v in items):
+            return None
+        return dict, tuple(items)
+    if isinstance(value, (list, tuple)):
+        items = [_freeze(v) for v in value]
+        if any(v is None for v in items):
+            return None
+        return type(value), tuple(items)
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return type(value), value
 
 
 def _parse_r_mark(
@@ -196,4 +536,94 @@ def _parse_r_mark(
     )
     parsed_kwargs["suffix"] = suffix or proposed_suffix
 
+    for arg_name, parse in _OPTIONAL_MARK_ARGUMENTS.items():
+        if mark.kwargs.get(arg_name) is not None:
+            parsed_kwargs[arg_name] = parse(mark.kwargs[arg_name])
+
     return Mark("r", (), parsed_kwargs)
+
+
+def _scan_script(session: Session, script: Path) -> tuple[set[str], list[Path]]:
+    """Scan the script for packages and files if any feature needs them."""
+    if not (session.config["r_scan"] or session.config["r_fingerprint"]):
+        return set(), []
+    from pytask_r.scan import ScanCache  # noqa: PLC0415
+    from pytask_r.scan import scan_script  # noqa: PLC0415
+
+    if "_r_scan_cache" not in session.config:
+        session.config["_r_scan_cache"] = ScanCache(session.config["root"])
+    # Tasks created in a loop share the script which is only scanned once.
+    scans = session.config.setdefault("_r_scans", {})
+    if script not in scans:
+        scans[script] = scan_script(script, session.config["_r_scan_cache"])
+    return scans[script]
+
+
+@hookimpl
+def pytask_collect_modify_tasks(session: Session) -> None:
+    """Store the results of scanning R scripts for the next build."""
+    if "_r_scan_cache" in session.config:
+        session.config["_r_scan_cache"].save()
+
+
+def _get_runtime_options(
+    config: dict[str, Any], mark: Mark, folder: Path
+) -> RuntimeOptions:
+    """Create the runtime options once for all tasks with the same mark and folder."""
+    cache = config.setdefault("_r_runtime_options", {})
+    # The mark is stored with the options so that its id is not reused.
+    _, options = cache.setdefault(id(mark), (mark, {}))
+    if folder not in options:
+        options[folder] = _create_runtime_options(config, mark.kwargs, folder)
+    return options[folder]
+
+
+def _create_runtime_options(
+    config: dict[str, Any], mark_kwargs: Mapping[str, Any], folder: Path
+) -> RuntimeOptions:
+    """Create the options which control how the R process of a task is run.
+
+    Relative library trees of the task are resolved against ``folder`` and the ones of
+    the configuration against the root of the project.
+
+    """
+    from pytask_r.environment import create_environment  # noqa: PLC0415
+    from pytask_r.environment import get_default_threads  # noqa: PLC0415
+    from pytask_r.profiling import measures_resources  # noqa: PLC0415
+    from pytask_r.toolchain import find_r_executable  # noqa: PLC0415
+
+    threads = mark_kwargs.get("threads", config["r_threads"])
+    r_libs = (
+        [folder.joinpath(path).resolve() for path in mark_kwargs["r_libs"]]
+        if "r_libs" in mark_kwargs
+        else [config["root"].joinpath(path).resolve() for path in config["r_libs"]]
+    )
+    return {
+        "executable": find_r_executable(config) or config["r_executable"] or "Rscript",
+        "backend": config["r_backend"],
+        "preload": config["r_preload"],
+        "pool_size": config["r_pool_size"],
+        "pool_max_tasks": config["r_pool_max_tasks"],
+        "pool_max_memory": config["r_pool_max_memory"],
+        "profile": measures_resources(config),
+        "log": (
+            {
+                "max_size": config["r_log_max_size"],
+                "backups": config["r_log_backups"],
+                "tail": config["r_log_tail"],
+            }
+            if config["r_log_output"]
+            else None
+        ),
+        "timeout": mark_kwargs.get("timeout", config["r_timeout"]),
+        "retries": mark_kwargs.get("retries", config["r_retries"]),
+        "retry_backoff": config["r_retry_backoff"],
+        "env": create_environment(
+            threads or get_default_threads(config),
+            explicit=threads is not None,
+            variables={**config["r_env"], **mark_kwargs.get("env", {})},
+            r_libs=r_libs,
+        ),
+        "vanilla": mark_kwargs.get("vanilla", config["r_vanilla"]),
+        "cache": mark_kwargs.get("cache", config["r_cache"]),
+    }
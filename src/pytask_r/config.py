@@ -2,11 +2,22 @@
 
 from __future__ import annotations
 
+import os
+import sys
 from typing import Any
 
 from pytask import hookimpl
 
+from pytask_r.serialization import COMPRESSIONS
+from pytask_r.serialization import FSYNC_MODES
 from pytask_r.serialization import SERIALIZERS
+from pytask_r.serialization import is_compression_available
+from pytask_r.shared import parse_duration
+from pytask_r.shared import parse_environment
+from pytask_r.shared import parse_retries
+from pytask_r.shared import parse_size
+
+BACKENDS = ("subprocess", "pool", "fork", "batch", "async")
 
 
 @hookimpl
@@ -21,14 +32,117 @@ def pytask_parse_config(config: dict[str, Any]) -> None:
         )
         raise ValueError(msg)
     config["r_suffix"] = config.get("r_suffix", ".json")
-    config["r_options"] = _parse_value_or_whitespace_option(config.get("r_options"))
+    config["r_compression"] = _parse_compression(config.get("r_compression"))
+    config["r_fsync"] = _parse_choice(config, "r_fsync", FSYNC_MODES, "off")
+    config["r_options"] = _parse_value_or_whitespace_option(
+        config.get("r_options"), "r_options"
+    )
+
+    config["r_executable"] = config.get("r_executable")
+    config["r_backend"] = _parse_choice(config, "r_backend", BACKENDS, "subprocess")
+    if config["r_backend"] == "fork" and sys.platform == "win32":
+        msg = "'r_backend' cannot be 'fork' on Windows. Use 'pool' instead."
+        raise ValueError(msg)
+    config["r_preload"] = (
+        _parse_value_or_whitespace_option(config.get("r_preload"), "r_preload") or []
+    )
+    config["r_pool_size"] = _parse_positive_integer(config, "r_pool_size", None)
+    config["r_pool_max_tasks"] = _parse_positive_integer(
+        config, "r_pool_max_tasks", 100
+    )
+    config["r_pool_max_memory"] = parse_size(config.get("r_pool_max_memory"))
+    config["r_batch_size"] = _parse_positive_integer(config, "r_batch_size", 100)
+    config["r_async_workers"] = _parse_positive_integer(
+        config, "r_async_workers", os.cpu_count() or 1
+    )
+    config["r_sidecar_threshold"] = parse_size(config.get("r_sidecar_threshold"))
+    config["r_fingerprint"] = _parse_boolean(config, "r_fingerprint", default=False)
+    config["r_scan"] = _parse_boolean(config, "r_scan", default=False)
+    config["r_profile"] = _parse_boolean(config, "r_profile", default=False)
+    config["r_max_memory"] = parse_size(config.get("r_max_memory"))
+    config["r_log_output"] = _parse_boolean(config, "r_log_output", default=False)
+    config["r_log_max_size"] = parse_size(config.get("r_log_max_size", "10MB"))
+    config["r_log_backups"] = _parse_positive_integer(config, "r_log_backups", 3)
+    config["r_log_tail"] = parse_size(config.get("r_log_tail", "64KB"))
+    config["r_timeout"] = parse_duration(config.get("r_timeout"))
+    config["r_retries"] = parse_retries(config.get("r_retries", 0))
+    config["r_retry_backoff"] = parse_duration(config.get("r_retry_backoff", 1))
+    config["r_threads"] = _parse_positive_integer(config, "r_threads", None)
+    config["r_env"] = parse_environment(config.get("r_env", {}))
+    config["r_libs"] = (
+        _parse_value_or_whitespace_option(config.get("r_libs"), "r_libs") or []
+    )
+    config["r_vanilla"] = _parse_boolean(config, "r_vanilla", default=False)
+    config["r_cache"] = _parse_boolean(config, "r_cache", default=False)
+    config["r_cache_dir"] = config.get("r_cache_dir")
+    config["r_cache_max_size"] = parse_size(config.get("r_cache_max_size", "10GB"))
+    config["r_cache_remote"] = config.get("r_cache_remote")
+    if config["r_cache_remote"] is not None and not isinstance(
+        config["r_cache_remote"], str
+    ):
+        msg = f"'r_cache_remote' is {config['r_cache_remote']} and not a string."
+        raise ValueError(msg)
+    config["r_cache_remote_workers"] = _parse_positive_integer(
+        config, "r_cache_remote_workers", 8
+    )
+    config["r_cache_remote_chunk_size"] = parse_size(
+        config.get("r_cache_remote_chunk_size", "8MB")
+    )
+
+
+def _parse_compression(value: Any) -> str | None:
+    """Parse the compression of serialized files."""
+    if value is None:
+        return None
+    if value not in COMPRESSIONS:
+        msg = f"'r_compression' is {value} and not one of {list(COMPRESSIONS)}."
+        raise ValueError(msg)
+    if not is_compression_available(value):
+        msg = f"'r_compression' is {value}, which requires the package zstandard."
+        raise ValueError(msg)
+    return value
 
 
-def _parse_value_or_whitespace_option(value: Any) -> list[str] | None:
+def _parse_choice(
+    config: dict[str, Any], name: str, choices: tuple[str, ...], default: str
+) -> str:
+    """Parse an option which holds one of several choices."""
+    value = config.get(name, default)
+    if value not in choices:
+        msg = f"{name!r} is {value} and not one of {list(choices)}."
+        raise ValueError(msg)
+    return value
+
+
+def _parse_value_or_whitespace_option(value: Any, name: str) -> list[str] | None:
     """Parse option which can hold a single value or values separated by new lines."""
     if value is None:
         return None
     if isinstance(value, list):
         return list(map(str, value))
-    msg = f"'r_options' is {value} and not a list."
+    msg = f"{name!r} is {value} and not a list."
     raise ValueError(msg)
+
+
+def _parse_boolean(config: dict[str, Any], name: str, *, default: bool) -> bool:
+    """Parse an option which holds a boolean."""
+    value = config.get(name, default)
+    if not isinstance(value, bool):
+        msg = f"{name!r} is {value} and not a boolean."
+        raise TypeError(msg)
+    return value
+
+
+def _parse_positive_integer(
+    config: dict[str, Any], name: str, default: int | None
+) -> int | None:
+    """Parse an option which holds a positive integer or nothing."""
+    value = config.get(name, default)
+    if value is None:
+        return None
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        msg = f"{name!r} is {value} and not a positive integer."
+        raise ValueError(msg)
+    return value
@@ -0,0 +1,108 @@
+"""Contains functions to create the environment of R processes.
+
+The environment of a task consists of variables from the configuration and the
+decorator, the library trees in ``R_LIBS`` and the number of threads.
+
+When several R tasks run at the same time, every R process would start as many BLAS,
+OpenMP and data.table threads as there are cores and oversubscribe the machine. The
+number of threads of a task is therefore limited to its share of the cores unless it is
+set explicitly. If only one R process runs at a time, nothing is limited.
+
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+from typing import TYPE_CHECKING
+from typing import Any
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+__all__ = [
+    "THREAD_VARIABLES",
+    "create_environment",
+    "get_default_threads",
+    "merge_environment",
+]
+
+THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "R_DATATABLE_NUM_THREADS",
+)
+"""The environment variables which control the number of threads used by R."""
+
+
+def get_default_threads(config: dict[str, Any]) -> int | None:
+    """Get the threads of a task as its share of the cores.
+
+    The cores are divided by the number of R processes running at the same time which
+    is ``r_async_workers`` with the async backend and the number of workers of
+    pytask-parallel otherwise. Returns ``None`` if only one R process runs at a time so
+    that R and its packages use their own defaults.
+
+    """
+    if config["r_backend"] == "async":
+        workers = config["r_async_workers"]
+    else:
+        n_workers = config.get("n_workers", 1)
+        workers = n_workers if isinstance(n_workers, int) else 1
+    if workers <= 1:
+        return None
+    return max((os.cpu_count() or 1) // workers, 1)
+
+
+def create_environment(
+    threads: int | None,
+    *,
+    explicit: bool,
+    variables: dict[str, str] | None = None,
+    r_libs: list[Path] | None = None,
+) -> dict[str, str]:
+    """Create the environment variables which are set for the R process of a task.
+
+    Thread variables which are already set in the environment of pytask are only
+    overridden if the threads were set explicitly, and none are set if ``threads`` is
+    ``None``. Other variables take precedence over the threads, and library trees are
+    joined into ``R_LIBS``.
+
+    Examples
+    --------
+    >>> create_environment(4, explicit=True)["OMP_NUM_THREADS"]
+    '4'
+    >>> create_environment(None, explicit=False)
+    {}
+
+    """
+    env = (
+        {}
+        if threads is None
+        else {
+            name: str(threads)
+            for name in THREAD_VARIABLES
+            if explicit or name not in os.environ
+        }
+    )
+    env.update(variables or {})
+    if r_libs:
+        env["R_LIBS"] = os.pathsep.join(str(path) for path in r_libs)
+    return env
+
+
+def merge_environment(env: dict[str, str]) -> dict[str, str] | None:
+    """Merge variables into the environment of pytask for a subprocess.
+
+    The merged environment is built once per unique set of variables and shared by all
+    tasks which use it, so it must not be modified. Returns ``None`` if there is nothing
+    to change so that the process inherits the environment.
+
+    """
+    return _merge_environment(tuple(sorted(env.items()))) if env else None
+
+
+@functools.lru_cache(maxsize=64)
+def _merge_environment(items: tuple[tuple[str, str], ...]) -> dict[str, str]:
+    return {**os.environ, **dict(items)}
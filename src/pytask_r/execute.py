@@ -2,29 +2,77 @@
 
 from __future__ import annotations
 
-import shutil
+import contextlib
+import sys
+from concurrent.futures import Future
 from pathlib import Path
+from typing import TYPE_CHECKING
 from typing import Any
+from typing import cast
+from urllib.parse import urlsplit
 
-from pytask import PPathNode
+from pytask import ExecutionReport
 from pytask import PTask
 from pytask import PythonNode
+from pytask import Session
+from pytask import TaskOutcome
+from pytask import console
 from pytask import get_marks
 from pytask import hookimpl
 from pytask.tree_util import tree_map
 
+from pytask_r.outputs import OutputCache
+from pytask_r.outputs import create_cache_key
+from pytask_r.outputs import get_default_cache_dir
+from pytask_r.outputs import get_product_paths
+from pytask_r.pool import shutdown_pools
+from pytask_r.profiling import MetricsReport
+from pytask_r.profiling import TaskMetrics
+from pytask_r.profiling import measures_resources
+from pytask_r.profiling import path_to_metrics
+from pytask_r.profiling import read_metrics
+from pytask_r.serialization import COMPRESSIONS
+from pytask_r.serialization import FileSync
+from pytask_r.serialization import SerializationCache
+from pytask_r.serialization import digest_keyword_arguments
+from pytask_r.serialization import remove_orphaned_serialized
 from pytask_r.serialization import serialize_keyword_arguments
+from pytask_r.shared import is_path_node
 from pytask_r.shared import r
+from pytask_r.sidecar import extract_sidecars
+from pytask_r.stores import ArtifactStore
+from pytask_r.stores import StoreOptions
+from pytask_r.stores import create_store
+from pytask_r.toolchain import find_r_executable
+from pytask_r.toolchain import fingerprint_r
+from pytask_r.toolchain import get_r_info
+
+if TYPE_CHECKING:
+    from pytask_r.shared import RuntimeOptions
+
+# Dependencies which pytask-r adds to R tasks and which are not passed to the script.
+_INTERNAL_ARGUMENTS = frozenset(
+    (
+        "_script",
+        "_options",
+        "_serialized",
+        "_runtime",
+        "_fingerprint",
+        "_scanned",
+        "_log",
+    )
+)
 
 
 @hookimpl
-def pytask_execute_task_setup(task: PTask) -> None:
+def pytask_execute_task_setup(session: Session, task: PTask) -> None:
     """Perform some checks when a task marked with the r marker is executed."""
     marks = get_marks(task, "r")
     if marks:
-        if shutil.which("Rscript") is None:
+        if find_r_executable(session.config) is None:
             msg = (
-                "Rscript is needed to run R scripts, but it is not found on your PATH."
+                "Rscript is needed to run R scripts, but it is not found on your PATH "
+                "or at the location configured with 'r_executable'."
             )
             raise RuntimeError(msg)
 
@@ -32,9 +80,16 @@ def pytask_execute_task_setup(task: PTask) -> None:
             msg = "Only one R marker is allowed per task."
             raise ValueError(msg)
 
-        _, _, serializer, _ = r(**marks[0].kwargs)
-        if serializer is None:  # pragma: no cover
-            msg = "Missing serializer for R task."
+        # Set the fingerprint before pytask compares the states of the dependencies.
+        fingerprint_node = task.depends_on.get("_fingerprint")
+        if isinstance(fingerprint_node, PythonNode):
+            fingerprint_node.value = _fingerprint_r(
+                session, task, fingerprint_node.attributes["packages"]
+            )
+
+        _, _, serializer, suffix = r(**marks[0].kwargs)
+        if serializer is None or suffix is None:  # pragma: no cover
+            msg = "Missing serializer or suffix for R task."
             raise ValueError(msg)
 
         serialized_node = task.depends_on["_serialized"]
@@ -47,26 +102,296 @@ def pytask_execute_task_setup(task: PTask) -> None:
             )
             raise TypeError(msg)
 
-        path_to_serialized = serialized_node.value
-        path_to_serialized.parent.mkdir(parents=True, exist_ok=True)
-        kwargs = collect_keyword_arguments(task)
-        serialize_keyword_arguments(serializer, path_to_serialized, kwargs)
+        cache = _get_serialization_cache(session)
+        sync = _get_file_sync(session)
+        folder = serialized_node.value.parent
+        cache.create_folder(folder)
+
+        threshold = session.config["r_sidecar_threshold"]
+        compression = session.config["r_compression"]
+        suffix += COMPRESSIONS.get(compression, "")
+        # The digest only describes the nodes, so unchanged arguments are not loaded.
+        digest = digest_keyword_arguments(
+            serializer, suffix, _collect_argument_nodes(task), threshold
+        )
+        cached = None if digest is None else cache.get(task, folder, digest)
+        if cached is None:
+            kwargs = collect_keyword_arguments(task)
+            sidecars: list[Path] = []
+            if threshold is not None:
+                kwargs, sidecars = extract_sidecars(kwargs, folder, threshold, sync)
+            path_to_serialized = serialize_keyword_arguments(
+                serializer, task, suffix, kwargs, compression=compression, sync=sync
+            )
+            if digest is not None:
+                cache.set(task, folder, digest, path_to_serialized, sidecars)
+        else:
+            path_to_serialized, sidecars = cached
+        task.attributes["r_sidecars"] = sidecars
+        serialized_node.value = path_to_serialized
+
+
+@hookimpl(tryfirst=True)
+def pytask_execute_task(session: Session, task: PTask) -> Any:
+    """Report the result of a task which was executed together with other tasks.
+
+    Tasks whose products are restored from the output cache are not executed at all.
+
+    """
+    result = task.attributes.pop("r_batch_result", None)
+    if result is None:
+        if not restore_products(session, task):
+            return None
+        message = f"Restored the products of {task.name} from the output cache.\n"
+        if _is_executed_in_parallel(session):
+            return _create_parallel_result(message)
+        sys.stdout.write(message)
+        return True
+    script = task.depends_on["_script"].path  # ty: ignore[unresolved-attribute]
+    backend = task.depends_on["_runtime"].value["backend"]  # ty: ignore[unresolved-attribute]
+    how = "in a batch" if backend == "batch" else "asynchronously"
+    print(f"Executing {script.as_posix()} {how}.")  # noqa: T201
+    sys.stdout.write(result.stdout)
+    sys.stderr.write(result.stderr)
+    if result.log is not None:
+        print(f"The output of R is written to {result.log.as_posix()}.")  # noqa: T201
+    if result.error is not None:
+        msg = f"Executing {script} {how} failed with: {result.error}"
+        raise RuntimeError(msg)
+    return True
+
+
+def restore_products(session: Session, task: PTask) -> bool:
+    """Restore the products of an R task from the output cache if it is enabled.
+
+    Returns whether the products were restored so that R does not need to run. If they
+    were not, the key is remembered to store the products once the task succeeded.
+
+    """
+    if task.attributes.get("r_restored"):
+        return True
+    runtime = task.depends_on.get("_runtime")
+    if not (
+        isinstance(runtime, PythonNode)
+        and cast("RuntimeOptions", runtime.value)["cache"]
+    ):
+        return False
+    products = get_product_paths(task)
+    if products is None:
+        return False
+    key = create_cache_key(
+        task, session.config["root"], _get_fingerprint(session, task)
+    )
+    if key is None:
+        return False
+    if _get_output_cache(session).restore(key, products, session.config["root"]):
+        task.attributes["r_restored"] = True
+        return True
+    task.attributes["r_cache_key"] = key
+    return False
+
+
+def _get_fingerprint(session: Session, task: PTask) -> str:
+    """Get the fingerprint of R and the packages used by the task."""
+    node = task.depends_on.get("_fingerprint")
+    if isinstance(node, PythonNode) and node.value:
+        return cast("str", node.value)
+    return _fingerprint_r(session, task, task.attributes.get("r_packages", []))
+
+
+def _fingerprint_r(session: Session, task: PTask, packages: list[str]) -> str:
+    """Fingerprint R and the versions of the packages in the environment of the task."""
+    runtime = task.depends_on["_runtime"].value  # ty: ignore[unresolved-attribute]
+    return fingerprint_r(
+        session.config, packages, env=runtime["env"], vanilla=runtime["vanilla"]
+    )
+
+
+def _is_executed_in_parallel(session: Session) -> bool:
+    """Check whether pytask-parallel executes the tasks."""
+    module = sys.modules.get("pytask_parallel.execute")
+    return module is not None and session.config["pm"].is_registered(module)
+
+
+def _create_parallel_result(stdout: str) -> Future[Any]:
+    """Create the result pytask-parallel expects for a task which was not executed."""
+    from pytask_parallel.wrappers import WrapperResult  # noqa: PLC0415
+
+    future: Future[Any] = Future()
+    future.set_result(
+        WrapperResult(
+            carry_over_products=None,
+            warning_reports=[],
+            exc_info=None,
+            stdout=stdout,
+            stderr="",
+        )
+    )
+    return future
 
 
 def collect_keyword_arguments(task: PTask) -> dict[str, Any]:
-    """Collect keyword arguments for function."""
-    # Remove all kwargs from the task so that they are not passed to the function.
-    kwargs: dict[str, Any] = {
-        **tree_map(
-            lambda x: str(x.path) if isinstance(x, PPathNode) else x.value,
-            task.depends_on,  # ty: ignore[invalid-argument-type]
-        ),
-        **tree_map(
-            lambda x: str(x.path) if isinstance(x, PPathNode) else x.value,
-            task.produces,  # ty: ignore[invalid-argument-type]
-        ),
+    """Collect keyword arguments for function.
+
+    Internal dependencies are skipped before the trees are traversed, so that, for
+    example, the files found by scanning the script are not converted in vain.
+
+    """
+    return {
+        name: tree_map(_load_node, node)
+        for name, node in _collect_argument_nodes(task).items()
+    }
+
+
+def _collect_argument_nodes(task: PTask) -> dict[str, Any]:
+    """Collect the nodes of the keyword arguments."""
+    nodes: dict[str, Any] = {
+        name: node
+        for name, node in task.depends_on.items()
+        if name not in _INTERNAL_ARGUMENTS
     }
-    kwargs.pop("_script")
-    kwargs.pop("_options")
-    kwargs.pop("_serialized")
-    return kwargs
+    nodes.update(task.produces)
+    return nodes
+
+
+def _load_node(node: Any) -> Any:
+    return str(node.path) if is_path_node(node) else node.value
+
+
+@hookimpl(tryfirst=True)
+def pytask_execute_log_end(session: Session) -> None:
+    """Remove serialized arguments which are not used and evict the output cache."""
+    cache = _get_serialization_cache(session)
+    paths_in_use = []
+    for task in session.tasks:
+        node = task.depends_on.get("_serialized")
+        if (
+            get_marks(task, "r")
+            and isinstance(node, PythonNode)
+            and isinstance(node.value, Path)
+        ):
+            paths_in_use.append(node.value)
+            paths_in_use.extend(task.attributes.get("r_sidecars", []))
+            # Skipped and deselected tasks keep the files of their last execution.
+            paths_in_use.extend(cache.referenced(task, node.value.parent))
+    remove_orphaned_serialized(paths_in_use)
+    sync = _get_file_sync(session)
+    cache.save(sync)
+    # Evict once instead of after every stored entry since it scans the whole cache.
+    if "_r_output_cache" in session.config:
+        session.config["_r_output_cache"].evict()
+    sync.flush()
+
+    if measures_resources(session.config):
+        report = _get_metrics_report(session)
+        report.save()
+        if session.config["r_profile"] and report.executed:
+            console.print()
+            console.print(report.create_table())
+
+
+@hookimpl
+def pytask_execute_task_process_report(
+    session: Session, report: ExecutionReport
+) -> None:
+    """Store the products of an R task in the output cache and collect its resources."""
+    task = report.task
+    task.attributes.pop("r_restored", None)
+    key = task.attributes.pop("r_cache_key", None)
+    if key is not None and report.outcome == TaskOutcome.SUCCESS:
+        _get_output_cache(session).store(
+            key,
+            get_product_paths(task),  # ty: ignore[invalid-argument-type]
+            session.config["root"],
+        )
+
+    node = task.depends_on.get("_serialized")
+    if not (
+        measures_resources(session.config)
+        and get_marks(task, "r")
+        and isinstance(node, PythonNode)
+        and isinstance(node.value, Path)
+    ):
+        return
+    stats = read_metrics(path_to_metrics(node.value))
+    if stats is None:
+        return
+
+    startup = None
+    if stats["script"] is not None:
+        startup = max(stats["wall"] - stats["script"], 0.0)
+    else:
+        # The time to start R is estimated with the probe of the R installation.
+        with contextlib.suppress(Exception):
+            startup = min(get_r_info(session.config).startup, stats["wall"])
+            stats["script"] = stats["wall"] - startup
+    _get_metrics_report(session).add(
+        TaskMetrics(
+            task=task.name,
+            backend=stats["backend"],
+            wall=stats["wall"],
+            startup=startup,
+            script=stats["script"],
+            cpu_user=stats["cpu_user"],
+            cpu_system=stats["cpu_system"],
+            peak_rss=stats["peak_rss"],
+        )
+    )
+
+
+def _get_metrics_report(session: Session) -> MetricsReport:
+    """Get the report with the resources used by R tasks of the session."""
+    if "_r_metrics_report" not in session.config:
+        session.config["_r_metrics_report"] = MetricsReport(session.config["root"])
+    return session.config["_r_metrics_report"]
+
+
+def _get_output_cache(session: Session) -> OutputCache:
+    """Get the cache for the products of R tasks."""
+    if "_r_output_cache" not in session.config:
+        config = session.config
+        folder = config["r_cache_dir"]
+        config["_r_output_cache"] = OutputCache(
+            get_default_cache_dir()
+            if folder is None
+            else config["root"].joinpath(Path(folder).expanduser()),
+            config["r_cache_max_size"],
+            remote=_create_remote_store(config),
+            max_workers=config["r_cache_remote_workers"],
+        )
+    return session.config["_r_output_cache"]
+
+
+def _create_remote_store(config: dict[str, Any]) -> ArtifactStore | None:
+    """Create the store which shares the output cache between machines."""
+    url = config["r_cache_remote"]
+    if url is None:
+        return None
+    # Relative paths are resolved against the root of the project.
+    if len(urlsplit(url).scheme) <= 1:
+        url = config["root"].joinpath(Path(url).expanduser()).as_posix()
+    options = StoreOptions(
+        max_workers=config["r_cache_remote_workers"],
+        chunk_size=config["r_cache_remote_chunk_size"],
+    )
+    return create_store(url, options)
+
+
+def _get_serialization_cache(session: Session) -> SerializationCache:
+    """Get the cache for serialized arguments of the session."""
+    if "_r_serialization_cache" not in session.config:
+        session.config["_r_serialization_cache"] = SerializationCache()
+    return session.config["_r_serialization_cache"]
+
+
+def _get_file_sync(session: Session) -> FileSync:
+    """Get the policy which flushes serialized files to disk."""
+    if "_r_file_sync" not in session.config:
+        session.config["_r_file_sync"] = FileSync(session.config["r_fsync"])
+    return session.config["_r_file_sync"]
+
+
+@hookimpl
+def pytask_unconfigure() -> None:
+    """Shut down the R workers started during the session."""
+    shutdown_pools()
@@ -0,0 +1,138 @@
+"""Contains the log files which receive the output of R tasks.
+
+Instead of passing the output of R through pytask's capture, the output is streamed to
+a log file per task under ``.pytask/pytask-r/logs``. Only a bounded tail is kept in
+memory to be shown if the task fails.
+
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import re
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import TypedDict
+from typing import cast
+
+if TYPE_CHECKING:
+    from types import TracebackType
+    from typing import BinaryIO
+
+__all__ = ["LogOptions", "TaskLog", "create_path_to_log", "report_log"]
+
+_LOGS_FOLDER = ".pytask/pytask-r/logs"
+_UNSAFE_CHARACTERS = re.compile(r"[^\w.-]+")
+_CHUNK_SIZE = 64 * 1024
+
+
+class LogOptions(TypedDict):
+    """Describe how the output of R tasks is logged."""
+
+    max_size: int
+    backups: int
+    tail: int
+
+
+def create_path_to_log(root: Path, task_name: str) -> Path:
+    """Create the path to the log file of a task.
+
+    The name is readable and a short hash of the task's name prevents collisions.
+
+    """
+    module, _, function = task_name.partition("::")
+    readable = _UNSAFE_CHARACTERS.sub("_", f"{Path(module).name}_{function}")[-80:]
+    digest = hashlib.sha256(task_name.encode()).hexdigest()[:8]
+    return root.joinpath(_LOGS_FOLDER, f"{readable}-{digest}.log")
+
+
+class TaskLog:
+    """A log file which rotates when it is opened and when it becomes too large.
+
+    The log of the previous execution becomes ``<name>.log.1``, and so on, until
+    ``backups`` files are kept.
+
+    Parameters
+    ----------
+    path
+        The path to the log file.
+    options
+        The maximum size of a file, the number of backups and the size of the tail
+        which is kept in memory. All sizes are in bytes.
+
+    """
+
+    def __init__(self, path: Path, options: LogOptions) -> None:
+        self.path = path
+        self.options = options
+        self._tail = bytearray()
+        self._size = 0
+        self._truncated = False
+        self._file = None
+
+    def __enter__(self) -> TaskLog:  # noqa: PYI034
+        """Open the log and rotate the log of the previous execution."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._rotate()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the log."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def write(self, data: bytes) -> None:
+        """Write output to the log and keep the end of it in memory."""
+        if self._file is None or (
+            self._size and self._size + len(data) > self.options["max_size"]
+        ):
+            self._rotate()
+        cast("BinaryIO", self._file).write(data)
+        self._size += len(data)
+
+        self._tail += data
+        if len(self._tail) > self.options["tail"]:
+            del self._tail[: len(self._tail) - self.options["tail"]]
+            self._truncated = True
+
+    def write_file(self, path: Path) -> None:
+        """Copy the content of a file to the log in chunks."""
+        with contextlib.suppress(OSError), path.open("rb") as f:
+            while chunk := f.read(_CHUNK_SIZE):
+                self.write(chunk)
+
+    @property
+    def tail(self) -> str:
+        """The end of the output without the first, possibly incomplete line."""
+        text = self._tail.decode("utf-8", errors="replace")
+        if self._truncated:
+            text = text.partition("\n")[2]
+        return text
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        backups = self.options["backups"]
+        for i in range(backups - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{i}")
+            if source.exists():
+                shutil.move(source, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if backups and self.path.exists():
+            shutil.move(self.path, self.path.with_name(f"{self.path.name}.1"))
+        self._file = self.path.open("wb")
+        self._size = 0
+
+
+def report_log(log: TaskLog, *, failed: bool) -> None:
+    """Print where the output is stored and its end if the task failed."""
+    if failed and log.tail:
+        print(f"The last lines of the output of R:\n\n{log.tail}")  # noqa: T201
+    print(f"The output of R is written to {log.path.as_posix()}.")  # noqa: T201
@@ -0,0 +1,396 @@
+"""Contains a content-addressed cache for the products of R tasks.
+
+A task whose products only depend on its script, options, dependencies and the R
+installation can store its products under a key which hashes all of them. When a task
+with the same key is executed again, for example, in another worktree or CI job, its
+products are restored from the cache and R is not started.
+
+The cache lives outside of the project and is shared by all projects of a user. When it
+grows larger than its maximum size, the entries which were not used for the longest time
+are removed. A remote store shares the entries between machines.
+
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Any
+
+from pytask import PathNode
+from pytask import PTask
+from pytask.tree_util import tree_leaves
+from pytask.tree_util import tree_map
+
+from pytask_r.environment import THREAD_VARIABLES
+from pytask_r.shared import is_path_node
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Iterable
+
+    from pytask_r.stores import ArtifactStore
+
+__all__ = [
+    "OutputCache",
+    "create_cache_key",
+    "get_default_cache_dir",
+    "get_product_paths",
+    "hash_file",
+]
+
+_VERSION = 1
+_MANIFEST = "manifest.json"
+# Dependencies which describe how R runs but do not change the products.
+_IGNORED_DEPENDENCIES = ("_serialized", "_runtime", "_fingerprint", "_log")
+# Variables which differ between machines and worktrees but do not change the products.
+_IGNORED_VARIABLES = THREAD_VARIABLES
+_CHUNK_SIZE = 1024 * 1024
+_FICLONE = 0x40049409
+
+
+def get_default_cache_dir() -> Path:
+    """Get the folder of the output cache in the cache directory of the user."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base, "pytask-r", "outputs")
+
+
+def hash_file(path: Path) -> str:
+    """Hash the content of a file.
+
+    The hash is remembered as long as the modification time and size of the file do not
+    change, so that inputs shared by many tasks are only read once.
+
+    """
+    stat = path.stat()
+    return _hash_file(path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=4096)
+def _hash_file(path: Path, mtime: int, size: int) -> str:  # noqa: ARG001
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_product_paths(task: PTask) -> list[Path] | None:
+    """Get the paths of the products or ``None`` if a product is not a local file."""
+    products = tree_leaves(task.produces)  # ty: ignore[invalid-argument-type]
+    if not all(isinstance(node, PathNode) for node in products):
+        return None
+    return [node.path for node in products]
+
+
+def create_cache_key(task: PTask, root: Path, fingerprint: str) -> str | None:
+    """Create the key of the products of a task.
+
+    The key hashes the content of all files the task depends on, the values of the other
+    dependencies, the environment, the paths of the products and the fingerprint of R.
+    Paths, including the library trees in ``R_LIBS``, are relative to the root of the
+    project so that the key is the same in every worktree. Returns ``None`` if a
+    dependency cannot be hashed.
+
+    """
+    runtime: dict[str, Any] = task.depends_on["_runtime"].value  # ty: ignore[unresolved-attribute]
+    dependencies: dict[str, Any] = {
+        name: node
+        for name, node in task.depends_on.items()
+        if name not in _IGNORED_DEPENDENCIES
+    }
+    try:
+        content = pickle.dumps(
+            (
+                _VERSION,
+                {
+                    name: tree_map(lambda node: _describe(node, root), tree)
+                    for name, tree in dependencies.items()
+                },
+                tree_map(lambda node: _relative(node.path, root), task.produces),  # ty: ignore[invalid-argument-type]
+                runtime["vanilla"],
+                sorted(
+                    (name, _describe_variable(name, value, root))
+                    for name, value in runtime["env"].items()
+                    if name not in _IGNORED_VARIABLES
+                ),
+                fingerprint,
+            ),
+            protocol=5,
+        )
+    except (OSError, pickle.PicklingError, TypeError, AttributeError):
+        return None
+    return hashlib.sha256(content).hexdigest()
+
+
+def _describe_variable(name: str, value: str, root: Path) -> str:
+    """Describe a variable and make the library trees relative to the root.
+
+    Examples
+    --------
+    >>> _describe_variable("R_LIBS", "/project/lib", Path("/project"))
+    'lib'
+
+    """
+    if name != "R_LIBS":
+        return value
+    return os.pathsep.join(
+        _relative(Path(path), root) for path in value.split(os.pathsep)
+    )
+
+
+def _describe(node: Any, root: Path) -> Any:
+    """Describe a file by its path and content and other nodes by their value."""
+    if is_path_node(node):
+        return _relative(node.path, root), hash_file(node.path)
+    return node.value
+
+
+class OutputCache:
+    """A folder which stores the products of tasks under a key.
+
+    Every entry is a folder named after the key which contains the products and a
+    manifest. The modification time of the manifest marks when the entry was last used.
+
+    Entries which are missing locally are downloaded from the remote store, and new
+    entries are uploaded to it. The files of an entry are transferred concurrently and
+    the manifest last, so that other machines only see complete entries. Entries are
+    never removed from the remote store.
+
+    Parameters
+    ----------
+    folder
+        The folder of the cache.
+    max_size
+        The maximum size of all entries in bytes. If ``None``, entries are never
+        removed.
+    remote
+        The store which shares entries between machines.
+    max_workers
+        The number of files which are transferred to or from the store at once.
+
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        max_size: int | None,
+        remote: ArtifactStore | None = None,
+        max_workers: int = 8,
+    ) -> None:
+        self.folder = folder
+        self.max_size = max_size
+        self.remote = remote
+        self.max_workers = max_workers
+
+    def restore(self, key: str, products: list[Path], root: Path) -> bool:
+        """Restore the products stored under the key.
+
+        Products are cloned or copied from the cache so that changing them in place does
+        not change the cache. Returns whether the cache contained all products.
+
+        """
+        entry = self._entry(key)
+        if self.remote is not None and not entry.exists():
+            self._pull(key)
+        try:
+            manifest = json.loads(entry.joinpath(_MANIFEST).read_text())
+        except (OSError, ValueError):
+            return False
+        files = manifest.get("files") if isinstance(manifest, dict) else None
+        targets = {_relative(path, root): path for path in products}
+        if not isinstance(files, dict) or files.keys() != targets.keys():
+            return False
+
+        # Check all files first so that a damaged entry does not replace any product.
+        try:
+            complete = all(
+                entry.joinpath(name).stat().st_size == size
+                for name, size in files.values()
+            )
+        except (OSError, TypeError, ValueError):
+            complete = False
+        if not complete:
+            shutil.rmtree(entry, ignore_errors=True)
+            return False
+
+        try:
+            for relative, (name, _) in files.items():
+                _restore(entry / name, targets[relative])
+        except OSError:
+            return False
+        with contextlib.suppress(OSError):
+            os.utime(entry / _MANIFEST)
+        return True
+
+    def store(self, key: str, products: list[Path], root: Path) -> None:
+        """Store the products under the key.
+
+        Products are cloned or copied so that later changes to them do not affect the
+        cache. Errors are ignored because the cache only saves time. Entries are only
+        removed by :meth:`evict` which runs once at the end of the build.
+
+        """
+        entry = self._entry(key)
+        if entry.exists():
+            return
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            temporary = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.folder))
+        except OSError:
+            return
+        try:
+            files = {}
+            for i, path in enumerate(products):
+                _clone(path, temporary / str(i))
+                files[_relative(path, root)] = [str(i), path.stat().st_size]
+            temporary.joinpath(_MANIFEST).write_text(json.dumps({"files": files}))
+            entry.parent.mkdir(exist_ok=True)
+            # Fails if another process stored the same entry in the meantime.
+            temporary.rename(entry)
+        except OSError:
+            shutil.rmtree(temporary, ignore_errors=True)
+            return
+        if self.remote is not None:
+            self._push(key)
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits its size."""
+        if self.max_size is None:
+            return
+        entries = []
+        for manifest in self.folder.glob(f"*/*/{_MANIFEST}"):
+            with contextlib.suppress(OSError):
+                size = sum(path.stat().st_size for path in manifest.parent.iterdir())
+                entries.append((manifest.stat().st_mtime, size, manifest.parent))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def _entry(self, key: str) -> Path:
+        return self.folder / key[:2] / key
+
+    def _pull(self, key: str) -> None:
+        """Download an entry from the remote store if it exists there."""
+        remote: ArtifactStore = self.remote  # ty: ignore[invalid-assignment]
+        prefix = f"{key[:2]}/{key}"
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            temporary = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.folder))
+        except OSError:
+            return
+        try:
+            if not remote.download(f"{prefix}/{_MANIFEST}", temporary / _MANIFEST):
+                return
+            manifest = json.loads(temporary.joinpath(_MANIFEST).read_text())
+            names = [name for name, _ in manifest["files"].values()]
+            self._transfer(
+                lambda name: _download(remote, f"{prefix}/{name}", temporary / name),
+                names,
+            )
+            self._entry(key).parent.mkdir(exist_ok=True)
+            temporary.rename(self._entry(key))
+        except Exception as e:  # noqa: BLE001
+            _warn(f"Downloading the entry {key} from the remote cache failed: {e}")
+        finally:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+    def _push(self, key: str) -> None:
+        """Upload an entry to the remote store unless it exists there."""
+        remote: ArtifactStore = self.remote  # ty: ignore[invalid-assignment]
+        prefix = f"{key[:2]}/{key}"
+        entry = self._entry(key)
+        try:
+            if remote.exists(f"{prefix}/{_MANIFEST}"):
+                return
+            names = [path.name for path in entry.iterdir() if path.name != _MANIFEST]
+            self._transfer(
+                lambda name: remote.upload(entry / name, f"{prefix}/{name}"), names
+            )
+            remote.upload(entry / _MANIFEST, f"{prefix}/{_MANIFEST}")
+        except Exception as e:  # noqa: BLE001
+            _warn(f"Uploading the entry {key} to the remote cache failed: {e}")
+
+    def _transfer(self, transfer: Callable[[str], Any], names: Iterable[str]) -> None:
+        """Transfer files concurrently and raise the first error."""
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            for future in [executor.submit(transfer, name) for name in names]:
+                future.result()
+
+
+def _download(remote: ArtifactStore, name: str, path: Path) -> None:
+    """Download a file of an entry which must exist."""
+    if not remote.download(name, path):
+        msg = f"The file {name} is missing."
+        raise FileNotFoundError(msg)
+
+
+def _warn(message: str) -> None:
+    """Warn about a failing remote store which only makes the build slower."""
+    warnings.warn(message, stacklevel=1)
+
+
+def _relative(path: Path, root: Path) -> str:
+    """Make the path relative to the root so that keys work in every worktree.
+
+    Examples
+    --------
+    >>> _relative(Path("/project/out/data.csv"), Path("/project"))
+    'out/data.csv'
+    >>> _relative(Path("/data/fit.rds"), Path("/project"))
+    '/data/fit.rds'
+
+    """
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def _restore(source: Path, target: Path) -> None:
+    """Clone or copy a file and replace the target in one step."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temporary = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        _clone(source, temporary)
+        temporary.replace(target)
+    except OSError:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+def _clone(source: Path, target: Path) -> None:
+    """Copy a file and share its blocks if the file system supports reflinks."""
+    if sys.platform != "linux" or not _reflink(source, target):
+        shutil.copyfile(source, target)
+
+
+def _reflink(source: Path, target: Path) -> bool:
+    """Clone a file on Linux file systems like Btrfs and XFS."""
+    import fcntl  # noqa: PLC0415
+
+    with source.open("rb") as src, target.open("wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError:
+            return False
+    return True
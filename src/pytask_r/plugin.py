@@ -1,4 +1,11 @@
-"""Register hook specifications and implementations."""
+"""Register hook specifications and implementations.
+
+Only the hooks which parse the configuration and collect tasks are registered when
+pytask starts. The hooks which execute R tasks are imported and registered once the
+first R task is collected so that projects and commands without R tasks do not pay for
+importing them.
+
+"""
 
 from __future__ import annotations
 
@@ -8,7 +15,6 @@ from pytask import hookimpl
 
 from pytask_r import collect
 from pytask_r import config
-from pytask_r import execute
 
 if TYPE_CHECKING:
     from pluggy import PluginManager
@@ -19,4 +25,3 @@ def pytask_add_hooks(pm: PluginManager) -> None:
     """Register hook implementations."""
     pm.register(collect)
     pm.register(config)
-    pm.register(execute)
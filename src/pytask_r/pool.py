@@ -0,0 +1,394 @@
+"""Contains a pool of long-lived R processes which execute scripts."""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import cast
+
+from pytask_r.environment import merge_environment
+from pytask_r.profiling import ProcessStats
+from pytask_r.profiling import terminate_process_tree
+from pytask_r.shared import create_rscript_command
+
+if TYPE_CHECKING:
+    from pytask_r.logs import TaskLog
+    from pytask_r.shared import RuntimeOptions
+
+__all__ = ["get_pool", "shutdown_pools"]
+
+_WORKER_SCRIPT = Path(__file__).parent / "worker.R"
+_CONNECT_TIMEOUT = 60
+_TOKEN_VARIABLE = "PYTASK_R_WORKER_TOKEN"  # noqa: S105
+
+
+class RWorker:
+    """A long-lived R process which executes scripts sent over a socket.
+
+    Parameters
+    ----------
+    executable
+        The path to ``Rscript``.
+    fork
+        Whether each script is executed in a forked child of the worker.
+    preload
+        Packages which are loaded once when the worker starts.
+    env
+        Environment variables which are set for the worker.
+    vanilla
+        Whether R is started with ``--vanilla``.
+
+    """
+
+    def __init__(
+        self,
+        *,
+        executable: str,
+        fork: bool,
+        preload: tuple[str, ...],
+        env: dict[str, str] | None = None,
+        vanilla: bool = False,
+    ) -> None:
+        # Other local processes may connect to the port as well, so the worker proves
+        # its identity with a secret which only it receives.
+        token = secrets.token_hex(16)
+        with socket.create_server(("127.0.0.1", 0)) as server:
+            port = server.getsockname()[1]
+            self.process = subprocess.Popen(  # noqa: S603
+                [
+                    *create_rscript_command(executable, vanilla=vanilla),
+                    _WORKER_SCRIPT.as_posix(),
+                    str(port),
+                    "fork" if fork else "pool",
+                    *preload,
+                ],
+                stdin=subprocess.DEVNULL,
+                env={
+                    **(merge_environment(env or {}) or os.environ),
+                    _TOKEN_VARIABLE: token,
+                },
+                # A new session allows killing the worker with its forked children.
+                start_new_session=sys.platform != "win32",
+            )
+            try:
+                connection = _accept_worker(server, token)
+            except OSError as e:
+                self.process.kill()
+                msg = "The R worker process did not connect to pytask-r."
+                raise RuntimeError(msg) from e
+        connection.settimeout(None)
+        self._connection = connection
+        self._stream = connection.makefile("rw", encoding="utf-8", newline="\n")
+        self.n_tasks = 0
+
+        greeting = self._stream.readline().strip()
+        if greeting != "ready":
+            self.close()
+            message = greeting.partition("\t")[2] or "The process exited."
+            msg = f"The R worker could not be started: {message}"
+            raise RuntimeError(msg)
+
+    def run(
+        self,
+        script: Path,
+        args: list[str],
+        log: TaskLog | None = None,
+        timeout: float | None = None,
+    ) -> ProcessStats:
+        """Run a script in a fresh environment of the worker.
+
+        The output is forwarded to the log if it is passed and otherwise to stdout and
+        stderr. If the script runs longer than ``timeout`` seconds or the call is
+        interrupted, the worker is killed.
+
+        """
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmp:
+            stdout_path = Path(tmp, "stdout.txt")
+            stderr_path = Path(tmp, "stderr.txt")
+            fields = [script.as_posix(), str(stdout_path), str(stderr_path), *args]
+            self._connection.settimeout(timeout)
+            try:
+                self._stream.write("\t".join(fields) + "\n")
+                self._stream.flush()
+                response = self._stream.readline()
+            except TimeoutError as e:
+                self.kill()
+                raise subprocess.TimeoutExpired(
+                    [script.as_posix(), *args], cast("float", timeout)
+                ) from e
+            except BaseException:
+                self.kill()
+                raise
+            self._connection.settimeout(None)
+            self.n_tasks += 1
+
+            # Forward the output such that it is captured by pytask for the task.
+            for path, stream in ((stdout_path, sys.stdout), (stderr_path, sys.stderr)):
+                if log is not None:
+                    log.write_file(path)
+                elif path.exists():
+                    stream.write(path.read_text(encoding="utf-8", errors="replace"))
+
+        if not response:
+            self.close()
+            msg = f"The R worker process died while executing {script}."
+            raise RuntimeError(msg)
+        if response.startswith("error"):
+            message = response.partition("\t")[2].strip()
+            msg = f"Executing {script} in an R worker failed with: {message}"
+            raise RuntimeError(msg)
+
+        elapsed, user, system = (float(x) for x in response.split("\t")[1:4])
+        return ProcessStats(
+            wall=time.perf_counter() - start,
+            script=elapsed,
+            cpu_user=user,
+            cpu_system=system,
+            # The peak of the long-lived worker or of its forked children is not the
+            # peak of the script, so nothing is reported to learn budgets from.
+            peak_rss=None,
+        )
+
+    def memory(self) -> int | None:
+        """Return the resident set size of the worker in bytes.
+
+        The value is only available on Linux.
+
+        """
+        with contextlib.suppress(OSError):
+            status = Path(f"/proc/{self.process.pid}/status").read_text()
+            for line in status.splitlines():
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        return None
+
+    def is_alive(self) -> bool:
+        """Check whether the worker process is still running."""
+        return self.process.poll() is None
+
+    def kill(self) -> None:
+        """Kill the worker and the children it forked."""
+        terminate_process_tree(self.process)
+        with contextlib.suppress(OSError):
+            self._stream.close()
+            self._connection.close()
+        self.process.wait()
+
+    def close(self) -> None:
+        """Shut down the worker."""
+        with contextlib.suppress(OSError):
+            self._stream.write("\n")
+            self._stream.flush()
+        with contextlib.suppress(OSError):
+            self._stream.close()
+            self._connection.close()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def _accept_worker(server: socket.socket, token: str) -> socket.socket:
+    """Accept the connection of the worker which sends the token first.
+
+    Connections which send anything else are closed. An :class:`OSError` is raised if
+    the worker does not connect in time.
+
+    """
+    deadline = time.monotonic() + _CONNECT_TIMEOUT
+    while True:
+        server.settimeout(max(deadline - time.monotonic(), 0))
+        connection, _ = server.accept()
+        connection.settimeout(max(deadline - time.monotonic(), 0))
+        # The line is read byte by byte so that the greeting stays in the socket.
+        received = b""
+        with contextlib.suppress(OSError):
+            while not received.endswith(b"\n") and len(received) <= len(token):
+                byte = connection.recv(1)
+                if not byte:
+                    break
+                received += byte
+        if secrets.compare_digest(received.strip(), token.encode()):
+            return connection
+        connection.close()
+
+
+class RWorkerPool:
+    """A pool of R workers which are recycled after a number of tasks or memory.
+
+    Parameters
+    ----------
+    executable
+        The path to ``Rscript``.
+    fork
+        Whether each script is executed in a forked child of a worker.
+    preload
+        Packages which are loaded once per worker.
+    size
+        The maximum number of workers. If ``None``, a new worker is started whenever no
+        idle worker is available.
+    max_tasks
+        The number of tasks after which a worker is replaced.
+    max_memory
+        The resident set size in bytes after which a worker is replaced.
+    env
+        Environment variables which are set for the workers.
+    vanilla
+        Whether R is started with ``--vanilla``.
+
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        executable: str,
+        fork: bool,
+        preload: tuple[str, ...],
+        size: int | None,
+        max_tasks: int | None,
+        max_memory: int | None,
+        env: dict[str, str] | None = None,
+        vanilla: bool = False,
+    ) -> None:
+        self.executable = executable
+        self.fork = fork
+        self.preload = preload
+        self.env = env or {}
+        self.vanilla = vanilla
+        self.max_tasks = max_tasks
+        self.max_memory = max_memory
+        self._idle: list[RWorker] = []
+        self._lock = threading.Lock()
+        self._slots = None if size is None else threading.BoundedSemaphore(size)
+
+    def run(
+        self,
+        script: Path,
+        args: list[str],
+        log: TaskLog | None = None,
+        timeout: float | None = None,
+    ) -> ProcessStats:
+        """Run a script with an idle or a new worker."""
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            worker = self._acquire()
+            try:
+                return worker.run(script, args, log, timeout)
+            finally:
+                self._release(worker)
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def _acquire(self) -> RWorker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.is_alive():
+                    return worker
+        return RWorker(
+            executable=self.executable,
+            fork=self.fork,
+            preload=self.preload,
+            env=self.env,
+            vanilla=self.vanilla,
+        )
+
+    def _release(self, worker: RWorker) -> None:
+        if not worker.is_alive():
+            return
+        if self._needs_recycling(worker):
+            worker.close()
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def _needs_recycling(self, worker: RWorker) -> bool:
+        if self.max_tasks is not None and worker.n_tasks >= self.max_tasks:
+            return True
+        if self.max_memory is not None:
+            memory = worker.memory()
+            return memory is not None and memory >= self.max_memory
+        return False
+
+    def close(self) -> None:
+        """Shut down all idle workers."""
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.close()
+
+
+_PoolKey = tuple[
+    str,
+    bool,
+    tuple[str, ...],
+    int | None,
+    int | None,
+    int | None,
+    tuple[tuple[str, str], ...],
+    bool,
+]
+_POOLS: dict[_PoolKey, RWorkerPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(runtime: RuntimeOptions) -> RWorkerPool:
+    """Get the pool of the current process for the runtime options."""
+    executable = runtime["executable"]
+    fork = runtime["backend"] == "fork"
+    preload = tuple(runtime["preload"])
+    size = runtime["pool_size"]
+    max_tasks = runtime["pool_max_tasks"]
+    max_memory = runtime["pool_max_memory"]
+    env = tuple(sorted(runtime["env"].items()))
+    vanilla = runtime["vanilla"]
+
+    key: _PoolKey = (
+        executable,
+        fork,
+        preload,
+        size,
+        max_tasks,
+        max_memory,
+        env,
+        vanilla,
+    )
+    with _POOLS_LOCK:
+        if key not in _POOLS:
+            _POOLS[key] = RWorkerPool(
+                executable=executable,
+                fork=fork,
+                preload=preload,
+                size=size,
+                max_tasks=max_tasks,
+                max_memory=max_memory,
+                env=dict(env),
+                vanilla=vanilla,
+            )
+        return _POOLS[key]
+
+
+def shutdown_pools() -> None:
+    """Shut down all pools of the current process."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(shutdown_pools)
@@ -0,0 +1,325 @@
+"""Contains the code to measure the time and memory used by R tasks.
+
+Measurements of a task are written next to its serialized arguments by the process
+which executes the task, so that they also reach the main process with
+pytask-parallel. The main process collects them into a report which is stored under
+``.pytask/pytask-r/`` and summarized in the terminal.
+
+"""
+
+from __future__ import annotations
+
+import contextlib
+import csv
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import TypedDict
+from typing import cast
+
+from rich.table import Table
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from io import BufferedReader
+    from pathlib import Path
+
+    from pytask_r.logs import TaskLog
+
+__all__ = [
+    "METRICS_FIELDS",
+    "MetricsReport",
+    "ProcessStats",
+    "TaskMetrics",
+    "measures_resources",
+    "path_to_metrics",
+    "read_metrics",
+    "run_process",
+    "terminate_process_tree",
+    "write_metrics",
+]
+
+_REPORT = ".pytask/pytask-r/metrics"
+_CHUNK_SIZE = 64 * 1024
+TERMINATE_TIMEOUT = 5
+"""The seconds a process group has to exit after ``SIGTERM`` before it is killed."""
+
+
+class ProcessStats(TypedDict):
+    """Describe the resources used to execute an R script.
+
+    ``script`` is the time spent in the script itself if R reports it and ``None`` if
+    the time includes starting R.
+
+    """
+
+    wall: float
+    script: float | None
+    cpu_user: float | None
+    cpu_system: float | None
+    peak_rss: int | None
+
+
+class TaskMetrics(ProcessStats):
+    """Describe the resources used by an R task."""
+
+    task: str
+    backend: str
+    startup: float | None
+
+
+METRICS_FIELDS = tuple(TaskMetrics.__annotations__)
+
+
+def measures_resources(config: dict[str, Any]) -> bool:
+    """Check whether the resources used by R tasks are measured.
+
+    Measurements are needed for the report and to learn the memory of tasks.
+
+    """
+    return config["r_profile"] or config["r_max_memory"] is not None
+
+
+def run_process(
+    cmd: list[str],
+    *,
+    check: bool = True,
+    log: TaskLog | None = None,
+    timeout: float | None = None,
+    env: dict[str, str] | None = None,
+) -> tuple[int, ProcessStats]:
+    """Run a command like ``subprocess.run(cmd, check=check)`` and measure it.
+
+    The process is started in a new process group. If it runs longer than ``timeout``
+    seconds or the call is interrupted, the process is killed with its children. If a
+    log is passed, stdout and stderr of the process are streamed to it. ``env`` replaces
+    the environment of the process like in :class:`subprocess.Popen`.
+
+    Returns the exit code and the resources used by the process. CPU times and the peak
+    resident set size are only available on POSIX systems.
+
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(  # noqa: S603
+        cmd,
+        stdout=None if log is None else subprocess.PIPE,
+        stderr=None if log is None else subprocess.STDOUT,
+        env=env,
+        start_new_session=sys.platform != "win32",
+    )
+    exited = threading.Event()
+    timed_out = threading.Event()
+
+    def expire() -> None:
+        timed_out.set()
+        terminate_process_tree(process, wait=exited.wait)
+
+    timer = None if timeout is None else threading.Timer(timeout, expire)
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+    try:
+        usage = _wait(process, log)
+    except BaseException:
+        if process.returncode is None:
+            terminate_process_tree(process)
+            process.wait()
+        raise
+    finally:
+        exited.set()
+        if timer is not None:
+            timer.cancel()
+
+    # The peak resident set size is reported in kilobytes on Linux.
+    factor = 1 if sys.platform == "darwin" else 1024
+    stats = ProcessStats(
+        wall=time.perf_counter() - start,
+        script=None,
+        cpu_user=None if usage is None else usage.ru_utime,
+        cpu_system=None if usage is None else usage.ru_stime,
+        peak_rss=None if usage is None else usage.ru_maxrss * factor,
+    )
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)  # ty: ignore[invalid-argument-type]
+    if check and process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+    return process.returncode, stats
+
+
+def _wait(process: subprocess.Popen[bytes], log: TaskLog | None) -> Any:
+    """Wait for the process and return its resource usage if it is available."""
+    if log is not None:
+        stdout = cast("BufferedReader", process.stdout)
+        with stdout:
+            while chunk := stdout.read1(_CHUNK_SIZE):
+                log.write(chunk)
+    if not hasattr(os, "wait4"):  # pragma: no cover
+        process.wait()
+        return None
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return usage
+
+
+def terminate_process_tree(
+    process: subprocess.Popen[Any], *, wait: Callable[[float], Any] | None = None
+) -> None:
+    """Terminate a process started in a new process group and all its children.
+
+    The group receives ``SIGTERM`` and, after waiting until ``wait`` returns or times
+    out, ``SIGKILL`` so that children which outlived R are killed as well. By default,
+    it is waited until the process exits.
+
+    """
+    if sys.platform == "win32":  # pragma: no cover
+        with contextlib.suppress(OSError):
+            subprocess.run(  # noqa: S603
+                ["taskkill", "/F", "/T", "/PID", str(process.pid)],  # noqa: S607
+                capture_output=True,
+                check=False,
+            )
+        return
+    with contextlib.suppress(ProcessLookupError, PermissionError):
+        os.killpg(process.pid, signal.SIGTERM)
+    (wait or _waiter(process))(TERMINATE_TIMEOUT)
+    with contextlib.suppress(ProcessLookupError, PermissionError):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def _waiter(process: subprocess.Popen[Any]) -> Callable[[float], None]:
+    """Create a function which waits for a process at most some seconds."""
+
+    def wait(timeout: float) -> None:
+        with contextlib.suppress(subprocess.TimeoutExpired):
+            process.wait(timeout)
+
+    return wait
+
+
+def path_to_metrics(path_to_serialized: Path) -> Path:
+    """Return the path where the measurements of a task are stored temporarily."""
+    return path_to_serialized.with_name(path_to_serialized.name + ".metrics")
+
+
+def write_metrics(path: Path, backend: str, stats: ProcessStats) -> None:
+    """Write the measurements of a task for the main process."""
+    with contextlib.suppress(OSError):
+        path.write_text(json.dumps({"backend": backend, **stats}))
+
+
+def read_metrics(path: Path) -> dict[str, Any] | None:
+    """Read and remove the measurements of a task."""
+    try:
+        content = json.loads(path.read_text())
+        path.unlink()
+    except (OSError, ValueError):
+        return None
+    return content if isinstance(content, dict) else None
+
+
+class MetricsReport:
+    """Collect the measurements of R tasks across builds.
+
+    The report is stored as JSON and CSV under ``.pytask/pytask-r/``. Entries of tasks
+    which were not executed in the current build are kept.
+
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.path = root / _REPORT
+        self.executed: dict[str, TaskMetrics] = {}
+
+    def add(self, metrics: TaskMetrics) -> None:
+        """Add the measurements of a task executed in this build."""
+        self.executed[metrics["task"]] = metrics
+
+    def load(self) -> dict[str, TaskMetrics]:
+        """Load the measurements of all tasks from the previous builds."""
+        try:
+            entries = json.loads(self.path.with_suffix(".json").read_text())
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entries, list):
+            return {}
+        return {entry["task"]: entry for entry in entries if isinstance(entry, dict)}
+
+    def save(self) -> None:
+        """Merge the measurements of this build into the stored report."""
+        if not self.executed:
+            return
+        entries = list({**self.load(), **self.executed}.values())
+        with contextlib.suppress(OSError):
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.with_suffix(".json").write_text(json.dumps(entries, indent=2))
+            with self.path.with_suffix(".csv").open("w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=METRICS_FIELDS)
+                writer.writeheader()
+                writer.writerows(
+                    {key: entry.get(key) for key in METRICS_FIELDS} for entry in entries
+                )
+
+    def create_table(self, n_rows: int = 10) -> Table:
+        """Create a table with the slowest tasks of this build."""
+        table = Table(title="Slowest R tasks", title_justify="left")
+        for column in ("Task", "Wall", "Startup", "CPU", "Peak RSS"):
+            table.add_column(column, justify="left" if column == "Task" else "right")
+        tasks = sorted(self.executed.values(), key=lambda m: m["wall"], reverse=True)
+        for metrics in tasks[:n_rows]:
+            cpu = (
+                None
+                if metrics["cpu_user"] is None or metrics["cpu_system"] is None
+                else metrics["cpu_user"] + metrics["cpu_system"]
+            )
+            table.add_row(
+                metrics["task"],
+                _format_seconds(metrics["wall"]),
+                _format_seconds(metrics["startup"]),
+                _format_seconds(cpu),
+                _format_bytes(metrics["peak_rss"]),
+            )
+        return table
+
+
+def _format_seconds(value: float | None) -> str:
+    """Format a duration.
+
+    Examples
+    --------
+    >>> _format_seconds(0.0123)
+    '12 ms'
+    >>> _format_seconds(3.14159)
+    '3.14 s'
+    >>> _format_seconds(None)
+    '-'
+
+    """
+    if value is None:
+        return "-"
+    return f"{value * 1000:.0f} ms" if value < 1 else f"{value:.2f} s"
+
+
+def _format_bytes(value: int | None) -> str:
+    """Format a size in bytes.
+
+    Examples
+    --------
+    >>> _format_bytes(3 * 1024**2)
+    '3.0 MB'
+    >>> _format_bytes(None)
+    '-'
+
+    """
+    if value is None:
+        return "-"
+    size = float(value)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:  # noqa: PLR2004
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
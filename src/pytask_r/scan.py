@@ -0,0 +1,200 @@
+"""Contains functions to scan R scripts statically."""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+__all__ = ["ScanCache", "ScriptInfo", "find_packages", "scan_script", "scan_source"]
+
+_COMMENT = re.compile(r"#[^\n]*")
+_PACKAGE_NAME = r"([A-Za-z][A-Za-z0-9.]*[A-Za-z0-9]|[A-Za-z])"
+_LOAD_CALL = re.compile(
+    r"\b(?:library|require|requireNamespace|loadNamespace)\s*\(\s*"
+    r"(?:package\s*=\s*)?[\"']?" + _PACKAGE_NAME
+)
+_NAMESPACE_ACCESS = re.compile(r"(?<![\w.])" + _PACKAGE_NAME + r":::?")
+_STRING = r"\s*\(\s*(?:file\s*=\s*)?([\"'])([^\"'\n]+)\1"
+_SOURCE_CALL = re.compile(r"(?<![\w.])(?:source|sys\.source)" + _STRING)
+# Functions whose first argument is the path to a file which is read.
+_READ_CALL = re.compile(
+    r"(?<![\w.])(?:\w+:::?)?(?:readRDS|load|readLines|read\.csv|read\.csv2|"
+    r"read\.table|read\.delim|read_csv|read_csv2|read_tsv|read_delim|read_rds|fread|"
+    r"read_json|fromJSON|read_yaml|yaml\.load_file|read_feather|read_parquet|"
+    r"read_excel|read_xlsx|read_dta|read_sav|read_sas|st_read|read_sf)" + _STRING
+)
+_CACHE = ".pytask/pytask-r/scan.json"
+
+
+@dataclass(frozen=True)
+class ScriptInfo:
+    """The information found in the source code of an R file.
+
+    Attributes
+    ----------
+    packages
+        The packages which are loaded or accessed.
+    sources
+        The literal paths passed to ``source()`` or ``sys.source()``.
+    files
+        The literal paths passed to functions which read files.
+
+    """
+
+    packages: tuple[str, ...] = ()
+    sources: tuple[str, ...] = ()
+    files: tuple[str, ...] = ()
+
+
+def find_packages(source: str) -> set[str]:
+    r"""Find the packages which are loaded or accessed in R source code.
+
+    Examples
+    --------
+    >>> sorted(find_packages('library(data.table)\nx <- jsonlite::read_json("a")'))
+    ['data.table', 'jsonlite']
+    >>> find_packages("# library(yaml)")
+    set()
+
+    """
+    source = _COMMENT.sub("", source)
+    return {
+        *(match.group(1) for match in _LOAD_CALL.finditer(source)),
+        *(match.group(1) for match in _NAMESPACE_ACCESS.finditer(source)),
+    }
+
+
+def scan_source(source: str) -> ScriptInfo:
+    r"""Scan R source code for packages, sourced files and files which are read.
+
+    Only literal paths are found since paths built at runtime cannot be known without
+    running the code.
+
+    Examples
+    --------
+    >>> scan_source('source("helpers.R")\nx <- readRDS(file = "data/x.rds")')
+    ScriptInfo(packages=(), sources=('helpers.R',), files=('data/x.rds',))
+
+    """
+    source = _COMMENT.sub("", source)
+    return ScriptInfo(
+        packages=tuple(sorted(find_packages(source))),
+        sources=tuple(dict.fromkeys(m.group(2) for m in _SOURCE_CALL.finditer(source))),
+        files=tuple(dict.fromkeys(m.group(2) for m in _READ_CALL.finditer(source))),
+    )
+
+
+class ScanCache:
+    """Remember the results of scanning R files across builds.
+
+    An entry is reused if the modification time of the file did not change or, if it
+    did, the hash of its content is the same. The cache is stored under
+    ``.pytask/pytask-r/scan.json`` in the root of the project.
+
+    """
+
+    def __init__(self, root: Path) -> None:
+        self._path = root / _CACHE
+        self._entries: dict[str, dict[str, Any]] | None = None
+        self._changed = False
+
+    def scan(self, path: Path) -> ScriptInfo:
+        """Scan an R file or reuse the previous result."""
+        entries = self._load()
+        key = path.as_posix()
+        mtime = path.stat().st_mtime_ns
+        entry = entries.get(key)
+        if entry is not None and entry["mtime"] == mtime:
+            return _info_from_entry(entry)
+
+        content = path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        if entry is None or entry["hash"] != digest:
+            info = scan_source(content.decode("utf-8", errors="replace"))
+        else:
+            info = _info_from_entry(entry)
+        entries[key] = {
+            "mtime": mtime,
+            "hash": digest,
+            "packages": list(info.packages),
+            "sources": list(info.sources),
+            "files": list(info.files),
+        }
+        self._changed = True
+        return info
+
+    def save(self) -> None:
+        """Write the cache if it changed."""
+        if self._changed and self._entries is not None:
+            with contextlib.suppress(OSError):
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                self._path.write_text(json.dumps(self._entries))
+            self._changed = False
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            try:
+                entries = json.loads(self._path.read_text())
+            except (OSError, ValueError):
+                entries = {}
+            self._entries = entries if isinstance(entries, dict) else {}
+        return self._entries
+
+
+def _info_from_entry(entry: dict[str, Any]) -> ScriptInfo:
+    return ScriptInfo(
+        packages=tuple(entry["packages"]),
+        sources=tuple(entry["sources"]),
+        files=tuple(entry["files"]),
+    )
+
+
+def scan_script(script: Path, cache: ScanCache) -> tuple[set[str], list[Path]]:
+    """Scan a script and all R files it sources.
+
+    Relative paths are resolved against the current working directory in which
+    ``Rscript`` is started and, as a fallback, against the folder of the file. Only
+    files which exist are returned.
+
+    Returns the packages used by all files and the paths to the sourced files and the
+    files which are read.
+
+    """
+    packages: set[str] = set()
+    paths: list[Path] = []
+    to_scan = [script]
+    scanned: set[Path] = set()
+    while to_scan:
+        path = to_scan.pop()
+        if path in scanned:
+            continue
+        scanned.add(path)
+        try:
+            info = cache.scan(path)
+        except OSError:
+            continue
+        packages.update(info.packages)
+        for relative in info.sources:
+            resolved = _resolve(relative, path.parent)
+            if resolved is not None:
+                paths.append(resolved)
+                to_scan.append(resolved)
+        for relative in info.files:
+            resolved = _resolve(relative, path.parent)
+            if resolved is not None:
+                paths.append(resolved)
+    return packages, list(dict.fromkeys(p for p in paths if p != script))
+
+
+def _resolve(relative: str, folder: Path) -> Path | None:
+    """Resolve a path like R would and return it if the file exists."""
+    for base in (Path.cwd(), folder):
+        path = base.joinpath(relative).resolve()
+        if path.is_file():
+            return path
+    return None
@@ -0,0 +1,141 @@
+"""Contains a scheduler which limits the memory of R tasks running at the same time.
+
+The memory a task needs is either declared with ``@pytask.mark.r(memory=...)`` or
+learned from the peak resident set size measured when the task was last executed.
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from typing import Any
+
+from pytask import PTask
+from pytask import Session
+from pytask import get_marks
+from pytask import hookimpl
+
+from pytask_r.profiling import MetricsReport
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+__all__ = ["MemoryAwareScheduler"]
+
+
+class MemoryAwareScheduler:
+    """Wrap a scheduler to admit ready tasks only while their memory fits.
+
+    Tasks which are handed out by the wrapped scheduler but do not fit are held back
+    until running tasks are done. A task is always admitted if no other task is running
+    so that tasks which need more memory than the limit are still executed.
+
+    Parameters
+    ----------
+    scheduler
+        The scheduler of the session.
+    get_memory
+        A function which returns the memory in bytes which a task needs.
+    max_memory
+        The maximum memory in bytes of tasks running at the same time.
+
+    """
+
+    def __init__(
+        self, scheduler: Any, get_memory: Callable[[str], int], max_memory: int
+    ) -> None:
+        self._scheduler = scheduler
+        self._get_memory = get_memory
+        self.max_memory = max_memory
+        self._deferred: list[str] = []
+        self._running: dict[str, int] = {}
+
+    def get_ready(self, n: int = 1) -> list[str]:
+        """Get up to ``n`` tasks which are ready and fit into the memory."""
+        self._deferred.extend(self._scheduler.get_ready(n))
+        admitted = []
+        for name in list(self._deferred):
+            if len(admitted) >= n:
+                break
+            if self.admit(name):
+                self._deferred.remove(name)
+                admitted.append(name)
+        return admitted
+
+    def admit(self, name: str) -> bool:
+        """Admit a ready task if its memory fits next to the running tasks.
+
+        The batch and async backends use this method to add ready tasks to the task
+        which was handed out by :meth:`get_ready`. Tasks which were already admitted are
+        admitted again when they are handed out.
+
+        """
+        if name in self._running:
+            return True
+        memory = self._get_memory(name)
+        if self._running and self.memory_in_use + memory > self.max_memory:
+            return False
+        self._running[name] = memory
+        return True
+
+    @property
+    def memory_in_use(self) -> int:
+        """The memory of the admitted tasks which are not done."""
+        return sum(self._running.values())
+
+    def is_active(self) -> bool:
+        """Indicate whether there are still tasks left."""
+        return self._scheduler.is_active()
+
+    def done(self, *nodes: str) -> None:
+        """Mark tasks as done and release their memory."""
+        for name in nodes:
+            self._running.pop(name, None)
+            if name in self._deferred:
+                self._deferred.remove(name)
+        self._scheduler.done(*nodes)
+
+    def rebuild(self, dag: Any) -> MemoryAwareScheduler:
+        """Rebuild the wrapped scheduler from an updated DAG and wrap it again.
+
+        The held back and running tasks are preserved since the wrapped scheduler keeps
+        them as processing.
+
+        """
+        scheduler = MemoryAwareScheduler(
+            self._scheduler.rebuild(dag), self._get_memory, self.max_memory
+        )
+        scheduler._deferred = self._deferred.copy()
+        scheduler._running = self._running.copy()
+        return scheduler
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate other attributes like the graph to the wrapped scheduler."""
+        return getattr(self._scheduler, name)
+
+
+@hookimpl(tryfirst=True)
+def pytask_execute_build(session: Session) -> None:
+    """Limit the memory of R tasks running at the same time if configured."""
+    max_memory = session.config["r_max_memory"]
+    if max_memory is None or session.scheduler is None:
+        return
+
+    learned = MetricsReport(session.config["root"]).load()
+
+    def get_memory(name: str) -> int:
+        task = session.dag.nodes[name]
+        return _get_memory(task, learned) if isinstance(task, PTask) else 0
+
+    session.scheduler = MemoryAwareScheduler(session.scheduler, get_memory, max_memory)
+
+
+def _get_memory(task: PTask, learned: dict[str, Any]) -> int:
+    """Get the declared or learned memory of an R task."""
+    marks = get_marks(task, "r")
+    if not marks:
+        return 0
+    memory = marks[0].kwargs.get("memory")
+    if memory is None:
+        memory = learned.get(task.name, {}).get("peak_rss")
+    return memory or 0
@@ -2,23 +2,79 @@
 
 from __future__ import annotations
 
+import contextlib
+import functools
+import gzip
+import hashlib
+import importlib.util
 import json
-import uuid
+import os
+import pickle
+import re
+import sys
+import tempfile
+import time
 from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import MutableMapping
+from importlib.metadata import EntryPoint
+from importlib.metadata import entry_points
 from pathlib import Path
+from typing import TYPE_CHECKING
 from typing import Any
 from typing import TypedDict
 from typing import cast
 
-from pytask import PTask
-from pytask import PTaskWithPath
+from pytask.tree_util import tree_map
 
-__all__ = ["SERIALIZERS", "create_path_to_serialized", "serialize_keyword_arguments"]
+from pytask_r.shared import is_path_node
+
+if TYPE_CHECKING:
+    from typing import BinaryIO
+
+    from pytask import PTask
+
+__all__ = [
+    "COMPRESSIONS",
+    "FSYNC_MODES",
+    "SERIALIZERS",
+    "FileSync",
+    "SerializationCache",
+    "SerializerRegistry",
+    "create_path_to_serialized",
+    "digest_keyword_arguments",
+    "is_compression_available",
+    "register_serializer",
+    "remove_orphaned_serialized",
+    "serialize_keyword_arguments",
+    "write_atomically",
+]
 
 _HIDDEN_FOLDER = ".pytask/pytask-r"
+_INDEX = "index.json"
+_ENTRY_POINT_GROUP = "pytask_r.serializers"
+# The number of items of a list which are encoded to JSON at once.
+_JSON_CHUNK_SIZE = 1_000
+
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+"""The compressions of serialized files with the suffixes they add."""
 
+FSYNC_MODES = ("off", "file", "session")
+"""The modes which control when serialized files are flushed to disk."""
 
-SerializerFunc = Callable[..., str]
+_TEMPORARY_PREFIX = ".tmp-"
+# The seconds after which a temporary file was left behind by an interrupted build.
+_STALE_TEMPORARY_AGE = 3600
+
+# Matches the names of files with serialized arguments. The second alternative matches
+# files named with uuid4 by previous versions.
+_SERIALIZED_NAME = re.compile(
+    r"[0-9a-f]{64}|[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}"
+)
+
+
+SerializerFunc = Callable[..., str | bytes]
 
 
 class SerializerEntry(TypedDict):
@@ -28,36 +84,392 @@ class SerializerEntry(TypedDict):
     suffix: str
 
 
-SERIALIZERS: dict[str, SerializerEntry] = {
-    "json": {"serializer": json.dumps, "suffix": ".json"}
+def _to_builtin(obj: Any) -> Any:
+    """Convert NumPy and pandas objects to builtin types for MessagePack."""
+    pandas = sys.modules.get("pandas")
+    if pandas is not None and isinstance(obj, pandas.DataFrame):
+        return obj.to_dict(orient="list")
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(obj, (numpy.ndarray, numpy.generic)):
+        return obj.tolist()
+    msg = f"Object of type {type(obj).__name__} cannot be serialized."
+    raise TypeError(msg)
+
+
+def _serialize_yaml(kwargs: dict[str, Any]) -> str:
+    """Serialize keyword arguments with YAML."""
+    import yaml  # noqa: PLC0415
+
+    return yaml.dump(kwargs)
+
+
+def _serialize_msgpack(kwargs: dict[str, Any]) -> bytes:
+    """Serialize keyword arguments with MessagePack."""
+    import msgpack  # noqa: PLC0415
+
+    return msgpack.packb(kwargs, default=_to_builtin)
+
+
+def _to_arrow_array(value: Any) -> Any:
+    """Convert a value to an Arrow array of length one.
+
+    Dictionaries and data frames become structs, sequences and arrays become lists and
+    all other values become scalars. NumPy arrays with a primitive type are wrapped
+    without copying.
+
+    """
+    import pyarrow as pa  # noqa: PLC0415
+
+    pandas = sys.modules.get("pandas")
+    if pandas is not None and isinstance(value, pandas.DataFrame):
+        value = {str(column): value[column].to_numpy() for column in value.columns}
+    if isinstance(value, dict):
+        if not value:
+            return pa.array([{}], type=pa.struct([]))
+        return pa.StructArray.from_arrays(
+            [_to_arrow_array(v) for v in value.values()], names=list(map(str, value))
+        )
+    numpy = sys.modules.get("numpy")
+    if isinstance(value, (list, tuple)) or (
+        numpy is not None and isinstance(value, numpy.ndarray)
+    ):
+        values = pa.array(value.ravel() if hasattr(value, "ravel") else value)
+        offsets = pa.array([0, len(values)], type=pa.int32())
+        return pa.ListArray.from_arrays(offsets, values)
+    return pa.array([value])
+
+
+def _serialize_arrow(kwargs: dict[str, Any]) -> bytes:
+    """Serialize keyword arguments to an Arrow IPC stream with a table of one row."""
+    import pyarrow as pa  # noqa: PLC0415
+
+    table = pa.table({name: _to_arrow_array(value) for name, value in kwargs.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _serialize_rds(kwargs: dict[str, Any]) -> bytes:
+    """Serialize keyword arguments to an uncompressed RDS file."""
+    from rdata.conversion import convert_python_to_r_data  # noqa: PLC0415
+    from rdata.unparser import unparse_data  # noqa: PLC0415
+
+    return unparse_data(convert_python_to_r_data(kwargs), file_type="rds")
+
+
+def _write_json(kwargs: dict[str, Any], file: BinaryIO) -> None:
+    """Write keyword arguments to JSON in chunks.
+
+    The output is the same as the one of :func:`json.dumps`, but long lists and large
+    dictionaries are encoded in chunks by the fast encoder of the standard library, so
+    that the document is never held in memory as a whole.
+
+    """
+    file.writelines(chunk.encode() for chunk in _iterencode_json(kwargs, top=True))
+
+
+def _iterencode_json(value: Any, *, top: bool = False) -> Iterator[str]:
+    """Encode a value to JSON in chunks.
+
+    Examples
+    --------
+    >>> "".join(_iterencode_json({"a": list(range(3)), "b": {"c": None}}, top=True))
+    '{"a": [0, 1, 2], "b": {"c": null}}'
+
+    """
+    if (
+        isinstance(value, dict)
+        and (top or len(value) > _JSON_CHUNK_SIZE)
+        and value
+        and all(isinstance(key, str) for key in value)
+    ):
+        yield "{"
+        separator = ""
+        # Small items are collected and encoded together.
+        pending: dict[str, Any] = {}
+        for key, item in value.items():
+            if pending and (_is_large(item) or len(pending) == _JSON_CHUNK_SIZE):
+                yield separator + json.dumps(pending)[1:-1]
+                separator = ", "
+                pending = {}
+            if _is_large(item):
+                yield f"{separator}{json.dumps(key)}: "
+                separator = ", "
+                yield from _iterencode_json(item)
+            else:
+                pending[key] = item
+        if pending:
+            yield separator + json.dumps(pending)[1:-1]
+        yield "}"
+    elif isinstance(value, (list, tuple)) and len(value) > _JSON_CHUNK_SIZE:
+        yield "["
+        for start in range(0, len(value), _JSON_CHUNK_SIZE):
+            chunk = json.dumps(value[start : start + _JSON_CHUNK_SIZE])
+            yield f"{', ' if start else ''}{chunk[1:-1]}"
+        yield "]"
+    else:
+        yield json.dumps(value)
+
+
+def _is_large(value: Any) -> bool:
+    return isinstance(value, (dict, list, tuple)) and len(value) > _JSON_CHUNK_SIZE
+
+
+# Serializers which can write to a file in chunks instead of creating the whole
+# document first.
+_STREAMING_WRITERS: dict[SerializerFunc, Callable[[dict[str, Any], BinaryIO], None]] = {
+    json.dumps: _write_json
+}
+
+
+# The built-in serializers with the package they need. Packages are only imported when
+# a serializer is used.
+_BUILTIN_SERIALIZERS: dict[str, tuple[str | None, SerializerFunc, str]] = {
+    "json": (None, json.dumps, ".json"),
+    "yaml": ("yaml", _serialize_yaml, ".yaml"),
+    "yml": ("yaml", _serialize_yaml, ".yml"),
+    "msgpack": ("msgpack", _serialize_msgpack, ".msgpack"),
+    "arrow": ("pyarrow", _serialize_arrow, ".arrow"),
+    "rds": ("rdata", _serialize_rds, ".rds"),
 }
 
 
-try:
-    import yaml
-except ImportError:  # pragma: no cover
-    pass
-else:
-    yaml_dump = cast("SerializerFunc", yaml.dump)
-    SERIALIZERS["yaml"] = {"serializer": yaml_dump, "suffix": ".yaml"}
-    SERIALIZERS["yml"] = {"serializer": yaml_dump, "suffix": ".yml"}
+@functools.cache
+def _is_installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def is_compression_available(compression: str) -> bool:
+    """Check whether serialized files can be compressed with the compression.
+
+    Compressing with zstd requires Python 3.14 or the package zstandard.
+
+    """
+    if compression == "zstd":
+        return sys.version_info >= (3, 14) or _is_installed("zstandard")
+    return compression in COMPRESSIONS
+
+
+def _open_compressed(
+    file: BinaryIO, compression: str | None
+) -> contextlib.AbstractContextManager[BinaryIO]:
+    """Wrap a file to compress everything which is written to it."""
+    if compression is None:
+        return contextlib.nullcontext(file)
+    if compression == "gzip":
+        # Without a timestamp, the same content is compressed to the same bytes.
+        return gzip.GzipFile(fileobj=file, mode="wb", mtime=0)  # ty: ignore[invalid-return-type]
+    if sys.version_info >= (3, 14):
+        from compression import zstd  # noqa: PLC0415
+
+        return cast("BinaryIO", zstd.ZstdFile(file, "wb"))
+    # zstandard is optional and may not be installed when the types are checked.
+    zstandard = importlib.import_module("zstandard")
+    return zstandard.ZstdCompressor().stream_writer(file, closefd=False)
+
+
+class _DigestWriter:
+    """Write to a file and hash everything which is written.
+
+    Without a file, the data is only hashed.
+
+    """
+
+    def __init__(self, file: BinaryIO | None, digest: Any) -> None:
+        self._file = file
+        self._digest = digest
+
+    def write(self, data: bytes) -> int:
+        self._digest.update(data)
+        return len(data) if self._file is None else self._file.write(data)
+
+    def writelines(self, lines: Iterable[bytes]) -> None:
+        for line in lines:
+            self.write(line)
+
+
+class SerializerRegistry(MutableMapping[str, SerializerEntry]):
+    """Map the names of serializers to their functions and suffixes.
+
+    Built-in serializers are available if the package they need is installed. Other
+    serializers are added with :meth:`register` or by packages which advertise them in
+    the ``pytask_r.serializers`` entry-point group. An entry point must refer to a
+    dictionary with the keys ``"serializer"`` and ``"suffix"``.
+
+    Like the dictionary it replaces, the registry can also be changed with
+    ``SERIALIZERS[name] = {"serializer": ..., "suffix": ...}`` and ``del``.
+
+    Nothing is imported before a serializer is looked up, and entry points are only read
+    if a name is not a built-in or registered serializer.
+
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, SerializerEntry] = {}
+        self._entry_points: dict[str, EntryPoint] | None = None
+        self._removed: set[str] = set()
+
+    def register(self, name: str, serializer: SerializerFunc, suffix: str) -> None:
+        """Register a serializer or replace an existing one."""
+        self._removed.discard(name)
+        self._entries[name] = {"serializer": serializer, "suffix": suffix}
+
+    def __getitem__(self, name: str) -> SerializerEntry:
+        """Get a serializer and load it on first use."""
+        if name in self._removed:
+            raise KeyError(name)
+        if name not in self._entries:
+            self._entries[name] = self._load(name)
+        return self._entries[name]
+
+    def __setitem__(self, name: str, entry: SerializerEntry) -> None:
+        """Register a serializer from a dictionary like the ones of entry points."""
+        self.register(name, entry["serializer"], entry["suffix"])
 
+    def __delitem__(self, name: str) -> None:
+        """Remove a serializer, including a built-in one or an entry point."""
+        if name not in self:
+            raise KeyError(name)
+        self._entries.pop(name, None)
+        self._removed.add(name)
 
-def create_path_to_serialized(task: PTask, suffix: str) -> Path:
-    """Create path to serialized."""
-    return (
-        (task.path.parent if isinstance(task, PTaskWithPath) else Path.cwd())
-        .joinpath(_HIDDEN_FOLDER, str(uuid.uuid4()))
-        .with_suffix(suffix)
-    )
+    def __contains__(self, name: object) -> bool:
+        """Check whether a serializer is available without loading it."""
+        if not isinstance(name, str) or name in self._removed:
+            return False
+        if name in self._entries:
+            return True
+        if name in _BUILTIN_SERIALIZERS:
+            module = _BUILTIN_SERIALIZERS[name][0]
+            return module is None or _is_installed(module)
+        return name in self._discover()
 
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the names of all available serializers."""
+        names = [*_BUILTIN_SERIALIZERS, *self._entries, *self._discover()]
+        return iter([name for name in dict.fromkeys(names) if name in self])
 
-def serialize_keyword_arguments(
+    def __len__(self) -> int:
+        """Count the available serializers."""
+        return sum(1 for _ in self)
+
+    def _load(self, name: str) -> SerializerEntry:
+        if name in _BUILTIN_SERIALIZERS:
+            module, serializer, suffix = _BUILTIN_SERIALIZERS[name]
+            if module is not None and not _is_installed(module):
+                raise KeyError(name)
+            return {"serializer": serializer, "suffix": suffix}
+
+        entry_point = self._discover().get(name)
+        if entry_point is None:
+            raise KeyError(name)
+        entry = entry_point.load()
+        if (
+            not isinstance(entry, dict)
+            or not callable(entry.get("serializer"))
+            or not isinstance(entry.get("suffix"), str)
+        ):
+            msg = (
+                f"The entry point {entry_point.value!r} of the serializer {name!r} "
+                "must refer to a dictionary with a callable 'serializer' and a "
+                "'suffix'."
+            )
+            raise TypeError(msg)
+        return {"serializer": entry["serializer"], "suffix": entry["suffix"]}
+
+    def _discover(self) -> dict[str, EntryPoint]:
+        if self._entry_points is None:
+            self._entry_points = {
+                entry_point.name: entry_point
+                for entry_point in entry_points(group=_ENTRY_POINT_GROUP)
+                if entry_point.name not in _BUILTIN_SERIALIZERS
+            }
+        return self._entry_points
+
+
+SERIALIZERS = SerializerRegistry()
+"""The serializers which can be selected by name."""
+
+
+def register_serializer(name: str, serializer: SerializerFunc, suffix: str) -> None:
+    """Register a serializer which can be selected by name.
+
+    A serializer which is selected in the configuration must be registered before the
+    configuration is parsed, for example, by a plugin.
+
+    """
+    SERIALIZERS.register(name, serializer, suffix)
+
+
+def create_path_to_serialized(
+    task: PTask, suffix: str, content: str | bytes = ""
+) -> Path:
+    """Create path to serialized.
+
+    The name of the file is the hash of the task's name and the serialized content.
+    Identical invocations of a task map to the same file.
+
+    """
+    if isinstance(content, str):
+        content = content.encode()
+    digest = _digest_task(task)
+    digest.update(content)
+    # Checking the protocol with isinstance is slow for thousands of tasks.
+    path = getattr(task, "path", None)
+    folder = path.parent if path is not None else Path.cwd()
+    return folder.joinpath(_HIDDEN_FOLDER, digest.hexdigest() + suffix)
+
+
+def _digest_task(task: PTask) -> Any:
+    """Start the hash which names the serialized file of a task."""
+    return hashlib.sha256(f"{task.name}\0".encode())
+
+
+def serialize_keyword_arguments(  # noqa: PLR0913
     serializer: str | SerializerFunc,
-    path_to_serialized: Path,
+    task: PTask,
+    suffix: str,
     kwargs: dict[str, Any],
-) -> None:
-    """Serialize keyword arguments."""
+    *,
+    compression: str | None = None,
+    sync: FileSync | None = None,
+) -> Path:
+    """Serialize keyword arguments and return the path to the file.
+
+    The content is written to a temporary file which is renamed after the hash of the
+    content, unless a file with the same content exists, so R never reads a partially
+    written file. JSON is written in chunks, so the serialized document is never held in
+    memory as a whole. ``compression`` is one of :data:`COMPRESSIONS`, and its suffix
+    must be part of ``suffix``. ``sync`` decides when the file is flushed to disk.
+
+    """
+    write = _get_writer(serializer)
+    sync = sync or FileSync()
+    folder = create_path_to_serialized(task, suffix).parent
+    digest = _digest_task(task)
+    fd, temporary = tempfile.mkstemp(prefix=_TEMPORARY_PREFIX, dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            with _open_compressed(f, compression) as file:
+                write(kwargs, _DigestWriter(file, digest))  # ty: ignore[invalid-argument-type]
+            sync.flush_file(f)
+        path_to_serialized = folder / (digest.hexdigest() + suffix)
+        if path_to_serialized.exists():
+            Path(temporary).unlink()
+        else:
+            Path(temporary).replace(path_to_serialized)
+            sync.add(path_to_serialized)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+    return path_to_serialized
+
+
+def _get_writer(
+    serializer: str | SerializerFunc,
+) -> Callable[[dict[str, Any], BinaryIO], None]:
+    """Get the function which writes the serialized keyword arguments to a file."""
     if isinstance(serializer, str):
         if serializer not in SERIALIZERS:
             msg = f"Serializer {serializer!r} is not known."
@@ -69,5 +481,229 @@ def serialize_keyword_arguments(
         msg = f"Serializer {serializer!r} is not known."
         raise TypeError(msg)
 
-    serialized = serializer_func(kwargs)
-    path_to_serialized.write_text(serialized)
+    if serializer_func in _STREAMING_WRITERS:
+        return _STREAMING_WRITERS[serializer_func]
+
+    def write(kwargs: dict[str, Any], file: BinaryIO) -> None:
+        serialized = serializer_func(kwargs)
+        file.write(serialized.encode() if isinstance(serialized, str) else serialized)
+
+    return write
+
+
+def remove_orphaned_serialized(paths_in_use: Iterable[Path]) -> None:
+    """Remove files with serialized arguments which are not used anymore.
+
+    Only the folders which contain the files in use are cleaned. Temporary files are
+    removed once they are old enough to be left behind by an interrupted build.
+
+    """
+    paths_in_use = set(paths_in_use)
+    stale = time.time() - _STALE_TEMPORARY_AGE
+    for folder in {path.parent for path in paths_in_use}:
+        if not folder.is_dir():
+            continue
+        for path in folder.iterdir():
+            if path.name.startswith(_TEMPORARY_PREFIX):
+                with contextlib.suppress(OSError):
+                    if path.stat().st_mtime < stale:
+                        path.unlink()
+            elif (
+                path not in paths_in_use
+                # Compressed files have two suffixes.
+                and _SERIALIZED_NAME.fullmatch(path.name.partition(".")[0])
+                and path.is_file()
+            ):
+                with contextlib.suppress(OSError):
+                    path.unlink()
+
+
+def digest_keyword_arguments(
+    serializer: str | SerializerFunc,
+    suffix: str,
+    nodes: dict[str, Any],
+    threshold: int | None = None,
+) -> str | None:
+    """Compute a digest of the nodes of the keyword arguments without loading them.
+
+    Files are described by their paths since only the paths are passed to R, and nodes
+    with a custom ``hash`` function by their state. Only the values of other nodes are
+    pickled, and the pickle is hashed frame by frame, so it is never held in memory as a
+    whole. ``threshold`` is the size from which values are stored in sidecar files.
+
+    Returns ``None`` if the arguments cannot be cached. Custom serializers are never
+    cached since changes to their code would go unnoticed.
+
+    """
+    if not isinstance(serializer, str):
+        return None
+    digest = hashlib.sha256()
+    try:
+        description = {
+            name: tree_map(_describe_node, tree) for name, tree in nodes.items()
+        }
+        pickle.Pickler(_DigestWriter(None, digest), pickle.HIGHEST_PROTOCOL).dump(
+            (serializer, suffix, threshold, description)
+        )
+    except Exception:  # noqa: BLE001
+        return None
+    return digest.hexdigest()
+
+
+def _describe_node(node: Any) -> tuple[str, Any]:
+    """Describe a node by what decides its serialized value."""
+    if is_path_node(node):
+        return "path", str(node.path)
+    value = node.value
+    if value is None or isinstance(value, (str, bytes, int, float)):
+        return "value", value
+    if callable(getattr(node, "hash", None)):
+        return "state", node.state()
+    return "value", value
+
+
+class SerializationCache:
+    """Remember which file holds the serialized arguments of a task across builds.
+
+    For every folder with serialized arguments, an index maps the names of tasks to the
+    digest of their keyword arguments, the file with the serialized content and the
+    sidecar files it refers to. The indices are loaded lazily and written once at the
+    end of a build.
+
+    """
+
+    def __init__(self) -> None:
+        self._indices: dict[Path, dict[str, list[str]]] = {}
+        self._changed: set[Path] = set()
+
+    def get(
+        self, task: PTask, folder: Path, digest: str
+    ) -> tuple[Path, list[Path]] | None:
+        """Get the paths to the serialized arguments and sidecars if nothing changed."""
+        entry = self._load(folder).get(task.name)
+        if entry is None or entry[0] != digest:
+            return None
+        path, *sidecars = (folder / name for name in entry[1:])
+        if not all(p.exists() for p in (path, *sidecars)):
+            return None
+        return path, sidecars
+
+    def set(
+        self,
+        task: PTask,
+        folder: Path,
+        digest: str,
+        path: Path,
+        sidecars: Iterable[Path] = (),
+    ) -> None:
+        """Store the paths to the serialized arguments and sidecars of a task."""
+        index = self._load(folder)
+        entry = [digest, path.name, *(sidecar.name for sidecar in sidecars)]
+        if index.get(task.name) != entry:
+            index[task.name] = entry
+            self._changed.add(folder)
+
+    def referenced(self, task: PTask, folder: Path) -> list[Path]:
+        """Get the paths to the files which the entry of a task refers to."""
+        entry = self._load(folder).get(task.name)
+        return [] if entry is None else [folder / name for name in entry[1:]]
+
+    def create_folder(self, folder: Path) -> None:
+        """Create the folder once per build."""
+        if folder not in self._indices:
+            folder.mkdir(parents=True, exist_ok=True)
+            self._load(folder)
+
+    def save(self, sync: FileSync | None = None) -> None:
+        """Write all changed indices."""
+        for folder in self._changed:
+            content = json.dumps(self._indices[folder]).encode()
+            with contextlib.suppress(OSError):
+                write_atomically(folder.joinpath(_INDEX), content, sync)
+        self._changed.clear()
+
+    def _load(self, folder: Path) -> dict[str, list[str]]:
+        if folder not in self._indices:
+            try:
+                index = json.loads(folder.joinpath(_INDEX).read_text())
+            except (OSError, ValueError):
+                index = {}
+            self._indices[folder] = index if isinstance(index, dict) else {}
+        return self._indices[folder]
+
+
+class FileSync:
+    """Flush written files to disk according to one of :data:`FSYNC_MODES`.
+
+    Files are always written to a temporary file and renamed, so readers never see a
+    partially written file, but the content may only reach the disk later. With
+    ``"off"``, flushing is left to the operating system. ``"file"`` flushes every file
+    before it is renamed and its folder afterwards, which is durable but slow for many
+    small files. ``"session"`` remembers the files and flushes them together with
+    :meth:`flush` at the end of the build.
+
+    """
+
+    def __init__(self, mode: str = "off") -> None:
+        if mode not in FSYNC_MODES:
+            msg = f"The fsync mode {mode!r} is not one of {list(FSYNC_MODES)}."
+            raise ValueError(msg)
+        self.mode = mode
+        self._pending: set[Path] = set()
+
+    def flush_file(self, file: BinaryIO) -> None:
+        """Flush a temporary file before it is renamed."""
+        if self.mode == "file":
+            file.flush()
+            os.fsync(file.fileno())
+
+    def add(self, path: Path) -> None:
+        """Make the file which was renamed to the path durable or remember it."""
+        if self.mode == "file":
+            _fsync_folder(path.parent)
+        elif self.mode == "session":
+            self._pending.add(path)
+
+    def flush(self) -> None:
+        """Flush all remembered files and their folders to disk."""
+        for path in self._pending:
+            with contextlib.suppress(OSError):
+                _fsync_path(path)
+        for folder in {path.parent for path in self._pending}:
+            _fsync_folder(folder)
+        self._pending.clear()
+
+
+def write_atomically(
+    path: Path, content: bytes | memoryview, sync: FileSync | None = None
+) -> None:
+    """Write the content to a temporary file and rename it to the path."""
+    sync = sync or FileSync()
+    fd, temporary = tempfile.mkstemp(prefix=_TEMPORARY_PREFIX, dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            sync.flush_file(f)
+        Path(temporary).replace(path)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+    sync.add(path)
+
+
+def _fsync_path(path: Path) -> None:
+    # Windows can only flush files which are opened for writing.
+    flags = os.O_RDWR if sys.platform == "win32" else os.O_RDONLY
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_folder(folder: Path) -> None:
+    """Flush the entries of a folder so that renamed files survive a crash."""
+    # Folders cannot be opened on Windows where renames are flushed with the file.
+    if sys.platform != "win32":
+        with contextlib.suppress(OSError):
+            _fsync_path(folder)
@@ -2,26 +2,65 @@
 
 from __future__ import annotations
 
+import re
 from collections.abc import Callable
 from collections.abc import Iterable
 from collections.abc import Sequence
 from typing import TYPE_CHECKING
 from typing import Any
+from typing import TypedDict
 
 if TYPE_CHECKING:
     from pathlib import Path
 
+    from pytask_r.logs import LogOptions
 
-def r(
+
+_SIZE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*([KMGT]?B)?")
+_SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*([smh]?)")
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600}
+_PATH_NODE_TYPES: dict[type, bool] = {}
+
+
+class RuntimeOptions(TypedDict):
+    """Describe how the R process of a task is run."""
+
+    executable: str
+    backend: str
+    preload: list[str]
+    pool_size: int | None
+    pool_max_tasks: int | None
+    pool_max_memory: int | None
+    profile: bool
+    log: LogOptions | None
+    timeout: float | None
+    retries: int
+    retry_backoff: float
+    env: dict[str, str]
+    vanilla: bool
+    cache: bool
+
+
+def r(  # noqa: PLR0913
     *,
     script: str | Path,
     options: str | Iterable[str] | None = None,
-    serializer: str | Callable[..., str] | None = None,
+    serializer: str | Callable[..., str | bytes] | None = None,
     suffix: str | None = None,
+    packages: str | Iterable[str] | None = None,  # noqa: ARG001
+    memory: int | str | None = None,  # noqa: ARG001
+    timeout: float | str | None = None,  # noqa: ARG001
+    retries: int | None = None,  # noqa: ARG001
+    threads: int | None = None,  # noqa: ARG001
+    env: dict[str, str] | None = None,  # noqa: ARG001
+    r_libs: str | Path | Iterable[str | Path] | None = None,  # noqa: ARG001
+    vanilla: bool | None = None,  # noqa: ARG001
+    cache: bool | None = None,  # noqa: ARG001
 ) -> tuple[
     str | Path | None,
     str | Iterable[str] | None,
-    str | Callable[..., str] | None,
+    str | Callable[..., str | bytes] | None,
     str | None,
 ]:
     """Parse input to the ``@pytask.mark.r`` decorator.
@@ -32,14 +71,44 @@ def r(
         The path to the R script which is executed.
     options : str | Iterable[str]
         One or multiple command line options passed to Rscript.
-    serializer: Callable[Any, str] | None
+    serializer: Callable[Any, str | bytes] | None
         A function to serialize data for the task which accepts a dictionary with all
-        the information. If the value is `None`, use either the value specified in the
-        configuration file under ``r_serializer`` or fall back to ``"json"``.
+        the information and returns a string or bytes. If the value is `None`, use
+        either the value specified in the configuration file under ``r_serializer`` or
+        fall back to ``"json"``.
     suffix: str | None
         A suffix for the serialized file. If the value is `None`, use either the value
         specified in the configuration file under ``r_suffix`` or fall back to
         ``".json"``.
+    packages: str | Iterable[str] | None
+        R packages the script depends on. Their versions are part of the fingerprint of
+        the R toolchain if ``r_fingerprint`` is enabled. Packages loaded with
+        ``library()`` or accessed with ``pkg::`` are detected automatically.
+    memory: int | str | None
+        The memory the task needs, for example, ``"8GB"``. It is used to limit the
+        memory of tasks running at the same time to ``r_max_memory``.
+    timeout: float | str | None
+        The time after which the R process of the task is killed, in seconds or as a
+        string like ``"2h"``. Overrides ``r_timeout``.
+    retries: int | None
+        How often the task is executed again if R fails or times out. Overrides
+        ``r_retries``.
+    threads: int | None
+        The number of BLAS, OpenMP and data.table threads of the task. Overrides
+        ``r_threads``.
+    env: dict[str, str] | None
+        Environment variables of the R process like ``R_ENVIRON`` or
+        ``R_PROFILE_USER``. They are merged with ``r_env``.
+    r_libs: str | Path | Iterable[str | Path] | None
+        Library trees which are searched for packages before the default ones. Relative
+        paths are resolved against the folder of the task module. Overrides
+        ``r_libs``.
+    vanilla: bool | None
+        Whether R is started with ``--vanilla`` to skip startup files like
+        ``.Rprofile``. Overrides ``r_vanilla``.
+    cache: bool | None
+        Whether the products of the task are stored in and restored from the output
+        cache. Overrides ``r_cache``.
 
     """
     options = [] if options is None else list(map(str, _to_list(options)))
@@ -62,3 +131,142 @@ def _to_list(scalar_or_iter: Any) -> list[Any]:
         if isinstance(scalar_or_iter, str) or not isinstance(scalar_or_iter, Sequence)
         else list(scalar_or_iter)
     )
+
+
+def is_path_node(node: Any) -> bool:
+    """Check whether a node is a :class:`~pytask.PPathNode`.
+
+    Checking a runtime protocol with ``isinstance`` inspects all members of the protocol
+    and is slow for trees with thousands of nodes. The result is remembered for the type
+    of the node.
+
+    Examples
+    --------
+    >>> from pathlib import Path
+    >>> from pytask import PathNode, PythonNode
+    >>> is_path_node(PathNode(path=Path("data.csv"))), is_path_node(PythonNode())
+    (True, False)
+
+    """
+    cls = type(node)
+    result = _PATH_NODE_TYPES.get(cls)
+    if result is None:
+        from pytask import PPathNode  # noqa: PLC0415
+
+        result = _PATH_NODE_TYPES[cls] = isinstance(node, PPathNode)
+    return result
+
+
+def parse_size(value: Any) -> int | None:
+    """Parse a size in bytes from an integer or a string like ``"8GB"``.
+
+    Examples
+    --------
+    >>> parse_size(1024)
+    1024
+    >>> parse_size("1.5 KB")
+    1536
+    >>> parse_size(None) is None
+    True
+
+    """
+    if value is None:
+        return None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        match = _SIZE_PATTERN.fullmatch(value.strip().upper())
+        if match is not None:
+            number, unit = match.groups()
+            return int(float(number) * _SIZE_UNITS[unit or "B"])
+    msg = f"{value!r} is not a valid size. Use an integer or a string like '8GB'."
+    raise ValueError(msg)
+
+
+def parse_duration(value: Any) -> float | None:
+    """Parse a duration in seconds from a number or a string like ``"30m"``.
+
+    Examples
+    --------
+    >>> parse_duration(90)
+    90.0
+    >>> parse_duration("1.5h")
+    5400.0
+    >>> parse_duration(None) is None
+    True
+
+    """
+    if value is None:
+        return None
+    if isinstance(value, int | float) and not isinstance(value, bool) and value >= 0:
+        return float(value)
+    if isinstance(value, str):
+        match = _DURATION_PATTERN.fullmatch(value.strip().lower())
+        if match is not None:
+            number, unit = match.groups()
+            return float(number) * _DURATION_UNITS[unit]
+    msg = f"{value!r} is not a valid duration. Use seconds or a string like '30m'."
+    raise ValueError(msg)
+
+
+def parse_threads(value: Any) -> int:
+    """Parse the number of threads of a task.
+
+    Examples
+    --------
+    >>> parse_threads(4)
+    4
+
+    """
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        msg = f"{value!r} is not a valid number of threads. Use an integer >= 1."
+        raise ValueError(msg)
+    return value
+
+
+def parse_retries(value: Any) -> int:
+    """Parse how often a failed task is retried.
+
+    Examples
+    --------
+    >>> parse_retries("2")
+    2
+    >>> parse_retries(0)
+    0
+
+    """
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        msg = f"{value!r} is not a valid number of retries. Use an integer >= 0."
+        raise ValueError(msg)
+    return value
+
+
+def create_rscript_command(executable: str, *, vanilla: bool) -> list[str]:
+    """Create the command which starts Rscript before the path to a script.
+
+    Examples
+    --------
+    >>> create_rscript_command("Rscript", vanilla=True)
+    ['Rscript', '--vanilla']
+
+    """
+    return [executable, "--vanilla"] if vanilla else [executable]
+
+
+def parse_environment(value: Any) -> dict[str, str]:
+    """Parse environment variables from a mapping of names to values.
+
+    Examples
+    --------
+    >>> parse_environment({"R_PROFILE_USER": "fast.Rprofile", "N": 1})
+    {'R_PROFILE_USER': 'fast.Rprofile', 'N': '1'}
+
+    """
+    if not isinstance(value, dict) or not all(isinstance(k, str) for k in value):
+        msg = f"{value!r} is not a valid environment. Use a mapping of names to values."
+        raise ValueError(msg)
+    return {name: str(variable) for name, variable in value.items()}
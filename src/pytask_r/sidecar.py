@@ -0,0 +1,158 @@
+"""Contains the code to store large values of keyword arguments in sidecar files.
+
+Large numeric arrays and lists are written as raw little-endian binaries in column-major
+order so that R can read them with ``readBin()`` or memory-map them. Large data frames
+are written as uncompressed Feather files. The serialized document only holds a
+reference to the file.
+
+"""
+
+from __future__ import annotations
+
+import array
+import hashlib
+import sys
+from typing import TYPE_CHECKING
+from typing import Any
+
+from pytask_r.serialization import write_atomically
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytask_r.serialization import FileSync
+
+__all__ = ["SIDECAR_KEY", "extract_sidecars"]
+
+SIDECAR_KEY = "pytask_r_sidecar"
+
+# NumPy types which R can read with readBin() and the type they are stored as.
+_NUMPY_DTYPES = {
+    "float64": "float64",
+    "float32": "float32",
+    "int32": "int32",
+    "int16": "int16",
+    "int8": "int8",
+    "uint8": "uint8",
+    "uint16": "uint16",
+    "bool": "bool",
+    # R has no 64-bit integers and reads them as doubles like jsonlite does.
+    "int64": "float64",
+    "uint32": "float64",
+    "uint64": "float64",
+}
+# The range of integers in R since the smallest 32-bit integer is NA.
+_R_INTEGER_RANGE = range(-(2**31) + 1, 2**31)
+
+
+def extract_sidecars(
+    kwargs: dict[str, Any],
+    folder: Path,
+    threshold: int,
+    sync: FileSync | None = None,
+) -> tuple[dict[str, Any], list[Path]]:
+    """Replace values larger than the threshold with references to sidecar files.
+
+    Returns the new keyword arguments and the paths to all sidecar files in use.
+
+    """
+    paths: list[Path] = []
+
+    def _replace(value: Any) -> Any:
+        reference = _write_sidecar(value, folder, threshold, sync)
+        if reference is not None:
+            paths.append(reference[1])
+            return reference[0]
+        if isinstance(value, dict):
+            return {k: _replace(v) for k, v in value.items()}
+        if isinstance(value, tuple):
+            return tuple(_replace(v) for v in value)
+        if isinstance(value, list):
+            return [_replace(v) for v in value]
+        return value
+
+    return {name: _replace(value) for name, value in kwargs.items()}, paths
+
+
+def _write_sidecar(
+    value: Any, folder: Path, threshold: int, sync: FileSync | None
+) -> tuple[dict[str, Any], Path] | None:
+    """Write the value to a sidecar file if it is large enough and supported."""
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(value, numpy.ndarray):
+        return _write_array(value, folder, threshold, sync)
+    pandas = sys.modules.get("pandas")
+    if pandas is not None and isinstance(value, pandas.DataFrame):
+        return _write_data_frame(value, folder, threshold, sync)
+    if isinstance(value, (list, tuple)) and len(value) * 8 >= threshold:
+        return _write_numeric_list(value, folder, sync)
+    return None
+
+
+def _write_array(
+    value: Any, folder: Path, threshold: int, sync: FileSync | None
+) -> tuple[dict[str, Any], Path] | None:
+    import numpy as np  # noqa: PLC0415
+
+    if value.nbytes < threshold or value.dtype.name not in _NUMPY_DTYPES:
+        return None
+    dtype = np.dtype(_NUMPY_DTYPES[value.dtype.name]).newbyteorder("<")
+    data = np.asfortranarray(value, dtype=dtype)
+    path = _write_content(data.reshape(-1, order="F").data, folder, ".bin", sync)
+    return _create_reference(path, "bin", dtype.name, list(value.shape)), path
+
+
+def _write_data_frame(
+    value: Any, folder: Path, threshold: int, sync: FileSync | None
+) -> tuple[dict[str, Any], Path] | None:
+    if value.memory_usage(deep=False).sum() < threshold:
+        return None
+    try:
+        import pyarrow as pa  # noqa: PLC0415
+        import pyarrow.feather  # noqa: PLC0415
+    except ImportError:
+        return None
+    sink = pa.BufferOutputStream()
+    pyarrow.feather.write_feather(value, sink, compression="uncompressed")
+    path = _write_content(memoryview(sink.getvalue()), folder, ".arrow", sync)
+    return _create_reference(path, "arrow", None, list(value.shape)), path
+
+
+def _write_numeric_list(
+    value: list[Any] | tuple[Any, ...], folder: Path, sync: FileSync | None
+) -> tuple[dict[str, Any], Path] | None:
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value):
+        return None
+    # Integers are read as integers in R unless they do not fit into R's integers.
+    if all(isinstance(v, int) and v in _R_INTEGER_RANGE for v in value):
+        data = array.array("i", value)
+        dtype = "int32"
+    else:
+        data = array.array("d", value)
+        dtype = "float64"
+    if sys.byteorder == "big":  # pragma: no cover
+        data.byteswap()
+    path = _write_content(memoryview(data), folder, ".bin", sync)
+    return _create_reference(path, "bin", dtype, [len(value)]), path
+
+
+def _write_content(
+    content: memoryview, folder: Path, suffix: str, sync: FileSync | None
+) -> Path:
+    """Write the content to a file named by its hash unless the file exists."""
+    content = content.cast("B")
+    path = folder.joinpath(hashlib.sha256(content).hexdigest()).with_suffix(suffix)
+    if not path.exists():
+        write_atomically(path, content, sync)
+    return path
+
+
+def _create_reference(
+    path: Path, format_: str, dtype: str | None, shape: list[int]
+) -> dict[str, Any]:
+    """Create the reference to a sidecar file which replaces the value."""
+    reference: dict[str, Any] = {"path": path.as_posix(), "format": format_}
+    if dtype is not None:
+        reference["dtype"] = dtype
+    reference["shape"] = shape
+    return {SIDECAR_KEY: reference}
@@ -0,0 +1,243 @@
+"""Contains the remote stores which share the output cache between machines.
+
+A store holds the entries of the output cache under names like ``ab/abc.../0``. The
+local cache downloads entries it does not have from the store and uploads the entries it
+creates, so that CI runners and other machines can restore products which were built
+elsewhere.
+
+Stores are selected by the scheme of a URL. Paths and ``file://`` URLs select a folder,
+for example, on a network drive, and ``s3://bucket/prefix`` selects a bucket of S3 or
+an S3-compatible service like MinIO. Other stores are added with
+:func:`register_store` or by packages which advertise a factory in the
+``pytask_r.stores`` entry-point group.
+
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from collections.abc import Callable
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Any
+from typing import Protocol
+from typing import TypedDict
+from urllib.parse import urlsplit
+
+__all__ = [
+    "STORES",
+    "ArtifactStore",
+    "FileSystemStore",
+    "S3Store",
+    "StoreOptions",
+    "create_store",
+    "register_store",
+]
+
+_ENTRY_POINT_GROUP = "pytask_r.stores"
+_MIN_PART_SIZE = 5 * 1024**2
+
+
+class StoreOptions(TypedDict):
+    """Describe how files are transferred to and from a store."""
+
+    max_workers: int
+    chunk_size: int
+
+
+class ArtifactStore(Protocol):
+    """The interface of a remote store for the entries of the output cache.
+
+    Names are relative POSIX paths. Methods may be called from several threads at the
+    same time.
+
+    """
+
+    def exists(self, name: str) -> bool:
+        """Check whether the store contains a file."""
+        ...
+
+    def download(self, name: str, path: Path) -> bool:
+        """Download a file and return whether it exists."""
+        ...
+
+    def upload(self, path: Path, name: str) -> None:
+        """Upload a file so that it only becomes visible once it is complete."""
+        ...
+
+
+StoreFactory = Callable[[str, StoreOptions], ArtifactStore]
+
+
+class FileSystemStore:
+    """Store files in a folder which may be shared over a network like NFS.
+
+    Files are copied in chunks, and uploads are written to a temporary file which is
+    renamed once it is complete.
+
+    """
+
+    def __init__(self, folder: Path, options: StoreOptions) -> None:
+        self.folder = folder
+        self.chunk_size = options["chunk_size"]
+
+    def exists(self, name: str) -> bool:
+        """Check whether the folder contains a file."""
+        return self.folder.joinpath(name).exists()
+
+    def download(self, name: str, path: Path) -> bool:
+        """Copy a file from the folder."""
+        try:
+            source = self.folder.joinpath(name).open("rb")
+        except FileNotFoundError:
+            return False
+        with source, path.open("wb") as target:
+            shutil.copyfileobj(source, target, self.chunk_size)
+        return True
+
+    def upload(self, path: Path, name: str) -> None:
+        """Copy a file to the folder."""
+        target = self.folder.joinpath(name)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(prefix=".tmp-", dir=target.parent)
+        try:
+            with path.open("rb") as source, os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(source, f, self.chunk_size)
+            Path(temporary).replace(target)
+        except BaseException:
+            Path(temporary).unlink(missing_ok=True)
+            raise
+
+
+class S3Store:
+    """Store files in a bucket of S3 or an S3-compatible service like MinIO.
+
+    The store requires boto3, which reads the credentials and the endpoint from the
+    usual sources like ``AWS_ACCESS_KEY_ID`` and ``AWS_ENDPOINT_URL``. Files larger
+    than the chunk size are transferred in parts by several threads.
+
+    Parameters
+    ----------
+    bucket
+        The name of the bucket.
+    prefix
+        The prefix of all objects in the bucket.
+    options
+        The number of threads and the size of the parts, which is at least 5 MB.
+    client
+        A client of boto3. By default, a client for S3 is created.
+
+    """
+
+    def __init__(
+        self, bucket: str, prefix: str, options: StoreOptions, client: Any = None
+    ) -> None:
+        try:
+            import boto3  # noqa: PLC0415
+            from boto3.s3.transfer import TransferConfig  # noqa: PLC0415
+        except ImportError as e:
+            msg = "The S3 store of the output cache requires boto3."
+            raise ImportError(msg) from e
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self._client = boto3.client("s3") if client is None else client
+        # S3 rejects parts smaller than 5 MB except for the last one.
+        chunk_size = max(options["chunk_size"], _MIN_PART_SIZE)
+        self._config = TransferConfig(
+            multipart_threshold=chunk_size,
+            multipart_chunksize=chunk_size,
+            max_concurrency=options["max_workers"],
+        )
+
+    def exists(self, name: str) -> bool:
+        """Check whether the bucket contains an object."""
+        from botocore.exceptions import ClientError  # noqa: PLC0415
+
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._key(name))
+        except ClientError as e:
+            if _is_missing(e):
+                return False
+            raise
+        return True
+
+    def download(self, name: str, path: Path) -> bool:
+        """Download an object."""
+        from botocore.exceptions import ClientError  # noqa: PLC0415
+
+        try:
+            self._client.download_file(
+                self.bucket, self._key(name), str(path), Config=self._config
+            )
+        except ClientError as e:
+            if _is_missing(e):
+                return False
+            raise
+        return True
+
+    def upload(self, path: Path, name: str) -> None:
+        """Upload an object."""
+        self._client.upload_file(
+            str(path), self.bucket, self._key(name), Config=self._config
+        )
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+
+def _is_missing(error: Any) -> bool:
+    """Check whether an error of boto3 means that an object does not exist."""
+    code = error.response.get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+def _create_filesystem_store(url: str, options: StoreOptions) -> FileSystemStore:
+    parts = urlsplit(url)
+    path = parts.path if parts.scheme == "file" else url
+    return FileSystemStore(Path(path).expanduser(), options)
+
+
+def _create_s3_store(url: str, options: StoreOptions) -> S3Store:
+    parts = urlsplit(url)
+    return S3Store(parts.netloc, parts.path, options)
+
+
+STORES: dict[str, StoreFactory] = {
+    "file": _create_filesystem_store,
+    "s3": _create_s3_store,
+}
+"""The factories of stores by the scheme of their URLs."""
+
+
+def register_store(scheme: str, factory: StoreFactory) -> None:
+    """Register a factory which creates stores for URLs with the scheme."""
+    STORES[scheme] = factory
+
+
+def create_store(url: str, options: StoreOptions) -> ArtifactStore:
+    """Create the store for a URL or a path.
+
+    Examples
+    --------
+    >>> options = {"max_workers": 4, "chunk_size": 8 * 1024**2}
+    >>> create_store("/mnt/cache", options).folder.as_posix()
+    '/mnt/cache'
+
+    """
+    scheme = urlsplit(url).scheme
+    # Windows drive letters look like schemes.
+    if len(scheme) <= 1:
+        scheme = "file"
+    if scheme not in STORES:
+        for entry_point in entry_points(group=_ENTRY_POINT_GROUP, name=scheme):
+            STORES[scheme] = entry_point.load()
+    if scheme not in STORES:
+        msg = (
+            f"There is no store for URLs starting with '{scheme}://'. Available are "
+            f"{sorted(STORES)}."
+        )
+        raise ValueError(msg)
+    return STORES[scheme](url, options)
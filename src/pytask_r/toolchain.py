@@ -0,0 +1,213 @@
+"""Contains functions to find and inspect the R installation once per session."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from typing import TYPE_CHECKING
+from typing import Any
+
+from pytask_r.environment import THREAD_VARIABLES
+from pytask_r.environment import merge_environment
+from pytask_r.shared import create_rscript_command
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+__all__ = [
+    "RInfo",
+    "find_r_executable",
+    "fingerprint_r",
+    "get_package_versions",
+    "get_r_info",
+    "register_packages",
+]
+
+# The marker separates the result from output of startup files like .Rprofile.
+_MARKER = "--- pytask-r ---"
+_PROBE = f'cat("{_MARKER}", as.character(getRversion()), .libPaths(), sep = "\\n")'
+_PROBE_PACKAGES = (
+    f'cat("{_MARKER}", sep = "\\n"); '
+    "for (p in commandArgs(trailingOnly = TRUE)) cat(p, tryCatch("
+    'as.character(packageVersion(p)), error = function(e) "missing"), sep = "\\t", '
+    "fill = TRUE)"
+)
+
+
+@dataclass(frozen=True)
+class RInfo:
+    """Information on the R installation which executes the tasks.
+
+    Attributes
+    ----------
+    executable
+        The absolute path to ``Rscript``.
+    version
+        The version of R, for example, ``"4.3.1"``.
+    lib_paths
+        The library trees returned by ``.libPaths()``.
+    startup
+        The seconds it took to start R and run the probe.
+
+    """
+
+    executable: str
+    version: str
+    lib_paths: tuple[str, ...]
+    startup: float = field(default=0.0, compare=False)
+
+
+def find_r_executable(config: dict[str, Any]) -> str | None:
+    """Find the ``Rscript`` executable once per session.
+
+    The executable is either configured with ``r_executable`` or looked up on the PATH.
+
+    """
+    if "_r_executable" not in config:
+        config["_r_executable"] = shutil.which(config.get("r_executable") or "Rscript")
+    return config["_r_executable"]
+
+
+def _run_probe(
+    config: dict[str, Any],
+    code: str,
+    *args: str,
+    env: dict[str, str] | None = None,
+    vanilla: bool = False,
+) -> list[str]:
+    """Run R code with Rscript and return the lines printed after the marker."""
+    executable = find_r_executable(config)
+    if executable is None:
+        msg = "Rscript is needed to run R scripts, but it is not found."
+        raise RuntimeError(msg)
+    output = subprocess.run(  # noqa: S603
+        [
+            *create_rscript_command(executable, vanilla=vanilla),
+            "-e",
+            code,
+            "--args",
+            *args,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=merge_environment(env or {}),
+    ).stdout.splitlines()
+    return output[output.index(_MARKER) + 1 :]
+
+
+def get_r_info(config: dict[str, Any]) -> RInfo:
+    """Probe the version and library trees of R once per session.
+
+    The result is stored under ``r_info`` in the configuration.
+
+    """
+    if "r_info" not in config:
+        start = time.perf_counter()
+        output = _run_probe(config, _PROBE)
+        config["r_info"] = RInfo(
+            executable=config["_r_executable"],
+            version=output[0],
+            lib_paths=tuple(output[1:]),
+            startup=time.perf_counter() - start,
+        )
+    return config["r_info"]
+
+
+def _probe_key(
+    env: dict[str, str] | None, *, vanilla: bool
+) -> tuple[tuple[tuple[str, str], ...], bool]:
+    """Create the key of the environment in which packages are probed.
+
+    Library trees in ``R_LIBS``, other variables and startup files skipped by
+    ``--vanilla`` decide which packages R finds. Threads do not.
+
+    Examples
+    --------
+    >>> _probe_key({"R_LIBS": "lib", "OMP_NUM_THREADS": "2"}, vanilla=False)
+    ((('R_LIBS', 'lib'),), False)
+
+    """
+    items = tuple(
+        sorted(
+            (name, value)
+            for name, value in (env or {}).items()
+            if name not in THREAD_VARIABLES
+        )
+    )
+    return items, vanilla
+
+
+def register_packages(
+    config: dict[str, Any],
+    packages: Iterable[str],
+    *,
+    env: dict[str, str] | None = None,
+    vanilla: bool = False,
+) -> None:
+    """Register packages whose versions are probed together on first use.
+
+    Packages are registered per environment of the R process, see
+    :func:`get_package_versions`.
+
+    """
+    registered = config.setdefault("_r_registered_packages", {})
+    registered.setdefault(_probe_key(env, vanilla=vanilla), set()).update(packages)
+
+
+def get_package_versions(
+    config: dict[str, Any],
+    packages: Iterable[str],
+    *,
+    env: dict[str, str] | None = None,
+    vanilla: bool = False,
+) -> dict[str, str]:
+    """Get the installed versions of R packages.
+
+    All registered packages whose versions are not known yet are probed with a single
+    call to Rscript. Packages which are not installed have the version ``"missing"``.
+
+    Since the variables of a task, for example, its library trees in ``R_LIBS``, and
+    ``--vanilla`` decide which packages R finds, the packages are probed in the same
+    environment as the task and the versions are remembered per environment.
+
+    """
+    key = _probe_key(env, vanilla=vanilla)
+    packages = set(packages)
+    versions: dict[str, str] = config.setdefault("_r_package_versions", {}).setdefault(
+        key, {}
+    )
+    registered = config.get("_r_registered_packages", {}).get(key, set())
+    unknown = (packages | registered) - set(versions)
+    if unknown and packages - set(versions):
+        for line in _run_probe(
+            config, _PROBE_PACKAGES, *sorted(unknown), env=env, vanilla=vanilla
+        ):
+            name, _, version = line.partition("\t")
+            versions[name] = version
+    return {name: versions.get(name, "missing") for name in sorted(packages)}
+
+
+def fingerprint_r(
+    config: dict[str, Any],
+    packages: Iterable[str],
+    *,
+    env: dict[str, str] | None = None,
+    vanilla: bool = False,
+) -> str:
+    """Compute a hash of the R version and the versions of the packages.
+
+    The versions are probed in the environment of the task, see
+    :func:`get_package_versions`.
+
+    """
+    content = {
+        "r": get_r_info(config).version,
+        "packages": get_package_versions(config, packages, env=env, vanilla=vanilla),
+    }
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()
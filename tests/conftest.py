@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import shutil
 import sys
+import textwrap
 from contextlib import contextmanager
 from typing import TYPE_CHECKING
 
@@ -98,3 +99,87 @@ class CustomCliRunner(CliRunner):
 @pytest.fixture
 def runner():
     return CustomCliRunner()
+
+
+@pytest.fixture
+def fake_rscript(tmp_path):
+    """Create an executable which answers the probes like Rscript.
+
+    Package versions are read from ``versions.json`` next to the executable and the
+    arguments of every call are appended to ``calls.txt``. Scripts are not executed, but
+    their path is printed and the environment is written to ``environ.json``. They
+    succeed unless they contain ``stop(`` and hang if they contain ``Sys.sleep(``.
+    Scripts which contain ``writeLines(`` write to the path passed as ``produces``.
+
+    """
+    if sys.platform == "win32":
+        pytest.skip("Requires a POSIX shebang.")
+    folder = tmp_path / "bin"
+    folder.mkdir()
+    path = folder / "Rscript"
+    path.write_text(
+        textwrap.dedent(
+            f"""\
+            #!{sys.executable}
+            import json
+            import os
+            import sys
+            from pathlib import Path
+
+            here = Path(__file__).parent
+
+            def write_product(script, serialized):
+                if "writeLines(" in Path(script).read_text():
+                    produces = json.loads(Path(serialized).read_text())["produces"]
+                    Path(produces).write_text(f"Ran {{script}}.")
+
+            with here.joinpath("calls.txt").open("a") as f:
+                f.write(json.dumps(sys.argv[1:]) + "\\n")
+            sys.argv = [arg for arg in sys.argv if arg != "--vanilla"]
+            if sys.argv[1] == "-e":
+                print("Output of .Rprofile")
+                print("--- pytask-r ---")
+                if "packageVersion" in sys.argv[2]:
+                    versions_file = here / "versions.json"
+                    versions = (
+                        json.loads(versions_file.read_text())
+                        if versions_file.exists()
+                        else {{}}
+                    )
+                    for package in sys.argv[sys.argv.index("--args") + 1 :]:
+                        print(package, versions.get(package, "missing"), sep="\\t")
+                else:
+                    print("4.3.1")
+                    print("/usr/lib/R/library")
+                    print("/home/user/R/library")
+            elif sys.argv[3:4] == ["batch"]:
+                manifest = Path(sys.argv[2])
+                here.joinpath("environ.json").write_text(json.dumps(dict(os.environ)))
+                answers = ["ready"]
+                for line in manifest.read_text().splitlines():
+                    script, stdout, _, *args = line.split("\\t")
+                    Path(stdout).write_text(f"Ran {{script}} with {{args}}.")
+                    if "Sys.sleep(" in Path(script).read_text():
+                        import time
+
+                        time.sleep(60)
+                    write_product(script, args[-1])
+                    failed = "stop(" in Path(script).read_text()
+                    answers.append("error\\tboom" if failed else "ok\\t0.05\\t0.04\\t0")
+                Path(f"{{manifest}}.results").write_text("\\n".join(answers) + "\\n")
+            else:
+                print(f"Ran {{sys.argv[1]}}.")
+                here.joinpath("environ.json").write_text(json.dumps(dict(os.environ)))
+                source = Path(sys.argv[1]).read_text()
+                if "Sys.sleep(" in source:
+                    import time
+
+                    time.sleep(60)
+                if "stop(" in source:
+                    sys.exit("Error: boom")
+                write_product(sys.argv[1], sys.argv[-1])
+            """
+        )
+    )
+    path.chmod(0o755)
+    return path
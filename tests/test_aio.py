@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+from pytask_r.aio import Command
+from pytask_r.aio import _run
+from pytask_r.aio import run_concurrently
+from pytask_r.logs import TaskLog
+
+
+def _python(code):
+    return [sys.executable, "-c", textwrap.dedent(code)]
+
+
+def test_run_concurrently_collects_outputs():
+    commands = [
+        Command(_python("import sys; print('out'); print('err', file=sys.stderr)")),
+        Command(_python("import sys; sys.exit(3)")),
+    ]
+
+    first, second = run_concurrently(commands, max_processes=1)
+
+    assert (first.returncode, first.stdout.strip(), first.stderr.strip()) == (
+        0,
+        "out",
+        "err",
+    )
+    assert second.returncode == 3  # noqa: PLR2004
+    assert first.stats["wall"] > 0
+
+
+def test_run_concurrently_inside_running_event_loop():
+    async def main():
+        return run_concurrently([Command(_python("print('out')"))], 1)
+
+    (result,) = asyncio.run(main())
+
+    assert (result.returncode, result.stdout.strip()) == (0, "out")
+
+
+def test_run_concurrently_streams_to_log(tmp_path):
+    path = tmp_path / "task.log"
+    with TaskLog(path, {"max_size": 1024, "backups": 0, "tail": 64}) as log:
+        (result,) = run_concurrently([Command(_python("print('to log')"), log)], 4)
+
+    assert result.stdout == ""
+    assert path.read_text().strip() == "to log"
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="Inspects /proc.")
+def test_cancel_kills_process_tree(tmp_path):
+    pid_file = tmp_path / "pid.txt"
+    code = f"""
+    import subprocess, sys, time
+    from pathlib import Path
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    Path({pid_file.as_posix()!r}).write_text(str(child.pid))
+    time.sleep(60)
+    """
+
+    async def main():
+        task = asyncio.create_task(_run(Command(_python(code))))
+        # The file exists before the pid is written to it.
+        while not pid_file.exists() or not pid_file.read_text():  # noqa: ASYNC110
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+
+    # The signal is delivered asynchronously, so the child may need a moment to exit.
+    deadline = time.monotonic() + 5
+    while _is_running(int(pid_file.read_text())):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def _is_running(pid):
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except FileNotFoundError:
+        return False
+    return "zombie" not in status
+
+
+def test_retry_commands_which_time_out(tmp_path):
+    counter = tmp_path / "counter.txt"
+    code = f"""
+    import time
+    from pathlib import Path
+    path = Path({counter.as_posix()!r})
+    n = int(path.read_text()) if path.exists() else 0
+    path.write_text(str(n + 1))
+    if n == 0:
+        time.sleep(60)
+    """
+    command = Command(_python(code), timeout=1, retries=1, backoff=0)
+
+    (result,) = run_concurrently([command], 1)
+
+    assert not result.timed_out
+    assert result.returncode == 0
+    assert counter.read_text() == "2"
+
+
+def test_report_commands_which_time_out():
+    command = Command(_python("import time; time.sleep(60)"), timeout=0.5)
+
+    (result,) = run_concurrently([command], 1)
+
+    assert result.timed_out
+    assert result.stats["wall"] < 30  # noqa: PLR2004
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import textwrap
 from contextlib import ExitStack as does_not_raise  # noqa: N813
 
 import pytest
+from pytask import ExitCode
 from pytask import Mark
+from pytask import PythonNode
+from pytask import build
+from pytask import get_marks
 
 from pytask_r.collect import _parse_r_mark
 from pytask_r.collect import r
@@ -94,6 +99,112 @@ def test_r(args, kwargs, expectation, expected):
                 },
             ),
         ),
+        (
+            Mark("r", (), {"script": "script.r", "memory": "1.5 GB"}),
+            [],
+            None,
+            ".json",
+            does_not_raise(),
+            Mark(
+                "r",
+                (),
+                {
+                    "script": "script.r",
+                    "options": [],
+                    "serializer": None,
+                    "suffix": ".json",
+                    "memory": int(1.5 * 1024**3),
+                },
+            ),
+        ),
+        (
+            Mark("r", (), {"script": "script.r", "memory": "a lot"}),
+            [],
+            None,
+            ".json",
+            pytest.raises(ValueError, match="not a valid size"),
+            None,
+        ),
+        (
+            Mark("r", (), {"script": "script.r", "timeout": "2h", "retries": 3}),
+            [],
+            None,
+            ".json",
+            does_not_raise(),
+            Mark(
+                "r",
+                (),
+                {
+                    "script": "script.r",
+                    "options": [],
+                    "serializer": None,
+                    "suffix": ".json",
+                    "timeout": 7200.0,
+                    "retries": 3,
+                },
+            ),
+        ),
+        (
+            Mark(
+                "r",
+                (),
+                {
+                    "script": "script.r",
+                    "env": {"R_MAX_VSIZE": 100},
+                    "r_libs": "lib",
+                    "vanilla": True,
+                },
+            ),
+            [],
+            None,
+            ".json",
+            does_not_raise(),
+            Mark(
+                "r",
+                (),
+                {
+                    "script": "script.r",
+                    "options": [],
+                    "serializer": None,
+                    "suffix": ".json",
+                    "env": {"R_MAX_VSIZE": "100"},
+                    "r_libs": ["lib"],
+                    "vanilla": True,
+                },
+            ),
+        ),
+        (
+            Mark("r", (), {"script": "script.r", "vanilla": "yes"}),
+            [],
+            None,
+            ".json",
+            pytest.raises(TypeError, match="not a boolean"),
+            None,
+        ),
+        (
+            Mark("r", (), {"script": "script.r", "cache": 1}),
+            [],
+            None,
+            ".json",
+            pytest.raises(TypeError, match="'cache' is 1 and not a boolean"),
+            None,
+        ),
+        (
+            Mark("r", (), {"script": "script.r", "threads": 0}),
+            [],
+            None,
+            ".json",
+            pytest.raises(ValueError, match="not a valid number of threads"),
+            None,
+        ),
+        (
+            Mark("r", (), {"script": "script.r", "retries": -1}),
+            [],
+            None,
+            ".json",
+            pytest.raises(ValueError, match="not a valid number of retries"),
+            None,
+        ),
     ],
 )
 def test_parse_r_mark(  # noqa: PLR0913
@@ -107,3 +218,86 @@ def test_parse_r_mark(  # noqa: PLR0913
     with expectation:
         out = _parse_r_mark(mark, default_options, default_serializer, default_suffix)
         assert out == expected
+
+
+def test_collect_scanned_dependencies(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"))
+    def task_example(produces=Path("out.rds")): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text(
+        'source("helpers.R")\nsaveRDS(readRDS("out.rds"), "out.rds")'
+    )
+    tmp_path.joinpath("helpers.R").write_text('x <- read.csv("data.csv")')
+    tmp_path.joinpath("data.csv").touch()
+    tmp_path.joinpath("out.rds").touch()
+
+    session = build(paths=tmp_path, dry_run=True, r_scan=True)
+
+    scanned = session.tasks[0].depends_on["_scanned"]
+    assert {node.path for node in scanned} == {
+        tmp_path / "helpers.R",
+        tmp_path / "data.csv",
+    }
+    assert tmp_path.joinpath(".pytask", "pytask-r", "scan.json").exists()
+
+
+def test_collect_without_scanning(tmp_path):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"))
+    def task_example(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text('source("helpers.R")')
+    tmp_path.joinpath("helpers.R").touch()
+
+    session = build(paths=tmp_path, dry_run=True)
+
+    assert "_scanned" not in session.tasks[0].depends_on
+
+
+def test_tasks_with_the_same_mark_share_parsed_mark_and_nodes(tmp_path):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+    from pytask import task
+
+    for i in range(3):
+
+        @task(id=str(i))
+        @mark.r(script=Path("script.r"), options=["--a"], vanilla=True)
+        def task_example(value=i): ...
+
+    @mark.r(script=Path("script.r"), options=["--a"], vanilla=1)
+    def task_invalid(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text('source("helpers.R")')
+    tmp_path.joinpath("helpers.R").touch()
+
+    session = build(paths=tmp_path, dry_run=True, r_scan=True)
+
+    assert session.exit_code == ExitCode.COLLECTION_FAILED
+    assert "'vanilla' is 1 and not a boolean" in str(session.collection_reports)
+    first, *others = session.tasks
+    runtime = first.depends_on["_runtime"]
+    assert isinstance(runtime, PythonNode)
+    for other in others:
+        other_runtime = other.depends_on["_runtime"]
+        other_options = other.depends_on["_options"]
+        assert isinstance(other_runtime, PythonNode)
+        assert isinstance(other_options, PythonNode)
+        assert get_marks(other, "r")[0] is get_marks(first, "r")[0]
+        assert other.depends_on["_script"] is first.depends_on["_script"]
+        assert other_runtime.value is runtime.value
+        assert other.depends_on["_scanned"][0] is first.depends_on["_scanned"][0]
+        assert other_options.value == ["--a"]
+        assert other_options is not first.depends_on["_options"]
@@ -1,8 +1,91 @@
 from __future__ import annotations
 
+import pytest
+from pytask import ExitCode
 from pytask import build
 
 
 def test_marker_is_configured(tmp_path):
     session = build(paths=tmp_path)
     assert "r" in session.config["markers"]
+
+
+@pytest.mark.parametrize(
+    ("config", "expected"),
+    [
+        ({}, ("subprocess", None, 100, None)),
+        (
+            {
+                "r_backend": "pool",
+                "r_pool_size": 4,
+                "r_pool_max_tasks": "10",
+                "r_pool_max_memory": "1GB",
+            },
+            ("pool", 4, 10, 1024**3),
+        ),
+    ],
+)
+def test_pool_is_configured(tmp_path, config, expected):
+    session = build(paths=tmp_path, **config)
+    result = tuple(
+        session.config[name]
+        for name in (
+            "r_backend",
+            "r_pool_size",
+            "r_pool_max_tasks",
+            "r_pool_max_memory",
+        )
+    )
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"r_backend": "unknown"},
+        {"r_pool_size": 0},
+        {"r_pool_max_memory": "a lot"},
+        {"r_preload": "data.table"},
+        {"r_max_memory": "lots"},
+        {"r_log_output": "yes"},
+        {"r_log_backups": 0},
+        {"r_timeout": "forever"},
+        {"r_retries": -1},
+        {"r_threads": 0},
+        {"r_env": ["R_LIBS=lib"]},
+        {"r_vanilla": "yes"},
+        {"r_cache": "yes"},
+        {"r_cache_max_size": "huge"},
+        {"r_cache_remote": ["s3://bucket"]},
+        {"r_cache_remote_workers": 0},
+        {"r_compression": "bz2"},
+        {"r_fsync": "always"},
+    ],
+)
+def test_raise_error_for_invalid_pool_configuration(tmp_path, config):
+    session = build(paths=tmp_path, **config)
+    assert session.exit_code == ExitCode.CONFIGURATION_FAILED
+
+
+def test_preload_is_configured(tmp_path):
+    session = build(paths=tmp_path, r_backend="pool", r_preload=["data.table"])
+    assert session.config["r_preload"] == ["data.table"]
+
+
+def test_sidecar_threshold_is_configured(tmp_path):
+    session = build(paths=tmp_path, r_sidecar_threshold="1MB")
+    assert session.config["r_sidecar_threshold"] == 1024**2
+
+
+def test_raise_error_for_invalid_fingerprint_configuration(tmp_path):
+    session = build(paths=tmp_path, r_fingerprint="yes")
+    assert session.exit_code == ExitCode.CONFIGURATION_FAILED
+
+
+def test_log_output_is_configured(tmp_path):
+    session = build(paths=tmp_path, r_log_output=True, r_log_max_size="1MB")
+    result = tuple(
+        session.config[name]
+        for name in ("r_log_output", "r_log_max_size", "r_log_backups", "r_log_tail")
+    )
+    assert result == (True, 1024**2, 3, 64 * 1024)
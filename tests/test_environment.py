@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from pytask_r.environment import THREAD_VARIABLES
+from pytask_r.environment import create_environment
+from pytask_r.environment import get_default_threads
+from pytask_r.environment import merge_environment
+
+
+@pytest.mark.parametrize(
+    ("config", "expected"),
+    [
+        ({"r_backend": "subprocess"}, None),
+        ({"r_backend": "subprocess", "n_workers": 1}, None),
+        ({"r_backend": "subprocess", "n_workers": 3}, 10),
+        ({"r_backend": "pool", "n_workers": 64}, 1),
+        ({"r_backend": "async", "r_async_workers": 4, "n_workers": 1}, 8),
+        ({"r_backend": "async", "r_async_workers": 1}, None),
+    ],
+)
+def test_get_default_threads(monkeypatch, config, expected):
+    monkeypatch.setattr("os.cpu_count", lambda: 32)
+    assert get_default_threads(config) == expected
+
+
+def test_create_environment_respects_environment(monkeypatch):
+    for name in THREAD_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("OMP_NUM_THREADS", "2")
+
+    env = create_environment(4, explicit=False)
+    assert "OMP_NUM_THREADS" not in env
+    assert env["R_DATATABLE_NUM_THREADS"] == "4"
+
+    env = create_environment(4, explicit=True)
+    assert env == dict.fromkeys(THREAD_VARIABLES, "4")
+
+
+def test_create_environment_with_variables_and_libraries(tmp_path):
+    env = create_environment(
+        2,
+        explicit=True,
+        variables={"OMP_NUM_THREADS": "1", "R_PROFILE_USER": "fast.Rprofile"},
+        r_libs=[tmp_path / "a", tmp_path / "b"],
+    )
+
+    assert env["OMP_NUM_THREADS"] == "1"
+    assert env["MKL_NUM_THREADS"] == "2"
+    assert env["R_PROFILE_USER"] == "fast.Rprofile"
+    assert env["R_LIBS"] == os.pathsep.join([str(tmp_path / "a"), str(tmp_path / "b")])
+
+
+def test_merge_environment_is_built_once_per_configuration():
+    first = merge_environment({"R_PROFILE_USER": "fast.Rprofile"})
+
+    assert first is not None
+    assert first["R_PROFILE_USER"] == "fast.Rprofile"
+    assert first["PATH"] == os.environ["PATH"]
+    assert merge_environment({"R_PROFILE_USER": "fast.Rprofile"}) is first
+    assert merge_environment({}) is None
@@ -1,24 +1,35 @@
 from __future__ import annotations
 
+import gzip
+import json
+import sys
 import textwrap
 from pathlib import Path
+from typing import Any
 
 import pytest
 from pytask import ExitCode
 from pytask import Mark
+from pytask import PathNode
+from pytask import PythonNode
+from pytask import Session
 from pytask import Task
+from pytask import TaskOutcome
 from pytask import build
 from pytask import cli
 
+from pytask_r.execute import collect_keyword_arguments
 from pytask_r.execute import pytask_execute_task_setup
+from pytask_r.serialization import SERIALIZERS
 from tests.conftest import needs_rscript
 from tests.conftest import parametrize_parse_code_serializer_suffix
+from tests.conftest import restore_sys_path_and_module_after_test_execution
 
 
 def test_pytask_execute_task_setup(monkeypatch):
     """Make sure that the task setup raises errors."""
     # Act like r is installed since we do not test this.
-    monkeypatch.setattr("pytask_r.execute.shutil.which", lambda x: None)  # noqa: ARG005
+    monkeypatch.setattr("pytask_r.toolchain.shutil.which", lambda x: None)  # noqa: ARG005
 
     task = Task(
         base_name="task_example",
@@ -28,7 +39,7 @@ def test_pytask_execute_task_setup(monkeypatch):
     )
 
     with pytest.raises(RuntimeError, match="Rscript is needed"):
-        pytask_execute_task_setup(task)
+        pytask_execute_task_setup(session=Session(), task=task)
 
 
 @needs_rscript
@@ -124,7 +135,7 @@ def test_raise_error_if_rscript_is_not_found(
     tmp_path.joinpath("script.r").write_text(textwrap.dedent(r_script))
 
     # Hide Rscript if available.
-    monkeypatch.setattr("pytask_r.execute.shutil.which", lambda x: None)  # noqa: ARG005
+    monkeypatch.setattr("pytask_r.toolchain.shutil.which", lambda x: None)  # noqa: ARG005
 
     session = build(paths=tmp_path)
 
@@ -304,3 +315,618 @@ def test_run_r_script_w_nested_inputs(
 
     assert result.exit_code == ExitCode.OK
     assert tmp_path.joinpath("out.txt").read_text() == "Hello, \nWorld!\n"
+
+
+@needs_rscript
+@parametrize_parse_code_serializer_suffix
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "pool",
+        "batch",
+        pytest.param(
+            "fork",
+            marks=pytest.mark.skipif(
+                sys.platform == "win32", reason="Forking is not supported."
+            ),
+        ),
+    ],
+)
+def test_run_r_scripts_in_worker_pool(  # noqa: PLR0913
+    runner, tmp_path, parse_config_code, serializer, suffix, backend
+):
+    task_source = f"""
+    from pathlib import Path
+    from pytask import mark, task
+
+    for i in range(3):
+
+        @task(kwargs={{"number": i}})
+        @mark.r(script="script.r", serializer="{serializer}", suffix="{suffix}")
+        def task_run_r_script(produces=Path(f"out_{{i}}.txt")): ...
+    """
+    tmp_path.joinpath("task_dummy.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("pyproject.toml").write_text(
+        "[tool.pytask.ini_options]\n"
+        f"r_backend = '{backend}'\n"
+        "r_pool_max_tasks = 2\n"
+        "r_preload = ['stats']"
+    )
+
+    r_script = f"""
+    {parse_config_code}
+    stopifnot(!exists("leaked"))
+    leaked <- TRUE
+    writeLines(as.character(config$number), config$produces)
+    """
+    tmp_path.joinpath("script.r").write_text(textwrap.dedent(r_script))
+
+    result = runner.invoke(cli, [tmp_path.as_posix()])
+
+    assert result.exit_code == ExitCode.OK
+    for i in range(3):
+        assert tmp_path.joinpath(f"out_{i}.txt").read_text() == f"{i}\n"
+
+
+@needs_rscript
+def test_run_r_script_in_worker_pool_fails(runner, tmp_path):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script="script.r")
+    def task_run_r_script(produces=Path("out.txt")): ...
+    """
+    tmp_path.joinpath("task_dummy.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("pyproject.toml").write_text(
+        "[tool.pytask.ini_options]\nr_backend = 'pool'"
+    )
+    tmp_path.joinpath("script.r").write_text('stop("error message to print")')
+
+    result = runner.invoke(cli, [tmp_path.as_posix()])
+
+    assert result.exit_code == ExitCode.FAILED
+    assert "error message to print" in result.output
+
+
+@needs_rscript
+@pytest.mark.skipif("rds" not in SERIALIZERS, reason="Requires rdata.")
+def test_run_r_script_w_rds_serializer(runner, tmp_path):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark, task
+
+    @task(kwargs={"content": {"first": "Hello, ", "second": "World!"}})
+    @mark.r(script="script.r", serializer="rds")
+    def task_run_r_script(produces=Path("out.txt")): ...
+    """
+    tmp_path.joinpath("task_dummy.py").write_text(textwrap.dedent(task_source))
+
+    r_script = """
+    args <- commandArgs(trailingOnly=TRUE)
+    config <- readRDS(args[length(args)])
+    writeLines(c(config$content$first, config$content$second), config$produces)
+    """
+    tmp_path.joinpath("script.r").write_text(textwrap.dedent(r_script))
+
+    result = runner.invoke(cli, [tmp_path.as_posix()])
+
+    assert result.exit_code == ExitCode.OK
+    assert tmp_path.joinpath("out.txt").read_text() == "Hello, \nWorld!\n"
+
+
+def test_rerun_r_script_if_package_version_changes(tmp_path, fake_rscript):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"), packages="yaml")
+    def task_example(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("library(data.table)\nprint(1)")
+    versions = fake_rscript.with_name("versions.json")
+    versions.write_text('{"data.table": "1.15.0", "yaml": "2.3.8"}')
+    options: dict[str, Any] = {
+        "r_executable": fake_rscript.as_posix(),
+        "r_fingerprint": True,
+    }
+
+    session = build(paths=tmp_path, **options)
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+
+    session = build(paths=tmp_path, **options)
+    assert session.execution_reports[0].outcome == TaskOutcome.SKIP_UNCHANGED
+
+    versions.write_text('{"data.table": "1.16.0", "yaml": "2.3.8"}')
+    session = build(paths=tmp_path, **options)
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+
+
+def test_reuse_serialized_arguments_if_they_are_unchanged(
+    tmp_path, fake_rscript, monkeypatch
+):
+    task_source = """
+    from pathlib import Path
+    from typing import Annotated
+    from pytask import PythonNode, mark
+
+    values = PythonNode(value=[0.5] * 1_000, hash=lambda x: "1")
+
+    @mark.r(script=Path("script.r"))
+    def task_example(
+        values: Annotated[list[float], values], data: Path = Path("data.csv")
+    ): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("print(1)")
+    tmp_path.joinpath("data.csv").write_text("a")
+    options: dict[str, Any] = {
+        "r_executable": fake_rscript.as_posix(),
+        "r_sidecar_threshold": 64,
+        "force": True,
+    }
+
+    session = build(paths=tmp_path, **options)
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+
+    calls = []
+    monkeypatch.setattr("pytask_r.execute.collect_keyword_arguments", calls.append)
+    tmp_path.joinpath("data.csv").write_text("b")
+    session = build(paths=tmp_path, **options)
+
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+    assert calls == []
+    task = session.execution_reports[0].task
+    serialized = task.depends_on["_serialized"]
+    assert isinstance(serialized, PythonNode)
+    assert Path(serialized.load()).exists()
+    assert len(task.attributes["r_sidecars"]) == 1
+
+
+def test_rerun_r_script_if_sourced_file_changes(tmp_path, fake_rscript, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"))
+    def task_example(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text('source("helpers.R")')
+    tmp_path.joinpath("helpers.R").write_text("x <- 1")
+    options: dict[str, Any] = {"r_executable": fake_rscript.as_posix(), "r_scan": True}
+
+    session = build(paths=tmp_path, **options)
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+
+    session = build(paths=tmp_path, **options)
+    assert session.execution_reports[0].outcome == TaskOutcome.SKIP_UNCHANGED
+
+    tmp_path.joinpath("helpers.R").write_text("x <- 2")
+    session = build(paths=tmp_path, **options)
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_run_r_scripts_in_batch(tmp_path, fake_rscript, fails):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark, task
+
+    for i in range(3):
+
+        @task(id=str(i), kwargs={"i": i})
+        @mark.r(script=Path("script.r"))
+        def task_example(i): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("stop('boom')" if fails else "print(1)")
+    options: dict[str, Any] = {
+        "r_executable": fake_rscript.as_posix(),
+        "r_backend": "batch",
+    }
+
+    with restore_sys_path_and_module_after_test_execution():
+        session = build(paths=tmp_path, **options)
+
+    expected = TaskOutcome.FAIL if fails else TaskOutcome.SUCCESS
+    assert [report.outcome for report in session.execution_reports] == [expected] * 3
+    calls = fake_rscript.with_name("calls.txt").read_text().splitlines()
+    assert sum('"batch"' in call for call in calls) == 1
+    if fails:
+        exc_info = session.execution_reports[0].exc_info
+        assert exc_info is not None
+        assert "boom" in str(exc_info[1])
+    else:
+        with restore_sys_path_and_module_after_test_execution():
+            session = build(paths=tmp_path, **options)
+        outcomes = [report.outcome for report in session.execution_reports]
+        assert outcomes == [TaskOutcome.SKIP_UNCHANGED] * 3
+
+
+def test_batch_respects_markers_and_retries(tmp_path, fake_rscript):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark, task
+
+    for i in range(3):
+
+        @task(id=str(i), kwargs={"i": i})
+        @mark.r(script=Path("script.r"))
+        def task_example(i): ...
+
+    @mark.skip
+    @mark.r(script=Path("script.r"))
+    def task_skipped(): ...
+
+    @mark.r(script=Path("script.r"), retries=1)
+    def task_retried(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("print(1)")
+
+    with restore_sys_path_and_module_after_test_execution():
+        session = build(
+            paths=tmp_path, r_executable=fake_rscript.as_posix(), r_backend="batch"
+        )
+
+    outcomes = {
+        report.task.name.rsplit(":", 1)[-1]: report.outcome
+        for report in session.execution_reports
+    }
+    assert len(session.execution_reports) == len(outcomes) == 5  # noqa: PLR2004
+    assert outcomes["task_skipped"] == TaskOutcome.SKIP
+    assert outcomes["task_retried"] == TaskOutcome.SUCCESS
+    calls = fake_rscript.with_name("calls.txt").read_text().splitlines()
+    assert sum('"batch"' in call for call in calls) == 1
+    assert sum("script.r" in call for call in calls) == 1
+
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_run_r_scripts_asynchronously(tmp_path, fake_rscript, fails):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark, task
+
+    for i in range(3):
+
+        @task(id=str(i), kwargs={"i": i})
+        @mark.r(script=Path(f"script_{i}.r"))
+        def task_example(i): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    for i in range(3):
+        source = "stop('boom')" if fails and i == 1 else "print(1)"
+        tmp_path.joinpath(f"script_{i}.r").write_text(source)
+    options: dict[str, Any] = {
+        "r_executable": fake_rscript.as_posix(),
+        "r_backend": "async",
+        "r_async_workers": 2,
+    }
+
+    with restore_sys_path_and_module_after_test_execution():
+        session = build(paths=tmp_path, **options)
+
+    outcomes = {
+        report.task.name.rsplit("[", 1)[-1]: report.outcome
+        for report in session.execution_reports
+    }
+    expected = TaskOutcome.FAIL if fails else TaskOutcome.SUCCESS
+    assert outcomes == {
+        "0]": TaskOutcome.SUCCESS,
+        "1]": expected,
+        "2]": TaskOutcome.SUCCESS,
+    }
+    calls = fake_rscript.with_name("calls.txt").read_text().splitlines()
+    assert sum("script_" in call for call in calls) == len(outcomes)
+    if fails:
+        (exc_info,) = [r.exc_info for r in session.execution_reports if r.exc_info]
+        assert "exited with code 1" in str(exc_info[1])
+
+
+@pytest.mark.parametrize("backend", ["subprocess", "batch", "async"])
+def test_profile_r_scripts(runner, tmp_path, fake_rscript, backend):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"))
+    def task_example(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("print(1)")
+    tmp_path.joinpath("pyproject.toml").write_text(
+        "[tool.pytask.ini_options]\n"
+        f"r_executable = '{fake_rscript.as_posix()}'\n"
+        f"r_backend = '{backend}'\n"
+        "r_profile = true\n"
+    )
+
+    result = runner.invoke(cli, [tmp_path.as_posix()])
+
+    assert result.exit_code == ExitCode.OK
+    assert "Slowest R tasks" in result.output
+    path = tmp_path.joinpath(".pytask", "pytask-r", "metrics.json")
+    (entry,) = json.loads(path.read_text())
+    assert entry["task"].endswith("task_example.py::task_example")
+    assert entry["backend"] == backend
+    assert entry["startup"] + entry["script"] == pytest.approx(entry["wall"])
+    assert tmp_path.joinpath(".pytask", "pytask-r", "metrics.csv").exists()
+
+
+@pytest.mark.parametrize("backend", ["subprocess", "batch", "async"])
+def test_write_output_of_r_scripts_to_logs(runner, tmp_path, fake_rscript, backend):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"))
+    def task_example(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("print(1)")
+    tmp_path.joinpath("pyproject.toml").write_text(
+        "[tool.pytask.ini_options]\n"
+        f"r_executable = '{fake_rscript.as_posix()}'\n"
+        f"r_backend = '{backend}'\n"
+        "r_log_output = true\n"
+    )
+
+    result = runner.invoke(cli, [tmp_path.as_posix(), "-s"])
+
+    assert result.exit_code == ExitCode.OK
+    assert "The output of R is written to" in result.output
+    (log,) = tmp_path.joinpath(".pytask", "pytask-r", "logs").iterdir()
+    assert log.name.startswith("task_example.py_task_example-")
+    assert "Ran " in log.read_text()
+    assert "Ran " not in result.output
+
+
+@pytest.mark.parametrize("backend", ["subprocess", "async"])
+def test_retry_failing_r_scripts(tmp_path, fake_rscript, backend):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"), retries=2)
+    def task_example(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("stop('boom')")
+
+    session = build(
+        paths=tmp_path,
+        r_executable=fake_rscript.as_posix(),
+        r_backend=backend,
+        r_retry_backoff=0,
+    )
+
+    assert session.execution_reports[0].outcome == TaskOutcome.FAIL
+    calls = fake_rscript.with_name("calls.txt").read_text().splitlines()
+    assert sum("script.r" in call for call in calls) == 1 + 2
+
+
+@pytest.mark.parametrize("backend", ["subprocess", "batch", "async"])
+def test_kill_r_scripts_after_timeout(tmp_path, fake_rscript, backend):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"))
+    def task_example(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("Sys.sleep(60)")
+
+    session = build(
+        paths=tmp_path,
+        r_executable=fake_rscript.as_posix(),
+        r_backend=backend,
+        r_timeout="1s",
+    )
+
+    report = session.execution_reports[0]
+    assert report.outcome == TaskOutcome.FAIL
+    assert report.exc_info is not None
+    assert "timed out" in str(report.exc_info[1])
+
+
+@pytest.mark.parametrize("backend", ["subprocess", "batch", "async"])
+def test_limit_threads_of_r_scripts(tmp_path, fake_rscript, backend):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"), threads=3)
+    def task_example(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("print(1)")
+
+    session = build(
+        paths=tmp_path, r_executable=fake_rscript.as_posix(), r_backend=backend
+    )
+
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+    environ = json.loads(fake_rscript.with_name("environ.json").read_text())
+    assert environ["OMP_NUM_THREADS"] == "3"
+    assert environ["R_DATATABLE_NUM_THREADS"] == "3"
+
+
+@pytest.mark.parametrize("backend", ["subprocess", "batch", "async"])
+def test_set_environment_of_r_scripts(tmp_path, fake_rscript, backend):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(
+        script=Path("script.r"),
+        env={"R_PROFILE_USER": "fast.Rprofile"},
+        r_libs=["lib"],
+        vanilla=True,
+    )
+    def task_example(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("print(1)")
+
+    session = build(
+        paths=tmp_path,
+        r_executable=fake_rscript.as_posix(),
+        r_backend=backend,
+        r_env={"R_ENVIRON_USER": "project.Renviron", "R_PROFILE_USER": "slow"},
+    )
+
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+    environ = json.loads(fake_rscript.with_name("environ.json").read_text())
+    assert environ["R_PROFILE_USER"] == "fast.Rprofile"
+    assert environ["R_ENVIRON_USER"] == "project.Renviron"
+    assert environ["R_LIBS"] == str(tmp_path.joinpath("lib").resolve())
+    calls = fake_rscript.with_name("calls.txt").read_text().splitlines()
+    assert json.loads(calls[-1])[0] == "--vanilla"
+
+
+@pytest.mark.parametrize("backend", ["subprocess", "batch", "async"])
+def test_restore_products_from_output_cache(tmp_path, fake_rscript, backend):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"), cache=True)
+    def task_example(produces=Path("out.txt"), n=1): ...
+    """
+    options: dict[str, Any] = {
+        "r_executable": fake_rscript.as_posix(),
+        "r_backend": backend,
+        "r_cache_dir": tmp_path.joinpath("cache").as_posix(),
+    }
+    worktrees = [tmp_path / "a", tmp_path / "b"]
+    for worktree in worktrees:
+        worktree.mkdir()
+        worktree.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+        worktree.joinpath("script.r").write_text("writeLines('fit')")
+
+    for worktree in worktrees:
+        with restore_sys_path_and_module_after_test_execution():
+            session = build(paths=worktree, **options)
+        assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+        assert worktree.joinpath("out.txt").exists()
+
+    calls = fake_rscript.with_name("calls.txt").read_text().splitlines()
+    n_executions = sum('"-e"' not in call for call in calls)
+    assert n_executions == 1
+    restored = worktrees[1].joinpath("out.txt")
+    assert restored.read_text() == worktrees[0].joinpath("out.txt").read_text()
+
+    # The products are not restored if an argument changes.
+    source = textwrap.dedent(task_source).replace("n=1", "n=2")
+    worktrees[1].joinpath("task_example.py").write_text(source)
+    with restore_sys_path_and_module_after_test_execution():
+        session = build(paths=worktrees[1], **options)
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+    calls = fake_rscript.with_name("calls.txt").read_text().splitlines()
+    assert sum('"-e"' not in call for call in calls) == n_executions + 1
+
+
+def test_collect_keyword_arguments_skips_internal_dependencies(tmp_path):
+    task = Task(
+        base_name="task_example",
+        path=tmp_path / "task_example.py",
+        function=print,
+        depends_on={
+            "shards": [PathNode(path=tmp_path / f"{i}.csv") for i in range(3)],
+            "config": {"seed": PythonNode(value=1)},
+            "_script": PathNode(path=tmp_path / "script.r"),
+            "_options": PythonNode(value=[]),
+            "_serialized": PythonNode(value=tmp_path / "serialized.json"),
+            "_scanned": [PathNode(path=tmp_path / "helpers.R")],
+        },
+        produces={"produces": PathNode(path=tmp_path / "out.rds")},
+    )
+
+    assert collect_keyword_arguments(task) == {
+        "shards": [str(tmp_path / f"{i}.csv") for i in range(3)],
+        "config": {"seed": 1},
+        "produces": str(tmp_path / "out.rds"),
+    }
+
+
+def test_keep_serialized_arguments_of_tasks_which_are_not_executed(
+    tmp_path, fake_rscript
+):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.try_first
+    @mark.r(script=Path("script_a.r"))
+    def task_a(n=1): ...
+
+    @mark.r(script=Path("script_b.r"))
+    def task_b(n=2): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script_a.r").write_text("print(1)")
+    tmp_path.joinpath("script_b.r").write_text("print(1)")
+
+    with restore_sys_path_and_module_after_test_execution():
+        session = build(paths=tmp_path, r_executable=fake_rscript.as_posix())
+    assert session.exit_code == ExitCode.OK
+    calls = fake_rscript.with_name("calls.txt").read_text().splitlines()
+    paths = {Path(args[0]).name: Path(args[-1]) for args in map(json.loads, calls)}
+
+    # The build stops after the first failure before the other task is set up.
+    tmp_path.joinpath("script_a.r").write_text("stop('boom')")
+    with restore_sys_path_and_module_after_test_execution():
+        session = build(
+            paths=tmp_path, r_executable=fake_rscript.as_posix(), max_failures=1
+        )
+
+    assert session.exit_code == ExitCode.FAILED
+    assert len(session.execution_reports) == 1
+    assert paths["script_b.r"].exists()
+
+
+def test_compress_serialized_keyword_arguments(tmp_path, fake_rscript):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"))
+    def task_example(n=1): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("print(1)")
+
+    session = build(
+        paths=tmp_path, r_executable=fake_rscript.as_posix(), r_compression="gzip"
+    )
+
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+    calls = fake_rscript.with_name("calls.txt").read_text().splitlines()
+    path = Path(json.loads(calls[-1])[-1])
+    assert path.name.endswith(".json.gz")
+    assert json.loads(gzip.decompress(path.read_bytes()))["n"] == 1
+
+
+@pytest.mark.parametrize("mode", ["file", "session"])
+def test_flush_serialized_keyword_arguments(tmp_path, fake_rscript, monkeypatch, mode):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"))
+    def task_example(n=1): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("print(1)")
+    flushed = []
+    monkeypatch.setattr("pytask_r.serialization.os.fsync", flushed.append)
+
+    session = build(paths=tmp_path, r_executable=fake_rscript.as_posix(), r_fsync=mode)
+
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+    assert flushed
+    assert not list(tmp_path.joinpath(".pytask", "pytask-r").glob(".tmp-*"))
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from pytask_r.logs import LogOptions
+from pytask_r.logs import TaskLog
+from pytask_r.logs import create_path_to_log
+from pytask_r.logs import report_log
+
+
+def test_create_path_to_log():
+    root = Path("project")
+    path = create_path_to_log(root, "task_example.py::task_example[a/b]")
+
+    assert path.parent == root / ".pytask" / "pytask-r" / "logs"
+    assert path.name.startswith("task_example.py_task_example_a_b_-")
+    assert path.suffix == ".log"
+    assert path != create_path_to_log(root, "task_other.py::task_example[a/b]")
+
+
+def test_rotate_logs_of_previous_executions(tmp_path):
+    path = tmp_path / "logs" / "task.log"
+    options = LogOptions(max_size=1024, backups=2, tail=64)
+
+    for i in range(4):
+        with TaskLog(path, options) as log:
+            log.write(f"run {i}\n".encode())
+
+    assert path.read_text() == "run 3\n"
+    assert path.with_name("task.log.1").read_text() == "run 2\n"
+    assert path.with_name("task.log.2").read_text() == "run 1\n"
+    assert not path.with_name("task.log.3").exists()
+
+
+def test_rotate_large_logs_and_keep_bounded_tail(tmp_path):
+    path = tmp_path / "task.log"
+    options = LogOptions(max_size=50, backups=1, tail=25)
+
+    with TaskLog(path, options) as log:
+        for i in range(20):
+            log.write(f"line {i:02d}\n".encode())
+
+    assert path.stat().st_size <= options["max_size"]
+    assert path.with_name("task.log.1").stat().st_size <= options["max_size"]
+    assert len(log.tail) <= options["tail"]
+    assert log.tail == "line 17\nline 18\nline 19\n"
+
+
+def test_report_log(tmp_path, capsys):
+    source = tmp_path / "output.txt"
+    source.write_text("Error: boom\n")
+    with TaskLog(
+        tmp_path / "task.log", {"max_size": 1024, "backups": 0, "tail": 64}
+    ) as log:
+        log.write_file(source)
+
+    report_log(log, failed=False)
+    assert "boom" not in capsys.readouterr().out
+
+    report_log(log, failed=True)
+    out = capsys.readouterr().out
+    assert "Error: boom" in out
+    assert "task.log" in out
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+
+from pytask_r.outputs import OutputCache
+
+
+def _write_products(root, content):
+    products = [root / "out" / "a.txt", root / "b.txt"]
+    for path in products:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"{path.name}: {content}")
+    return products
+
+
+def test_store_and_restore_products_in_another_root(tmp_path):
+    cache = OutputCache(tmp_path / "cache", max_size=None)
+    products = _write_products(tmp_path / "a", "fit")
+    cache.store("abc123", products, tmp_path / "a")
+
+    restored = [tmp_path / "b" / "out" / "a.txt", tmp_path / "b" / "b.txt"]
+    assert cache.restore("abc123", restored, tmp_path / "b")
+    assert restored[0].read_text() == "a.txt: fit"
+    assert restored[1].read_text() == "b.txt: fit"
+    assert not cache.restore("def456", restored, tmp_path / "b")
+    assert not cache.restore("abc123", restored[:1], tmp_path / "b")
+
+
+def test_products_do_not_change_the_cache(tmp_path):
+    cache = OutputCache(tmp_path / "cache", max_size=None)
+    (product,) = _write_products(tmp_path, "fit")[:1]
+    cache.store("abc123", [product], tmp_path)
+    product.write_text("changed")
+
+    assert cache.restore("abc123", [product], tmp_path)
+    assert product.read_text() == "a.txt: fit"
+
+    # Restored products are copies, so changing them in place keeps the cache intact.
+    assert product.stat().st_nlink == 1
+    with product.open("a") as f:
+        f.write(" changed")
+    assert cache.restore("abc123", [product], tmp_path)
+    assert product.read_text() == "a.txt: fit"
+
+
+def test_damaged_entries_are_removed(tmp_path):
+    cache = OutputCache(tmp_path / "cache", max_size=None)
+    products = _write_products(tmp_path, "fit")
+    cache.store("abc123", products, tmp_path)
+    (tmp_path / "cache" / "ab" / "abc123" / "0").write_text("truncated")
+    products[1].write_text("current")
+
+    assert not cache.restore("abc123", products, tmp_path)
+    assert products[1].read_text() == "current"
+    assert not (tmp_path / "cache" / "ab" / "abc123").exists()
+
+
+def test_evict_least_recently_used_entries(tmp_path):
+    cache = OutputCache(tmp_path / "cache", max_size=700)
+    products = _write_products(tmp_path, "x" * 100)
+    for i, key in enumerate(("aa1", "bb2", "cc3")):
+        cache.store(key, products, tmp_path)
+        manifest = tmp_path / "cache" / key[:2] / key / "manifest.json"
+        os.utime(manifest, (1_000 + i, 1_000 + i))
+    # Using the oldest entry makes it the most recently used one.
+    assert cache.restore("aa1", products, tmp_path)
+
+    # Storing entries does not evict, the build evicts once at the end.
+    assert len(list((tmp_path / "cache").glob("*/*"))) == 3  # noqa: PLR2004
+    cache.evict()
+
+    entries = sorted(path.name for path in (tmp_path / "cache").glob("*/*"))
+    assert entries == ["aa1", "cc3"]
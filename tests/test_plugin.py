@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import textwrap
+
+import pytest
+from pytask import build
+
+
+def test_importing_pytask_does_not_import_execution_modules():
+    code = """
+    import sys
+
+    import pytask
+
+    lazy = [
+        "yaml",
+        "pytask_r.aio",
+        "pytask_r.batch",
+        "pytask_r.environment",
+        "pytask_r.execute",
+        "pytask_r.logs",
+        "pytask_r.pool",
+        "pytask_r.profiling",
+        "pytask_r.scan",
+        "pytask_r.toolchain",
+    ]
+    print([name for name in lazy if name in sys.modules])
+    """
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", textwrap.dedent(code)],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+@pytest.mark.parametrize(
+    ("task_source", "expected"),
+    [
+        ("def task_example(): ...", False),
+        (
+            """
+            from pathlib import Path
+            from pytask import mark
+
+            @mark.r(script=Path("script.r"))
+            def task_example(): ...
+            """,
+            True,
+        ),
+    ],
+)
+def test_execution_hooks_are_registered_with_r_tasks(tmp_path, task_source, expected):
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").touch()
+
+    session = build(paths=tmp_path, dry_run=True)
+
+    pm = session.config["pm"]
+    assert pm.has_plugin("pytask_r.execute") is expected
+    assert pm.has_plugin("pytask_r.batch") is expected
+    assert pm.has_plugin("pytask_r.collect")
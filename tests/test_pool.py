@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import socket
+
+from pytask_r.pool import _accept_worker
+
+
+def test_accept_only_the_worker_which_sends_the_token():
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        address = server.getsockname()
+        with (
+            socket.create_connection(address) as intruder,
+            socket.create_connection(address) as worker,
+        ):
+            intruder.sendall(b"guess\n")
+            worker.sendall(b"secret\nready\n")
+
+            connection = _accept_worker(server, "secret")
+
+            with connection, connection.makefile("r") as stream:
+                assert stream.readline() == "ready\n"
+            assert intruder.recv(1) == b""
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import csv
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from pytask_r.profiling import MetricsReport
+from pytask_r.profiling import ProcessStats
+from pytask_r.profiling import TaskMetrics
+from pytask_r.profiling import path_to_metrics
+from pytask_r.profiling import read_metrics
+from pytask_r.profiling import run_process
+from pytask_r.profiling import write_metrics
+
+
+def _create_metrics(task, wall):
+    return TaskMetrics(
+        task=task,
+        backend="subprocess",
+        wall=wall,
+        startup=0.1,
+        script=wall - 0.1,
+        cpu_user=0.2,
+        cpu_system=0.1,
+        peak_rss=1024,
+    )
+
+
+def test_run_process():
+    returncode, stats = run_process([sys.executable, "-c", "x = bytearray(2**25)"])
+
+    assert returncode == 0
+    assert stats["wall"] > 0
+    assert stats["script"] is None
+    if sys.platform != "win32":
+        assert stats["peak_rss"] is not None
+        assert stats["peak_rss"] >= 2**25
+
+
+def test_run_process_raises_error():
+    with pytest.raises(subprocess.CalledProcessError):
+        run_process([sys.executable, "-c", "raise SystemExit(1)"])
+
+    returncode, _ = run_process(
+        [sys.executable, "-c", "raise SystemExit(1)"], check=False
+    )
+    assert returncode == 1
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="Inspects /proc.")
+def test_run_process_kills_process_tree_after_timeout(tmp_path):
+    pid_file = tmp_path / "pid.txt"
+    code = (
+        "import subprocess, sys, time\n"
+        "cmd = [sys.executable, '-c', 'import time; time.sleep(60)']\n"
+        "child = subprocess.Popen(cmd)\n"
+        f"open({pid_file.as_posix()!r}, 'w').write(str(child.pid))\n"
+        "time.sleep(60)\n"
+    )
+
+    # The timeout leaves enough time to start the child on a busy machine.
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_process([sys.executable, "-c", code], timeout=5)
+
+    # The signal is delivered asynchronously, so the child may need a moment to exit.
+    deadline = time.monotonic() + 5
+    while _is_running(int(pid_file.read_text())):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def _is_running(pid):
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except FileNotFoundError:
+        return False
+    return "zombie" not in status
+
+
+def test_write_and_read_metrics(tmp_path):
+    path = path_to_metrics(tmp_path / "serialized.json")
+    stats = ProcessStats(
+        wall=1.0, script=None, cpu_user=0.5, cpu_system=0.1, peak_rss=10
+    )
+
+    write_metrics(path, "subprocess", stats)
+
+    assert read_metrics(path) == {"backend": "subprocess", **stats}
+    assert not path.exists()
+    assert read_metrics(path) is None
+
+
+def test_metrics_report_merges_builds(tmp_path):
+    report = MetricsReport(tmp_path)
+    report.add(_create_metrics("task_a", 1.0))
+    report.add(_create_metrics("task_b", 2.0))
+    report.save()
+
+    report = MetricsReport(tmp_path)
+    report.add(_create_metrics("task_b", 3.0))
+    report.save()
+
+    entries = json.loads(report.path.with_suffix(".json").read_text())
+    assert {entry["task"]: entry["wall"] for entry in entries} == {
+        "task_a": 1.0,
+        "task_b": 3.0,
+    }
+    with report.path.with_suffix(".csv").open() as f:
+        rows = list(csv.DictReader(f))
+    assert [row["task"] for row in rows] == ["task_a", "task_b"]
+    assert report.create_table().row_count == 1
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from pytask_r.scan import ScanCache
+from pytask_r.scan import ScriptInfo
+from pytask_r.scan import scan_script
+from pytask_r.scan import scan_source
+
+
+@pytest.mark.parametrize(
+    ("source", "expected"),
+    [
+        (
+            "library(data.table)\nrequire('yaml')\nx <- arrow::read_feather('a.arrow')",
+            ScriptInfo(packages=("arrow", "data.table", "yaml"), files=("a.arrow",)),
+        ),
+        ('source("a.R")\nsys.source(file = "b.R")', ScriptInfo(sources=("a.R", "b.R"))),
+        ("# source('a.R')\nsource(paste0('a', '.R'))", ScriptInfo()),
+        ('x <- readRDS("x.rds"); y <- readRDS("x.rds")', ScriptInfo(files=("x.rds",))),
+        (
+            'df <- data.table::fread("data/in.csv")',
+            ScriptInfo(packages=("data.table",), files=("data/in.csv",)),
+        ),
+    ],
+)
+def test_scan_source(source, expected):
+    assert scan_source(source) == expected
+
+
+def test_scan_script_follows_source_chains(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tmp_path.joinpath("script.R").write_text(
+        'source("R/helpers.R")\nsource("missing.R")\nx <- readRDS("x.rds")'
+    )
+    tmp_path.joinpath("R").mkdir()
+    tmp_path.joinpath("R", "helpers.R").write_text(
+        'library(yaml)\nsource("R/utils.R")\nsource("script.R")'
+    )
+    tmp_path.joinpath("R", "utils.R").write_text('config <- read_yaml("config.yaml")')
+    tmp_path.joinpath("x.rds").touch()
+    tmp_path.joinpath("config.yaml").touch()
+
+    packages, paths = scan_script(tmp_path / "script.R", ScanCache(tmp_path))
+
+    assert packages == {"yaml"}
+    assert set(paths) == {
+        tmp_path / "R" / "helpers.R",
+        tmp_path / "R" / "utils.R",
+        tmp_path / "x.rds",
+        tmp_path / "config.yaml",
+    }
+
+
+def test_scan_cache_reuses_results(tmp_path, monkeypatch):
+    script = tmp_path / "script.R"
+    script.write_text("library(yaml)")
+    cache = ScanCache(tmp_path)
+    assert cache.scan(script).packages == ("yaml",)
+    cache.save()
+
+    calls = []
+    monkeypatch.setattr(
+        "pytask_r.scan.scan_source", lambda source: calls.append(source) or ScriptInfo()
+    )
+    cache = ScanCache(tmp_path)
+    assert cache.scan(script).packages == ("yaml",)
+
+    # A new modification time leads to hashing the file, but not to scanning it.
+    stat = script.stat()
+    os.utime(script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.scan(script).packages == ("yaml",)
+
+    script.write_text("library(data.table)")
+    assert cache.scan(script) == ScriptInfo()
+    assert calls == ["library(data.table)"]
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+import textwrap
+from pathlib import Path
+
+from pytask import ExitCode
+from pytask import Mark
+from pytask import Task
+from pytask import TaskOutcome
+from pytask import build
+
+from pytask_r.scheduling import MemoryAwareScheduler
+from pytask_r.scheduling import _get_memory
+
+
+class _Scheduler:
+    """A scheduler which hands out tasks in order."""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.done_names = []
+
+    def get_ready(self, n=1):
+        ready, self.names = self.names[:n], self.names[n:]
+        return ready
+
+    def is_active(self):
+        return bool(self.names)
+
+    def done(self, *nodes):
+        self.done_names.extend(nodes)
+
+    def rebuild(self, dag):
+        scheduler = _Scheduler([*self.names, *dag])
+        scheduler.done_names = self.done_names.copy()
+        return scheduler
+
+
+def test_memory_aware_scheduler_holds_back_tasks():
+    memory = {"big": 6, "large": 5, "small": 1, "tiny": 1}
+    scheduler = MemoryAwareScheduler(
+        _Scheduler(["big", "large", "small", "tiny"]), memory.__getitem__, 8
+    )
+
+    assert scheduler.get_ready(2) == ["big"]
+    assert scheduler.get_ready(2) == ["small", "tiny"]
+    assert scheduler.memory_in_use == 8  # noqa: PLR2004
+    assert scheduler.get_ready(1) == []
+
+    scheduler.done("big")
+    assert scheduler.get_ready(1) == ["large"]
+    assert scheduler.done_names == ["big"]
+
+
+def test_memory_aware_scheduler_admits_task_above_limit_if_idle():
+    scheduler = MemoryAwareScheduler(_Scheduler(["huge"]), lambda _: 100, 8)
+    assert scheduler.get_ready() == ["huge"]
+
+
+def test_memory_aware_scheduler_admits_tasks_of_a_batch():
+    memory = {"a": 4, "b": 3, "c": 2}
+    scheduler = MemoryAwareScheduler(_Scheduler(["a"]), memory.__getitem__, 8)
+
+    assert scheduler.get_ready() == ["a"]
+    assert scheduler.admit("b")
+    assert not scheduler.admit("c")
+    assert scheduler.memory_in_use == 7  # noqa: PLR2004
+
+
+def test_memory_aware_scheduler_is_preserved_after_rebuild():
+    memory = {"a": 6, "b": 5, "c": 1}
+    scheduler = MemoryAwareScheduler(_Scheduler(["a", "b"]), memory.__getitem__, 8)
+    assert scheduler.get_ready(2) == ["a"]
+
+    scheduler = scheduler.rebuild(["c"])
+
+    assert isinstance(scheduler, MemoryAwareScheduler)
+    assert scheduler.memory_in_use == 6  # noqa: PLR2004
+    assert scheduler.get_ready(2) == ["c"]
+    scheduler.done("a", "c")
+    assert scheduler.get_ready(2) == ["b"]
+
+
+def test_get_memory_prefers_declared_memory():
+    task = Task(
+        base_name="task_example",
+        path=Path(),
+        function=lambda: None,
+        markers=[Mark("r", (), {"memory": 10})],
+    )
+    learned = {task.name: {"peak_rss": 20}}
+
+    assert _get_memory(task, learned) == 10  # noqa: PLR2004
+    task.markers = [Mark("r", (), {})]
+    assert _get_memory(task, learned) == 20  # noqa: PLR2004
+    assert _get_memory(task, {}) == 0
+
+
+def test_learn_memory_of_r_tasks(tmp_path, fake_rscript):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark
+
+    @mark.r(script=Path("script.r"))
+    def task_example(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("print(1)")
+
+    session = build(
+        paths=tmp_path, r_executable=fake_rscript.as_posix(), r_max_memory="1MB"
+    )
+
+    assert session.execution_reports[0].outcome == TaskOutcome.SUCCESS
+    path = tmp_path.joinpath(".pytask", "pytask-r", "metrics.json")
+    (entry,) = json.loads(path.read_text())
+    assert entry["peak_rss"] > 0
+
+
+def test_batch_respects_priorities_and_memory(tmp_path, fake_rscript):
+    task_source = """
+    from pathlib import Path
+    from pytask import mark, task
+
+    for i in range(4):
+
+        @task(id=str(i))
+        @mark.r(script=Path("script.r"), memory="1MB")
+        def task_example(i=i): ...
+
+    @mark.try_last
+    @mark.r(script=Path("script.r"), memory="1MB")
+    def task_last(): ...
+    """
+    tmp_path.joinpath("task_example.py").write_text(textwrap.dedent(task_source))
+    tmp_path.joinpath("script.r").write_text("print(1)")
+
+    session = build(
+        paths=tmp_path,
+        r_executable=fake_rscript.as_posix(),
+        r_backend="batch",
+        r_max_memory="2MB",
+    )
+
+    assert session.exit_code == ExitCode.OK
+    calls = fake_rscript.with_name("calls.txt").read_text().splitlines()
+    assert sum('"batch"' in call for call in calls) == 3  # noqa: PLR2004
+    assert session.execution_reports[-1].task.name.endswith("task_last")
@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+import contextlib
+import gzip
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import tracemalloc
+from importlib.metadata import EntryPoint
+from pathlib import Path
+
+import pytest
+from pytask import PathNode
+from pytask import PythonNode
+from pytask import Task
+
+from pytask_r.serialization import SERIALIZERS
+from pytask_r.serialization import FileSync
+from pytask_r.serialization import SerializationCache
+from pytask_r.serialization import SerializerRegistry
+from pytask_r.serialization import create_path_to_serialized
+from pytask_r.serialization import digest_keyword_arguments
+from pytask_r.serialization import is_compression_available
+from pytask_r.serialization import remove_orphaned_serialized
+from pytask_r.serialization import serialize_keyword_arguments
+from pytask_r.serialization import write_atomically
+
+# Optional packages are imported once since the test fixtures restore sys.modules after
+# every test and some packages cannot be imported twice.
+with contextlib.suppress(ImportError):
+    import numpy as np  # noqa: F401
+
+with contextlib.suppress(ImportError):
+    import pandas as pd  # noqa: F401
+
+with contextlib.suppress(ImportError):
+    import msgpack  # noqa: F401
+
+with contextlib.suppress(ImportError):
+    import pyarrow.ipc  # noqa: F401
+
+try:
+    import rdata.conversion
+    import rdata.unparser  # noqa: F401
+except ImportError:
+    pass
+
+
+TOML_SERIALIZER = {"serializer": json.dumps, "suffix": ".toml"}
+
+
+def _create_task(tmp_path, name="task_example"):
+    return Task(base_name=name, path=tmp_path / "task_example.py", function=print)
+
+
+def test_create_path_to_serialized_is_content_addressed(tmp_path):
+    task = _create_task(tmp_path)
+    path = create_path_to_serialized(task, ".json", '{"a": 1}')
+
+    assert path.parent == tmp_path / ".pytask" / "pytask-r"
+    assert path.suffix == ".json"
+    assert path == create_path_to_serialized(task, ".json", '{"a": 1}')
+    assert path != create_path_to_serialized(task, ".json", '{"a": 2}')
+    assert path != create_path_to_serialized(
+        _create_task(tmp_path, "task_other"), ".json", '{"a": 1}'
+    )
+
+
+def test_serialize_keyword_arguments_skips_identical_content(tmp_path):
+    task = _create_task(tmp_path)
+    tmp_path.joinpath(".pytask", "pytask-r").mkdir(parents=True)
+
+    path = serialize_keyword_arguments("json", task, ".json", {"a": 1})
+    assert path.read_text() == '{"a": 1}'
+
+    mtime = path.stat().st_mtime_ns
+    assert serialize_keyword_arguments("json", task, ".json", {"a": 1}) == path
+    assert path.stat().st_mtime_ns == mtime
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"a": list(range(2_500)), "b": {"c": [1.5, "d", None, True]}},
+        {"a": {str(i): {"b": [i] * 3} for i in range(2_500)}, "e": []},
+        {"a": [{"b": i} for i in range(1_200)] + [list(range(1_200))], "f": {}},
+    ],
+)
+def test_json_is_streamed_like_json_dumps(tmp_path, kwargs):
+    task = _create_task(tmp_path)
+    tmp_path.joinpath(".pytask", "pytask-r").mkdir(parents=True)
+
+    path = serialize_keyword_arguments("json", task, ".json", kwargs)
+
+    assert path.read_text() == json.dumps(kwargs)
+    assert path == create_path_to_serialized(task, ".json", json.dumps(kwargs))
+
+
+def test_serialize_keyword_arguments_with_gzip(tmp_path):
+    task = _create_task(tmp_path)
+    tmp_path.joinpath(".pytask", "pytask-r").mkdir(parents=True)
+
+    path = serialize_keyword_arguments(
+        "json", task, ".json.gz", {"a": 1}, compression="gzip"
+    )
+
+    assert path.name.endswith(".json.gz")
+    assert gzip.decompress(path.read_bytes()) == b'{"a": 1}'
+    assert path.stem == create_path_to_serialized(task, ".json", '{"a": 1}').name
+    assert list(path.parent.iterdir()) == [path]
+
+
+@pytest.mark.skipif(
+    not is_compression_available("zstd"), reason="Requires zstandard or Python 3.14."
+)
+def test_serialize_keyword_arguments_with_zstd(tmp_path):
+    task = _create_task(tmp_path)
+    tmp_path.joinpath(".pytask", "pytask-r").mkdir(parents=True)
+
+    path = serialize_keyword_arguments(
+        "json", task, ".json.zst", {"a": 1}, compression="zstd"
+    )
+
+    assert path.name.endswith(".json.zst")
+    assert path.read_bytes().startswith(b"\x28\xb5\x2f\xfd")
+
+
+def test_remove_orphaned_serialized(tmp_path):
+    folder = tmp_path / ".pytask" / "pytask-r"
+    folder.mkdir(parents=True)
+    in_use = folder / f"{'a' * 64}.json"
+    orphaned = folder / f"{'b' * 64}.json"
+    compressed = folder / f"{'c' * 64}.json.gz"
+    legacy = folder / "0f8fad5b-d9cb-469f-a165-70867728950e.yaml"
+    other = folder / "report.json"
+    temporary = folder / ".tmp-abc"
+    stale = folder / ".tmp-def"
+    for path in (in_use, orphaned, compressed, legacy, other, temporary, stale):
+        path.touch()
+    os.utime(stale, (0, 0))
+
+    remove_orphaned_serialized([in_use, Path(tmp_path, "missing", "file.json")])
+
+    assert in_use.exists()
+    assert not orphaned.exists()
+    assert not compressed.exists()
+    assert not legacy.exists()
+    assert other.exists()
+    assert temporary.exists()
+    assert not stale.exists()
+
+
+def test_failed_serialization_leaves_no_file(tmp_path):
+    task = _create_task(tmp_path)
+    folder = tmp_path.joinpath(".pytask", "pytask-r")
+    folder.mkdir(parents=True)
+
+    # The error is raised after the first chunks of the list are written.
+    kwargs = {"a": [*range(2_000), object()]}
+    with pytest.raises(TypeError):
+        serialize_keyword_arguments("json", task, ".json", kwargs)
+
+    assert list(folder.iterdir()) == []
+
+
+@pytest.mark.parametrize(
+    ("mode", "n_written", "n_flushed"),
+    [("off", 0, 0), ("file", 4, 0), ("session", 0, 3)],
+)
+def test_file_sync_flushes_files(tmp_path, monkeypatch, mode, n_written, n_flushed):
+    calls = []
+    monkeypatch.setattr("pytask_r.serialization.os.fsync", calls.append)
+    sync = FileSync(mode)
+
+    write_atomically(tmp_path / "a.json", b"a", sync)
+    write_atomically(tmp_path / "b.json", b"b", sync)
+    assert len(calls) == n_written
+
+    sync.flush()
+    assert len(calls) == n_written + n_flushed
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.json", "b.json"]
+
+
+def test_file_sync_rejects_unknown_mode():
+    with pytest.raises(ValueError, match="fsync mode"):
+        FileSync("always")
+
+
+def _digest(serializer, suffix, **kwargs):
+    nodes = {name: PythonNode(value=value) for name, value in kwargs.items()}
+    return digest_keyword_arguments(serializer, suffix, nodes)
+
+
+def test_digest_keyword_arguments():
+    digest = _digest("json", ".json", a=[1, 2])
+    assert digest == _digest("json", ".json", a=[1, 2])
+    assert digest != _digest("json", ".json", a=[1, 3])
+    assert digest != _digest("yaml", ".yaml", a=[1, 2])
+    assert _digest(str, ".json", a=[1, 2]) is None
+    assert _digest("json", ".json", a=lambda: 1) is None
+
+
+def test_digest_keyword_arguments_describes_files_by_their_paths(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a")
+    digest = digest_keyword_arguments("json", ".json", {"data": PathNode(path=path)})
+
+    path.write_text("b")
+
+    assert digest == digest_keyword_arguments(
+        "json", ".json", {"data": PathNode(path=path)}
+    )
+    assert digest != digest_keyword_arguments(
+        "json", ".json", {"data": PathNode(path=tmp_path / "other.csv")}
+    )
+
+
+def test_digest_keyword_arguments_uses_the_state_of_hashed_nodes():
+    class Unpicklable:
+        def __reduce__(self):
+            raise TypeError
+
+    def node(version):
+        return PythonNode(value=Unpicklable(), hash=lambda _: version)
+
+    digest = digest_keyword_arguments("json", ".json", {"model": node("1")})
+
+    assert digest is not None
+    assert digest == digest_keyword_arguments("json", ".json", {"model": node("1")})
+    assert digest != digest_keyword_arguments("json", ".json", {"model": node("2")})
+
+
+def test_digest_keyword_arguments_does_not_pickle_the_arguments_at_once():
+    nodes = {"a": PythonNode(value=[float(i) for i in range(1_000_000)])}
+
+    tracemalloc.start()
+    try:
+        digest_keyword_arguments("json", ".json", nodes)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # The pickled list would take about 9 MB.
+    assert peak < 1_000_000  # noqa: PLR2004
+
+
+def test_serialization_cache_persists_across_builds(tmp_path):
+    task = _create_task(tmp_path)
+    folder = tmp_path / ".pytask" / "pytask-r"
+    path = folder / f"{'a' * 64}.json"
+
+    cache = SerializationCache()
+    cache.create_folder(folder)
+    assert cache.get(task, folder, "digest") is None
+    sidecar = folder / f"{'b' * 64}.bin"
+    path.touch()
+    sidecar.touch()
+    cache.set(task, folder, "digest", path, [sidecar])
+    cache.save()
+
+    cache = SerializationCache()
+    assert cache.get(task, folder, "digest") == (path, [sidecar])
+    assert cache.get(task, folder, "other-digest") is None
+
+    sidecar.unlink()
+    assert cache.get(task, folder, "digest") is None
+
+
+@pytest.mark.parametrize("serializer", ["msgpack", "arrow", "rds"])
+def test_binary_serializers(tmp_path, serializer):
+    np = pytest.importorskip("numpy")
+    if serializer not in SERIALIZERS:
+        pytest.skip(f"Serializer {serializer!r} is not installed.")
+    task = _create_task(tmp_path)
+    tmp_path.joinpath(".pytask", "pytask-r").mkdir(parents=True)
+    kwargs = {"number": 1, "nested": {"values": np.arange(3.0)}, "paths": ["a", "b"]}
+
+    path = serialize_keyword_arguments(serializer, task, ".bin", kwargs)
+
+    assert path.suffix == ".bin"
+    assert path.read_bytes() == SERIALIZERS[serializer]["serializer"](kwargs)
+
+
+def test_msgpack_serializer_converts_numpy_and_pandas():
+    msgpack = pytest.importorskip("msgpack")
+    np = pytest.importorskip("numpy")
+    pd = pytest.importorskip("pandas")
+    kwargs = {"array": np.arange(3), "data": pd.DataFrame({"x": [1.0, 2.0]})}
+
+    serialized = SERIALIZERS["msgpack"]["serializer"](kwargs)
+
+    assert msgpack.unpackb(serialized) == {
+        "array": [0, 1, 2],
+        "data": {"x": [1.0, 2.0]},
+    }
+
+
+def test_arrow_serializer_writes_table_with_one_row():
+    ipc = pytest.importorskip("pyarrow.ipc")
+    np = pytest.importorskip("numpy")
+    kwargs = {"number": 1, "nested": {"values": np.arange(3.0)}, "empty": {}}
+
+    serialized = SERIALIZERS["arrow"]["serializer"](kwargs)
+
+    table = ipc.open_stream(serialized).read_all()
+    assert table.to_pylist() == [
+        {"number": 1, "nested": {"values": [0.0, 1.0, 2.0]}, "empty": {}}
+    ]
+
+
+def test_builtin_serializers_are_imported_on_first_use():
+    code = """
+    import sys
+
+    import pytask
+    from pytask_r.serialization import SERIALIZERS
+
+    assert "yaml" in SERIALIZERS
+    assert "yaml" not in sys.modules
+    SERIALIZERS["yaml"]["serializer"]({"a": 1})
+    assert "yaml" in sys.modules
+    """
+    subprocess.run([sys.executable, "-c", textwrap.dedent(code)], check=True)  # noqa: S603
+
+
+def _entry_point(name, value):
+    return EntryPoint(name=name, value=value, group="pytask_r.serializers")
+
+
+def test_serializer_registry_loads_entry_points(monkeypatch):
+    monkeypatch.setattr(
+        "pytask_r.serialization.entry_points",
+        lambda group: [  # noqa: ARG005
+            _entry_point("toml", "tests.test_serialization:TOML_SERIALIZER"),
+            _entry_point("json", "tests.test_serialization:TOML_SERIALIZER"),
+        ],
+    )
+    registry = SerializerRegistry()
+
+    assert "json" in registry
+    assert registry["json"]["suffix"] == ".json"
+
+    assert "toml" in registry
+    assert registry["toml"] == TOML_SERIALIZER
+    assert next(iter(registry)) == "json"
+    assert "toml" in list(registry)
+    assert "unknown" not in registry
+    with pytest.raises(KeyError):
+        registry["unknown"]
+
+
+def test_serializer_registry_raises_error_for_invalid_entry_point(monkeypatch):
+    monkeypatch.setattr(
+        "pytask_r.serialization.entry_points",
+        lambda group: [_entry_point("invalid", "json:dumps")],  # noqa: ARG005
+    )
+    registry = SerializerRegistry()
+
+    assert "invalid" in registry
+    with pytest.raises(TypeError, match="must refer to a dictionary"):
+        registry["invalid"]
+
+
+def test_register_serializer_replaces_builtin_serializer():
+    registry = SerializerRegistry()
+    registry.register("json", str, ".txt")
+
+    assert registry["json"] == {"serializer": str, "suffix": ".txt"}
+
+
+def test_serializer_registry_reads_entry_points_only_for_unknown_names(monkeypatch):
+    def entry_points(group):
+        raise AssertionError(group)
+
+    monkeypatch.setattr("pytask_r.serialization.entry_points", entry_points)
+    registry = SerializerRegistry()
+
+    assert "json" in registry
+    assert registry["yaml"]["suffix"] == ".yaml"
+    with pytest.raises(AssertionError, match=r"pytask_r\.serializers"):
+        registry["unknown"]
+
+
+def test_serializer_registry_can_be_changed_like_a_dictionary():
+    registry = SerializerRegistry()
+    registry["txt"] = {"serializer": str, "suffix": ".txt"}
+    del registry["json"]
+
+    assert registry["txt"] == {"serializer": str, "suffix": ".txt"}
+    assert "json" not in registry
+    assert "json" not in list(registry)
+    with pytest.raises(KeyError):
+        registry["json"]
+    with pytest.raises(KeyError):
+        del registry["unknown"]
+
+    registry.update(json={"serializer": str, "suffix": ".json"})
+    assert registry["json"]["serializer"] is str
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import array
+import contextlib
+
+import pytest
+
+from pytask_r.sidecar import SIDECAR_KEY
+from pytask_r.sidecar import extract_sidecars
+
+# Optional packages are imported once since the test fixtures restore sys.modules after
+# every test and some packages cannot be imported twice.
+with contextlib.suppress(ImportError):
+    import numpy as np  # noqa: F401
+
+with contextlib.suppress(ImportError):
+    import pandas as pd  # noqa: F401
+    import pyarrow.feather  # noqa: F401
+
+
+def test_extract_sidecars_from_numeric_list(tmp_path):
+    kwargs = {"small": [1, 2], "nested": {"large": [1.0, 2, 3.5, 4]}, "text": "a"}
+
+    new_kwargs, paths = extract_sidecars(kwargs, tmp_path, threshold=32)
+
+    assert new_kwargs["small"] == [1, 2]
+    assert new_kwargs["text"] == "a"
+    reference = new_kwargs["nested"]["large"][SIDECAR_KEY]
+    assert reference["format"] == "bin"
+    assert reference["dtype"] == "float64"
+    assert reference["shape"] == [4]
+    assert paths == [tmp_path / reference["path"].rsplit("/", 1)[1]]
+    assert paths[0].read_bytes() == array.array("d", [1.0, 2, 3.5, 4]).tobytes()
+
+
+def test_extract_sidecars_keeps_integer_lists_as_integers(tmp_path):
+    kwargs = {"ints": [1, -2, 3, 4], "large": [1, 2**31, 3, 4]}
+
+    new_kwargs, paths = extract_sidecars(kwargs, tmp_path, threshold=32)
+
+    assert new_kwargs["ints"][SIDECAR_KEY]["dtype"] == "int32"
+    assert paths[0].read_bytes() == array.array("i", [1, -2, 3, 4]).tobytes()
+    assert new_kwargs["large"][SIDECAR_KEY]["dtype"] == "float64"
+    assert paths[1].read_bytes() == array.array("d", [1, 2**31, 3, 4]).tobytes()
+
+
+def test_extract_sidecars_reuses_identical_content(tmp_path):
+    kwargs = {"a": [1.0] * 10, "b": [1.0] * 10}
+
+    _, paths = extract_sidecars(kwargs, tmp_path, threshold=8)
+
+    assert paths == [paths[0], paths[0]]
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_extract_sidecars_from_numpy_array(tmp_path):
+    np = pytest.importorskip("numpy")
+    value = np.arange(6, dtype="int64").reshape(2, 3)
+
+    new_kwargs, paths = extract_sidecars({"x": value}, tmp_path, threshold=1)
+
+    reference = new_kwargs["x"][SIDECAR_KEY]
+    assert reference["dtype"] == "float64"
+    assert reference["shape"] == [2, 3]
+    stored = np.fromfile(paths[0], dtype="<f8").reshape((2, 3), order="F")
+    assert (stored == value).all()
+
+
+def test_extract_sidecars_from_data_frame(tmp_path):
+    pd = pytest.importorskip("pandas")
+    feather = pytest.importorskip("pyarrow.feather")
+    value = pd.DataFrame({"x": [1.0, 2.0], "y": [3, 4]})
+
+    new_kwargs, paths = extract_sidecars({"df": value}, tmp_path, threshold=1)
+
+    reference = new_kwargs["df"][SIDECAR_KEY]
+    assert reference["format"] == "arrow"
+    assert reference["shape"] == [2, 2]
+    assert feather.read_feather(paths[0]).equals(value)
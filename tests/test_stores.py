@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import pytest
+
+from pytask_r.outputs import OutputCache
+from pytask_r.stores import STORES
+from pytask_r.stores import FileSystemStore
+from pytask_r.stores import S3Store
+from pytask_r.stores import StoreOptions
+from pytask_r.stores import create_store
+
+_OPTIONS = StoreOptions(max_workers=4, chunk_size=16)
+
+
+def _write_products(root):
+    products = [root / "a.txt", root / "out" / "b.txt"]
+    for i, path in enumerate(products):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"product {i} " * 10)
+    return products
+
+
+def _share_products_through_store(tmp_path, store):
+    products = _write_products(tmp_path / "laptop")
+    laptop = OutputCache(tmp_path / "laptop-cache", None, remote=store)
+    laptop.store("abc123", products, tmp_path / "laptop")
+
+    restored = [tmp_path / "ci" / "a.txt", tmp_path / "ci" / "out" / "b.txt"]
+    runner = OutputCache(tmp_path / "ci-cache", None, remote=store)
+    assert runner.restore("abc123", restored, tmp_path / "ci")
+    assert [path.read_text() for path in restored] == [
+        path.read_text() for path in products
+    ]
+    assert not runner.restore("def456", restored, tmp_path / "ci")
+
+
+def test_share_products_through_filesystem_store(tmp_path):
+    store = FileSystemStore(tmp_path / "nfs", _OPTIONS)
+    _share_products_through_store(tmp_path, store)
+
+    names = sorted(p.name for p in (tmp_path / "nfs" / "ab" / "abc123").iterdir())
+    assert names == ["0", "1", "manifest.json"]
+
+
+def test_incomplete_entries_in_store_are_ignored(tmp_path):
+    store = FileSystemStore(tmp_path / "nfs", _OPTIONS)
+    products = _write_products(tmp_path / "laptop")
+    OutputCache(tmp_path / "cache", None, remote=store).store(
+        "abc123", products, tmp_path / "laptop"
+    )
+    (tmp_path / "nfs" / "ab" / "abc123" / "1").unlink()
+
+    runner = OutputCache(tmp_path / "ci-cache", None, remote=store)
+    with pytest.warns(UserWarning, match="Downloading the entry abc123"):
+        assert not runner.restore("abc123", products, tmp_path / "laptop")
+    assert not list((tmp_path / "ci-cache").iterdir())
+
+
+@pytest.mark.parametrize(
+    ("url", "expected"),
+    [
+        ("/mnt/cache", "/mnt/cache"),
+        ("file:///mnt/cache", "/mnt/cache"),
+    ],
+)
+def test_create_filesystem_store(url, expected):
+    store = create_store(url, _OPTIONS)
+    assert isinstance(store, FileSystemStore)
+    assert store.folder.as_posix() == expected
+
+
+def test_create_registered_store(monkeypatch):
+    monkeypatch.setitem(STORES, "memory", lambda url, options: (url, options))
+    assert create_store("memory://cache", _OPTIONS) == ("memory://cache", _OPTIONS)
+
+    with pytest.raises(ValueError, match="no store for URLs starting with 'ftp://'"):
+        create_store("ftp://cache", _OPTIONS)
+
+
+def test_share_products_through_s3_store(tmp_path, monkeypatch):
+    boto3 = pytest.importorskip("boto3")
+    server = pytest.importorskip("moto.server")
+
+    # A local server which implements the API of S3 like MinIO.
+    moto = server.ThreadedMotoServer(port=0)
+    moto.start()
+    try:
+        host, port = moto.get_host_and_port()
+        monkeypatch.setenv("AWS_ENDPOINT_URL", f"http://{host}:{port}")
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        boto3.client("s3").create_bucket(Bucket="artifacts")
+
+        store = create_store("s3://artifacts/pytask-r", _OPTIONS)
+        assert isinstance(store, S3Store)
+        _share_products_through_store(tmp_path, store)
+        assert store.exists("ab/abc123/manifest.json")
+    finally:
+        moto.stop()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from pytask_r.toolchain import RInfo
+from pytask_r.toolchain import find_r_executable
+from pytask_r.toolchain import fingerprint_r
+from pytask_r.toolchain import get_package_versions
+from pytask_r.toolchain import get_r_info
+from pytask_r.toolchain import register_packages
+
+
+def _read_calls(fake_rscript):
+    lines = fake_rscript.with_name("calls.txt").read_text().splitlines()
+    return [json.loads(line) for line in lines]
+
+
+def test_find_r_executable_is_cached(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "pytask_r.toolchain.shutil.which", lambda x: calls.append(x) or "/bin/Rscript"
+    )
+    config = {"r_executable": None}
+
+    assert find_r_executable(config) == "/bin/Rscript"
+    assert find_r_executable(config) == "/bin/Rscript"
+    assert calls == ["Rscript"]
+
+
+def test_get_r_info(fake_rscript):
+    config = {"r_executable": fake_rscript.as_posix()}
+
+    info = get_r_info(config)
+
+    assert info == RInfo(
+        executable=fake_rscript.as_posix(),
+        version="4.3.1",
+        lib_paths=("/usr/lib/R/library", "/home/user/R/library"),
+    )
+    assert config["r_info"] is info
+
+
+def test_get_r_info_raises_error_without_rscript(monkeypatch):
+    monkeypatch.setattr("pytask_r.toolchain.shutil.which", lambda x: None)  # noqa: ARG005
+    with pytest.raises(RuntimeError, match="Rscript is needed"):
+        get_r_info({})
+
+
+def test_get_package_versions_probes_registered_packages_once(fake_rscript):
+    fake_rscript.with_name("versions.json").write_text('{"data.table": "1.15.0"}')
+    config = {"r_executable": fake_rscript.as_posix()}
+    register_packages(config, ["data.table", "yaml"])
+
+    assert get_package_versions(config, ["data.table"]) == {"data.table": "1.15.0"}
+    assert get_package_versions(config, ["yaml"]) == {"yaml": "missing"}
+    assert len(_read_calls(fake_rscript)) == 1
+    assert _read_calls(fake_rscript)[0][-2:] == ["data.table", "yaml"]
+
+
+def test_fingerprint_r_changes_with_package_versions(fake_rscript):
+    versions = fake_rscript.with_name("versions.json")
+    versions.write_text('{"data.table": "1.15.0"}')
+    before = fingerprint_r({"r_executable": fake_rscript.as_posix()}, ["data.table"])
+
+    versions.write_text('{"data.table": "1.16.0"}')
+    after = fingerprint_r({"r_executable": fake_rscript.as_posix()}, ["data.table"])
+
+    assert before != after
+
+
+def test_get_package_versions_probes_every_environment(fake_rscript):
+    fake_rscript.with_name("versions.json").write_text('{"data.table": "1.15.0"}')
+    config = {"r_executable": fake_rscript.as_posix()}
+    env = {"R_LIBS": "/project/renv/library"}
+
+    get_package_versions(config, ["data.table"])
+    get_package_versions(config, ["data.table"], env=env, vanilla=True)
+    # Threads do not change which packages are found.
+    get_package_versions(
+        config, ["data.table"], env={**env, "OMP_NUM_THREADS": "1"}, vanilla=True
+    )
+
+    calls = _read_calls(fake_rscript)
+    assert len(calls) == 2  # noqa: PLR2004
+    assert "--vanilla" not in calls[0]
+    assert calls[1][0] == "--vanilla"